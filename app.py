@@ -1,18 +1,59 @@
 # app.py
-import math
+import json
+import uuid
+import numpy as np
 import streamlit as st
 import pandas as pd
 import altair as alt
 import plotly.express as px
-
-from src.utils import _render_single_card_html
-from src.utils import _toggle_fav
-from src.data_preprocessing import cargar_datos
-from src.recommender_logic import recomendar_motos
+import plotly.graph_objects as go
+
+from src.utils import _toggle_fav, _ver_similares, _cambiar_pagina
+from src.data_preprocessing import leer_datos, url_datos
+from src.catalog_refresh import CatalogRefresher
+from src.recommender_logic import recomendar_motos, recomendar_por_afinidad, COLUMNAS_A_MOSTRAR
+from src.catalog_index import CatalogIndex
+from src.logo_cache import LOGOS
+from src.dashboard_stats import (
+    construir_cubo,
+    estadisticas,
+    licencias_por_tipo,
+    GraficosDashboard,
+    COLUMNAS_CUBO,
+    COLUMNAS_GRAFICOS,
+)
+from src.card_renderer import CardRenderer, CARD_CSS, COLUMNAS_TARJETA
+from src.result_pages import PaginasResultados
+from src.similar_bikes import SimilarBikesIndex, COLUMNAS_INDICE
+from src.catalog_index import CARNET_ORDEN
+from src.favorites_store import FavoritesStore
+from src.facet_counts import FacetCounter, COLUMNAS_FACETAS
+from src.model_search import ModelSearchIndex, COLUMNAS_BUSQUEDA
+from src.pareto import ORDEN_PARETO
+from src.bike_comparator import ComparadorMotos, tabla_comparacion, COLUMNAS_COMPARADOR, MAX_COMPARADAS
+from src.metrics import METRICAS, FICHERO_METRICAS
+from src.catalog_compact import ColumnasDiferidas, CATALOGO_COMPACTO
 
 # ── Config base ──
 st.set_page_config(page_title="MotoFit", page_icon="🏍️", layout="centered")
 
+# Duración de todo el rerun (con MOTOFIT_METRICAS=1; ver el panel ?debug=1)
+tramo_rerun = METRICAS.tramo("rerun")
+
+
+def cerrar_metricas():
+    """Cierra la medición del rerun y exporta las métricas si hay fichero configurado."""
+    tramo_rerun.cerrar()
+    if FICHERO_METRICAS and METRICAS.activo:
+        METRICAS.exportar(FICHERO_METRICAS)
+
+
+def detener():
+    """Termina el rerun con `st.stop()` sin dejar fuera su medición."""
+    cerrar_metricas()
+    st.stop()
+
+
 # ── Estado de sesión ──
 if "resultados" not in st.session_state:
     st.session_state.resultados = None
@@ -20,19 +61,115 @@ if "pagina" not in st.session_state:
     st.session_state.pagina = 1
 if "favs" not in st.session_state:
     st.session_state.favs = set()
+if "similar_a" not in st.session_state:
+    st.session_state.similar_a = None
+if "version_catalogo" not in st.session_state:
+    st.session_state.version_catalogo = None
 
 # ── Datos ──
-@st.cache_data
-def get_data():
-    return cargar_datos("data/motofit_limpio.csv")
-
-df = get_data()
+# El catálogo se carga una vez por proceso y todas las sesiones comparten el
+# mismo índice (arrays de solo lectura); cada rerun trabaja sobre una vista.
+@st.cache_resource
+def get_indice(path_local):
+    # Catálogo compacto: solo las columnas de la app, con tipos pequeños; el
+    # resto se lee del compilado si alguna vez se pide
+    if CATALOGO_COMPACTO:
+        return CatalogIndex(leer_datos(path_local, compacto=True), diferidas=ColumnasDiferidas(path_local))
+    return CatalogIndex(leer_datos(path_local))
+
+@st.cache_resource
+def get_refresco(url):
+    # Catálogo remoto: primera descarga síncrona y después refresco en segundo plano
+    refresco = CatalogRefresher(url, compacto=CATALOGO_COMPACTO)
+    try:
+        refresco.comprobar()
+    except Exception as e:
+        refresco.ultimo_error = e
+    refresco.iniciar()
+    return refresco
+
+# Las estructuras derivadas se versionan solo por las columnas de las que
+# dependen: un cambio de catálogo reconstruye únicamente las afectadas.
+@st.cache_resource(max_entries=2)
+def get_cubo(version, _df):
+    return construir_cubo(_df)
+
+@st.cache_resource(max_entries=2)
+def get_graficos(version, _indice, _cubo):
+    return GraficosDashboard(_indice, _cubo)
+
+@st.cache_resource(max_entries=2)
+def get_tarjetas(version, _indice):
+    return CardRenderer(_indice)
+
+@st.cache_resource(max_entries=2)
+def get_similares(version, _indice):
+    return SimilarBikesIndex(_indice)
+
+@st.cache_resource(max_entries=2)
+def get_facetas(version, _indice):
+    return FacetCounter(_indice)
+
+@st.cache_resource(max_entries=2)
+def get_buscador(version, _indice):
+    return ModelSearchIndex(_indice)
+
+@st.cache_resource(max_entries=2)
+def get_comparador(version, _indice):
+    return ComparadorMotos(_indice)
+
+@st.cache_resource
+def precargar_logos():
+    return LOGOS.precargar()
+
+@st.cache_resource
+def get_favoritos():
+    return FavoritesStore()
+
+# ── Favoritas persistentes ──
+# Cada navegador se identifica con un token en la URL (?u=...); al volver con
+# la misma URL se recuperan sus favoritas.
+favoritos = get_favoritos()
+if "usuario" not in st.session_state:
+    usuario = st.query_params.get("u")
+    if not usuario:
+        usuario = uuid.uuid4().hex
+        st.query_params["u"] = usuario
+    st.session_state.usuario = usuario
+    st.session_state.favs = set(favoritos.favoritos(usuario))
+
+with METRICAS.tramo("cargar_datos"):
+    DATA_URL = url_datos()
+    if DATA_URL:
+        refresco = get_refresco(DATA_URL)
+        if refresco.actual is None:
+            st.error(f"Error al cargar los datos desde la URL: {refresco.ultimo_error}")
+            detener()
+        indice = refresco.actual
+    else:
+        indice = get_indice("data/motofit_limpio.csv")
+        if indice.n == 0:
+            get_indice.clear()  # se reintenta en el siguiente rerun
+            detener()
+    df = indice.vista()
+
+# Los resultados guardados en la sesión son ids de fila de una versión concreta
+if st.session_state.version_catalogo != indice.version:
+    if st.session_state.version_catalogo is not None:
+        st.session_state.resultados = None
+        st.session_state.similar_a = None
+    st.session_state.version_catalogo = indice.version
+
+tarjetas = get_tarjetas(indice.version_de(COLUMNAS_TARJETA), indice)
+precargar_logos()
 
 # ── CSS ──
 st.markdown(
     """
 <style>
-.block-container { max-width: 1080px; padding: 2rem; margin:auto; }
+.block-container { max-width: 1080px; padding: 2rem; margin:auto; }"""
+    + CARD_CSS
+    + """
 @media (prefers-color-scheme: dark){
   body, .stApp { background-color:#0d1117; color:#f0f2f6; }
   h1 { color:#e6e6e6; text-align:center; font-size:2.2rem; }
@@ -61,41 +198,81 @@ tab_rec, tab_dash = st.tabs(["🏍 Recomendador", "📊 Dashboard"])
 #  TAB: RECOMENDADOR
        
 with tab_rec:
+    # Búsqueda por nombre: los resultados se pintan en este hueco más abajo,
+    # cuando ya está definida la función de las tarjetas
+    busqueda = st.text_input(
+        "🔍 Buscar moto", key="busqueda_modelo", placeholder="Marca o modelo, p. ej. «tenere 700» o «mt07»"
+    )
+    hueco_busqueda = st.container()
+
     st.subheader("Datos para la recomendación")
 
+    # Recuentos en vivo: se calculan con los valores actuales de los filtros
+    # (ya actualizados en la sesión antes del rerun) para mostrarlos en las
+    # opciones de cada control y en el botón de búsqueda.
+    tipos = sorted(indice.categorias["TIPO_SIMPLIFICADO"].tolist())
+    filtros = st.session_state
+    marca_actual = filtros.get("filtro_marca", "Todas")
+    with METRICAS.tramo("facetas"):
+        conteos = get_facetas(indice.version_de(COLUMNAS_FACETAS), indice).contar(
+            filtros.get("filtro_precio_max", 7000),
+            CARNET_ORDEN.get(filtros.get("filtro_carnet", "AM")),
+            filtros.get("filtro_altura", 175),
+            precio_min=filtros.get("filtro_precio_min", 0),
+            marca=None if marca_actual == "Todas" else [marca_actual],
+            tipos=filtros.get("filtro_tipos", tipos),
+            cilindrada_min=filtros.get("filtro_cc_min", 0),
+            cilindrada_max=filtros.get("filtro_cc_max", 750),
+        )
+
     colp1, colp2 = st.columns(2)
     with colp1:
-        presupuesto_min = st.slider("💰 Mínimo (€)", 0, 20000, 0, 100)
+        presupuesto_min = st.slider("💰 Mínimo (€)", 0, 20000, 0, 100, key="filtro_precio_min")
     with colp2:
-        presupuesto_max = st.slider("💰 Máximo (€)", 1000, 50000, 7000, 500)
+        presupuesto_max = st.slider("💰 Máximo (€)", 1000, 50000, 7000, 500, key="filtro_precio_max")
 
     if presupuesto_min >= presupuesto_max:
         st.error("El mínimo no puede ser ≥ al máximo.")
-        st.stop()
+        detener()
 
     st.subheader("Cilindrada")
     
     colc1, colc2 = st.columns(2)
     with colc1:
-        cc_min = st.slider("Min. CC", 0, 1500, 0, 50)
+        cc_min = st.slider("Min. CC", 0, 1500, 0, 50, key="filtro_cc_min")
     with colc2:
-        cc_max = st.slider("Max. CC", 50, 2000, 750, 50)
+        cc_max = st.slider("Max. CC", 50, 2000, 750, 50, key="filtro_cc_max")
 
     if cc_min >= cc_max:
         st.error("El mínimo de cilindrada no puede ser ≥ al máximo.")
-        st.stop()
+        detener()
     colf1, colf2, colf3 = st.columns(3)
 
     with colf1:
-        carnet = st.selectbox("🎫 Carnet", ["AM", "B", "A1", "A2", "A"])
+        carnet = st.selectbox(
+            "🎫 Carnet",
+            ["AM", "B", "A1", "A2", "A"],
+            format_func=lambda c: f"{c} ({conteos['CARNET'][c]})",
+            key="filtro_carnet",
+        )
     with colf2:
-        altura = st.slider("📏 Estatura (cm)", 140, 200, 175)
+        altura = st.slider("📏 Estatura (cm)", 140, 200, 175, key="filtro_altura")
     with colf3:
-        marcas = sorted(df["MARCA"].dropna().unique())
-        marca_sel = st.selectbox("🏷️ Marca (opcional)", ["Todas"] + marcas)
+        marcas = sorted(indice.categorias["MARCA"].tolist())
+        marca_sel = st.selectbox(
+            "🏷️ Marca (opcional)",
+            ["Todas"] + marcas,
+            format_func=lambda m: f"{m} ({conteos['sin_marca'] if m == 'Todas' else conteos['MARCA'][m]})",
+            key="filtro_marca",
+        )
 
-    tipos = sorted(df["TIPO_SIMPLIFICADO"].dropna().unique())
-    tipo_sel = st.multiselect("🛵 Tipo de moto", tipos, default=tipos)
+    tipo_sel = st.multiselect(
+        "🛵 Tipo de moto",
+        tipos,
+        default=tipos,
+        format_func=lambda t: f"{t} ({conteos['TIPO_SIMPLIFICADO'][t]})",
+        key="filtro_tipos",
+    )
 
     st.subheader("Orden")
     colo1, colo2 = st.columns(2)
@@ -105,29 +282,56 @@ with tab_rec:
             "Potencia": "POTENCIA",
             "Altura asiento": "ALTURA_ASIENTO",
             "Peso": "PESO_VACIO",
+            "Afinidad": "AFINIDAD",
+            "Mejor relación (Pareto)": ORDEN_PARETO,
         }
         orden_key = st.selectbox("Ordenar por:", list(ordenar_opts.keys()))
         ordenar_por = ordenar_opts[orden_key]
     with colo2:
-        asc = st.selectbox("Dirección:", ["Ascendente", "Descendente"]) == "Ascendente"
+        asc = st.selectbox(
+            "Dirección:", ["Ascendente", "Descendente"], disabled=(ordenar_por in ("AFINIDAD", ORDEN_PARETO))
+        ) == "Ascendente"
 
     st.markdown("---")
 
-    if st.button("🔍 Buscar motos"):
+    # En modo afinidad los filtros no excluyen motos y en el de Pareto solo salen
+    # las primeras capas: el recuento no aplica
+    etiqueta_buscar = "🔍 Buscar motos" if ordenar_por in ("AFINIDAD", ORDEN_PARETO) else f"🔍 Buscar motos ({conteos['total']})"
+    if st.button(etiqueta_buscar, key="buscar"):
         marca_para = None if marca_sel == "Todas" else [marca_sel]
-        st.session_state.resultados = recomendar_motos(
-            df,
-            presupuesto_max,
-            carnet,
-            altura,
-            precio_min=presupuesto_min,
-            marca=marca_para,
-            tipos=tipo_sel,
-            ordenar_por=ordenar_por,
-            ascendente=asc,
-            cilindrada_min=cc_min, 
-            cilindrada_max=cc_max, 
-        )
+        if ordenar_por == "AFINIDAD":
+            # Las mejores motos por puntuación: los filtros penalizan en lugar de excluir
+            resultados = recomendar_por_afinidad(
+                df,
+                presupuesto_max,
+                carnet,
+                altura,
+                precio_min=presupuesto_min,
+                marca=marca_para,
+                tipos=tipo_sel,
+                cilindrada_min=cc_min,
+                cilindrada_max=cc_max,
+                top_k=90,
+                indice=indice,
+            )
+        else:
+            # Solo los ids: las columnas de cada tarjeta se leen al mostrar su página
+            resultados = recomendar_motos(
+                df,
+                presupuesto_max,
+                carnet,
+                altura,
+                precio_min=presupuesto_min,
+                marca=marca_para,
+                tipos=tipo_sel,
+                ordenar_por=ordenar_por,
+                ascendente=asc,
+                cilindrada_min=cc_min,
+                cilindrada_max=cc_max,
+                indice=indice,
+                columnas=[],
+            )
+        st.session_state.resultados = PaginasResultados.de_resultados(resultados)
         st.session_state.pagina = 1
 
     # --- Función para mostrar tarjetas  ---
@@ -140,59 +344,142 @@ with tab_rec:
             key_prefix (str): Prefijo para las claves de los widgets para evitar colisiones.
         """
         num_col = 3
-        for i in range(0, len(data_frame_to_display), num_col):
+        # Las tarjetas salen de la caché por id de fila: una llamada a markdown por fila de la rejilla
+        filas_html = tarjetas.filas(data_frame_to_display.index, num_col)
+        row_ids = data_frame_to_display.index.tolist()
+        moto_ids = indice.claves_moto(row_ids)  # id estable (MARCA + MODELO)
+        marcas_fav = data_frame_to_display["MARCA"].astype(str).tolist()
+        modelos = data_frame_to_display["MODELO"].astype(str).tolist()
+        for fila, i in zip(filas_html, range(0, len(modelos), num_col)):
+            st.markdown(fila, unsafe_allow_html=True)
             cols = st.columns(num_col)
             for j, col in enumerate(cols):
-                if i + j < len(data_frame_to_display):
+                if i + j < len(modelos):
                     with col:
-                        row = data_frame_to_display.iloc[i + j]
-                        modelo_key = str(row.MODELO)  # clave estable
-                        st.markdown(_render_single_card_html(row), unsafe_allow_html=True)
-
-                        checkbox_key = f"{key_prefix}_fav_{i}_{j}_{hash(modelo_key)}"
+                        moto_id = moto_ids[i + j]
+                        checkbox_key = f"{key_prefix}_fav_{moto_id}"
+                        if checkbox_key not in st.session_state:
+                            st.session_state[checkbox_key] = moto_id in st.session_state.favs
                         st.checkbox(
                             "Guardar ❤️",
-                            value=(modelo_key in st.session_state.favs),
                             key=checkbox_key,
                             on_change=_toggle_fav,
-                            args=(modelo_key, checkbox_key),
+                            args=(moto_id, checkbox_key, favoritos, marcas_fav[i + j], modelos[i + j]),
+                        )
+                        st.button(
+                            "🔎 Parecidas",
+                            key=f"{key_prefix}_sim_{row_ids[i + j]}",
+                            on_click=_ver_similares,
+                            args=(row_ids[i + j],),
                         )
 
+    # --- Resultados de la búsqueda por nombre  ---
+    if busqueda.strip():
+        with METRICAS.tramo("busqueda"):
+            ids_busqueda = get_buscador(indice.version_de(COLUMNAS_BUSQUEDA), indice).buscar(busqueda, limite=9)
+        with hueco_busqueda:
+            if len(ids_busqueda):
+                display_cards_from_df(indice.materializar(ids_busqueda, COLUMNAS_A_MOSTRAR), "search_section")
+            else:
+                st.info("Ninguna moto coincide con la búsqueda.")
+
     # --- Render de resultados  ---
-    if st.session_state.resultados is not None:
-        resultados = st.session_state.resultados
-        if resultados.empty:
+    # Fragmento: "Anterior" / "Siguiente" solo vuelven a ejecutar esta sección,
+    # que corta los ids de la página y pinta tarjetas ya preparadas
+    @st.fragment
+    def mostrar_resultados():
+        """Muestra la página actual de los resultados guardados en la sesión."""
+        # Un favorito o "Parecidas" pulsado aquí cambia otras secciones: se rehace toda la página
+        if (frozenset(st.session_state.favs), st.session_state.similar_a) != st.session_state.estado_resultados:
+            st.rerun()
+        paginas = st.session_state.resultados
+        if not paginas.total:
             st.warning("❌ No se encontraron motos con esos filtros.")
+            return
+
+        pagina = st.session_state.pagina = paginas.pagina_valida(st.session_state.get("pagina", 1))
+        inicio, fin = paginas.limites[pagina - 1], paginas.limites[pagina]
+        st.caption(f"Mostrando {inicio + 1}–{fin} de {paginas.total} resultados.")
+        if paginas.capas_pagina is not None:
+            capa_min, capa_max = paginas.capas_pagina[pagina - 1]
+            st.caption(
+                f"⭐ {paginas.en_frente} motos en el frente de Pareto: ninguna otra es a la vez más barata, "
+                "más potente, más ligera y más baja de asiento. Detrás van las capas siguientes "
+                f"(esta página: capa {capa_min}" + (f"–{capa_max})." if capa_max != capa_min else ").")
+            )
+        col1, col2, col3 = st.columns(3)
+        col1.button(
+            "⬅️ Anterior", use_container_width=True, disabled=(pagina <= 1),
+            on_click=_cambiar_pagina, args=(-1,),
+        )
+        col2.markdown(f"<div style='text-align: center; font-size: 1.1em; margin-top: 0.3rem;'>{pagina} / {paginas.total_paginas}</div>", unsafe_allow_html=True,)
+        col3.button(
+            "Siguiente ➡️", use_container_width=True, disabled=(pagina >= paginas.total_paginas),
+            on_click=_cambiar_pagina, args=(1,),
+        )
+        st.markdown("---")
+        with METRICAS.tramo("tarjetas.pagina"):
+            ids_pagina = paginas.ids_pagina(pagina)
+            display_cards_from_df(indice.materializar(ids_pagina, ["MARCA", "MODELO"]), "main_results")
+        # Las tarjetas de las páginas vecinas se preparan mientras se mira esta
+        tarjetas.precargar(paginas.ids_vecinas(pagina))
+
+    if st.session_state.resultados is not None:
+        st.session_state.estado_resultados = (frozenset(st.session_state.favs), st.session_state.similar_a)
+        mostrar_resultados()
+
+    # --- Motos parecidas  ---
+    if st.session_state.similar_a is not None and st.session_state.similar_a < len(df):
+        fila_ref = st.session_state.similar_a
+        st.markdown("---")
+        st.subheader(f"🔎 Parecidas a {df['MARCA'].iloc[fila_ref]} {df['MODELO'].iloc[fila_ref]}")
+        respetar = st.toggle("Solo motos compatibles con mi carnet y estatura", value=True)
+        ids_similares = get_similares(indice.version_de(COLUMNAS_INDICE), indice).similares(
+            fila_ref,
+            k=6,
+            carnet_usuario=CARNET_ORDEN.get(carnet) if respetar else None,
+            altura=altura if respetar else None,
+        )
+        if len(ids_similares):
+            display_cards_from_df(indice.materializar(ids_similares, COLUMNAS_A_MOSTRAR), "similar_section")
         else:
-            total = len(resultados)
-            por_pagina = 9
-            total_paginas = max(1, math.ceil(total / por_pagina))
-            
-            if 'pagina' not in st.session_state:
-                st.session_state.pagina = 1
-            st.session_state.pagina = max(1, min(st.session_state.pagina, total_paginas))
-
-            start = (st.session_state.pagina - 1) * por_pagina
-            end = start + por_pagina
-            st.caption(f"Mostrando {start + 1}–{min(end, total)} de {total} resultados.")
-            col1, col2, col3 = st.columns(3)
-            if col1.button("⬅️ Anterior", use_container_width=True, disabled=(st.session_state.pagina <= 1)):
-                st.session_state.pagina -= 1
-                st.rerun()
-            col2.markdown(f"<div style='text-align: center; font-size: 1.1em; margin-top: 0.3rem;'>{st.session_state.pagina} / {total_paginas}</div>", unsafe_allow_html=True,)
-            if col3.button("Siguiente ➡️", use_container_width=True, disabled=(st.session_state.pagina >= total_paginas)):
-                st.session_state.pagina += 1
-                st.rerun()
-            st.markdown("---")
-            subset = resultados.iloc[start:end]
-            display_cards_from_df(subset, "main_results")
+            st.info("No hay motos parecidas que cumplan esos filtros.")
 
     # --- Favoritas  ---
     if st.session_state.favs:
         st.markdown("---")
         st.subheader("🗂️ Tus favoritas")
-        df_favs = df[df["MODELO"].isin(st.session_state.favs)]
-        display_cards_from_df(df_favs, "fav_section")
+        # Ids estables -> filas con búsquedas binarias en el índice (sin recorrer el catálogo)
+        filas_favs = np.sort(indice.filas_de(st.session_state.favs))
+        if len(filas_favs):
+            df_favs = indice.materializar(filas_favs, COLUMNAS_A_MOSTRAR)
+            display_cards_from_df(df_favs, "fav_section")
+        else:
+            st.info("Tus favoritas ya no están en el catálogo actual.")
+
+        # --- Comparador de favoritas  ---
+        # Los percentiles están precalculados por versión del catálogo: comparar es leerlos
+        if len(filas_favs) >= 2:
+            st.markdown("#### ⚖️ Comparar favoritas")
+            nombres_favs = dict(zip(
+                df_favs.index.tolist(),
+                (df_favs["MARCA"].astype(str) + " " + df_favs["MODELO"].astype(str)).tolist(),
+            ))
+            seleccion = st.multiselect(
+                f"Elige de 2 a {MAX_COMPARADAS} motos",
+                options=list(nombres_favs),
+                format_func=nombres_favs.get,
+                max_selections=MAX_COMPARADAS,
+                key="comparar_favs",
+            )
+            if len(seleccion) >= 2:
+                with METRICAS.tramo("comparador"):
+                    comparacion = get_comparador(indice.version_de(COLUMNAS_COMPARADOR), indice).comparar(seleccion)
+                st.dataframe(tabla_comparacion(comparacion, nombres_favs), use_container_width=True)
+                st.caption(
+                    "P62 tipo: la moto supera en esa especificación al 62% de las de su tipo; "
+                    "P48 total: al 48% de todo el catálogo."
+                )
 
     st.markdown("---")
     st.caption("Desarrollado por @rofaba")
@@ -206,28 +493,32 @@ with tab_dash:
 
     # Filtros
     cflt1, cflt2 = st.columns(2)
-    tipos_dash = ["Todos"] + sorted(df["TIPO_SIMPLIFICADO"].unique().tolist())
-    marcas_dash = ["Todas"] + sorted(df["MARCA"].unique().tolist())
+    tipos_dash = ["Todos"] + sorted(indice.categorias["TIPO_SIMPLIFICADO"].tolist())
+    marcas_dash = ["Todas"] + sorted(indice.categorias["MARCA"].tolist())
     with cflt1:
         tipo_dash = st.selectbox("Filtrar por tipo", tipos_dash, key="dash_tipo")
     with cflt2:
         marca_dash = st.selectbox("Filtrar por marca", marcas_dash, key="dash_marca")
 
-    df_dash = df.copy()
-    if tipo_dash != "Todos":
-        df_dash = df_dash[df_dash["TIPO_SIMPLIFICADO"] == tipo_dash]
-    if marca_dash != "Todas":
-        df_dash = df_dash[df_dash["MARCA"] == marca_dash]
+    # Estadísticas precalculadas por (tipo, marca) para la versión actual del catálogo
+    with METRICAS.tramo("dashboard.estadisticas"):
+        cubo = get_cubo(indice.version_de(COLUMNAS_CUBO), df)
+        stats = estadisticas(cubo, tipo_dash, marca_dash)
 
-    if df_dash.empty:
+    if stats is None:
         st.info("No hay datos para esos filtros.")
-        st.stop()
+        detener()
+
+    # Datos de los gráficos ya reducidos (cajas precalculadas, solo las columnas
+    # que se dibujan y dispersión por densidad), memorizados por filtro
+    with METRICAS.tramo("dashboard.datos_graficos"):
+        graficos = get_graficos(indice.version_de(COLUMNAS_GRAFICOS), indice, cubo).obtener(tipo_dash, marca_dash)
 
     # KPIs
     c_kpi1, c_kpi2, c_kpi3 = st.columns(3)
-    precio_med = pd.to_numeric(df_dash["PRECIO"], errors="coerce").median()
-    altura_med = pd.to_numeric(df_dash["ALTURA_ASIENTO"], errors="coerce").median()
-    c_kpi1.metric("Modelos", int(len(df_dash)))
+    precio_med = stats["precio_mediana"]
+    altura_med = stats["altura_mediana"]
+    c_kpi1.metric("Modelos", int(stats["modelos"]))
     c_kpi2.metric("Precio mediano", f"€{precio_med:,.0f}" if pd.notna(precio_med) else "—")
     c_kpi3.metric(
         "Altura asiento (mediana)", f"{altura_med:.0f} mm" if pd.notna(altura_med) else "—"
@@ -250,66 +541,79 @@ with tab_dash:
             "Sport",
             "Tourer",
         ]
-        base_altura = df_dash.dropna(
-            subset=["ALTURA_ASIENTO", "TIPO_SIMPLIFICADO"]
-        ).copy()
-        base_altura["ALTURA_ASIENTO"] = pd.to_numeric(
-            base_altura["ALTURA_ASIENTO"], errors="coerce"
-        )
-        base_altura = base_altura.dropna(subset=["ALTURA_ASIENTO"])
+        cajas_altura = graficos["altura_cajas"]
 
-        if base_altura.empty:
+        if cajas_altura.empty:
             st.info("Sin datos de altura con los filtros actuales.")
         else:
-            q02 = base_altura["ALTURA_ASIENTO"].quantile(0.02)
-            q98 = base_altura["ALTURA_ASIENTO"].quantile(0.98)
-            vmin = float(base_altura["ALTURA_ASIENTO"].min())
-            vmax = float(base_altura["ALTURA_ASIENTO"].max())
-            lo = max(600.0, min(q02 - 20, vmin - 15))
-            hi = max(q98 + 20, vmax + 20)  # evita cortar outliers
-            y_scale = alt.Scale(domain=[lo, hi])
-
-            box = (
-                alt.Chart(base_altura)
-                .mark_boxplot(size=28)
-                .encode(
-                    x=alt.X("TIPO_SIMPLIFICADO:N", sort=orden_tipos, title="Tipo"),
-                    y=alt.Y("ALTURA_ASIENTO:Q", scale=y_scale, title="Altura asiento (mm)"),
-                    tooltip=["TIPO_SIMPLIFICADO", "ALTURA_ASIENTO"],
+            with METRICAS.tramo("dashboard.altura") as tramo:
+                tramo.contar("filas", len(cajas_altura) + len(graficos["altura_puntos"]))
+                q02 = stats["altura_q02"]
+                q98 = stats["altura_q98"]
+                vmin = float(stats["altura_min"])
+                vmax = float(stats["altura_max"])
+                lo = max(600.0, min(q02 - 20, vmin - 15))
+                hi = max(q98 + 20, vmax + 20)  # evita cortar outliers
+                y_scale = alt.Scale(domain=[lo, hi])
+                eje_tipo = alt.X("TIPO_SIMPLIFICADO:N", sort=orden_tipos, title="Tipo")
+
+                # Boxplot dibujado a partir de sus estadísticos (bigotes, caja y mediana)
+                cajas = alt.Chart(cajas_altura)
+                bigotes = cajas.mark_rule().encode(
+                    x=eje_tipo,
+                    y=alt.Y("altura_bigote_inf:Q", scale=y_scale, title="Altura asiento (mm)"),
+                    y2="altura_bigote_sup:Q",
                 )
-            )
-            puntos = (
-                alt.Chart(base_altura)
-                .mark_circle(size=40, opacity=0.25)
-                .encode(
-                    x=alt.X("TIPO_SIMPLIFICADO:N", sort=orden_tipos, title=None),
-                    y=alt.Y("ALTURA_ASIENTO:Q", scale=y_scale),
-                    color=alt.Color("TIPO_SIMPLIFICADO:N", legend=None),
-                    tooltip=["MARCA", "MODELO", "ALTURA_ASIENTO", "TIPO_SIMPLIFICADO"],
+                box = cajas.mark_bar(size=28).encode(
+                    x=eje_tipo,
+                    y=alt.Y("altura_q1:Q", scale=y_scale),
+                    y2="altura_q3:Q",
+                    tooltip=[
+                        alt.Tooltip("TIPO_SIMPLIFICADO:N", title="Tipo"),
+                        alt.Tooltip("altura_mediana:Q", title="Mediana"),
+                        alt.Tooltip("altura_q1:Q", title="Q1"),
+                        alt.Tooltip("altura_q3:Q", title="Q3"),
+                    ],
                 )
-            )
-            st.altair_chart((box + puntos).properties(height=360), use_container_width=True)
-            st.caption(f"Nota: eje Y auto‑ajustado (~{lo:.0f}–{hi:.0f} mm).")
+                mediana = cajas.mark_tick(color="white", size=28).encode(
+                    x=eje_tipo, y=alt.Y("altura_mediana:Q", scale=y_scale)
+                )
+                puntos = (
+                    alt.Chart(graficos["altura_puntos"])
+                    .mark_circle(size=40, opacity=0.25)
+                    .encode(
+                        x=alt.X("TIPO_SIMPLIFICADO:N", sort=orden_tipos, title=None),
+                        y=alt.Y("ALTURA_ASIENTO:Q", scale=y_scale),
+                        color=alt.Color("TIPO_SIMPLIFICADO:N", legend=None),
+                        tooltip=["MARCA", "MODELO", "ALTURA_ASIENTO", "TIPO_SIMPLIFICADO"],
+                    )
+                )
+                st.altair_chart((bigotes + box + mediana + puntos).properties(height=360), use_container_width=True)
+                st.caption(f"Nota: eje Y auto‑ajustado (~{lo:.0f}–{hi:.0f} mm).")
 
     with c2:
         st.markdown("**Precio vs Potencia**")
-        base_scatter = df_dash[["PRECIO", "POTENCIA", "MARCA", "MODELO", "TIPO_SIMPLIFICADO"]].copy()
-        base_scatter["PRECIO"] = pd.to_numeric(base_scatter["PRECIO"], errors="coerce")
-        base_scatter["POTENCIA"] = pd.to_numeric(base_scatter["POTENCIA"], errors="coerce")
-        base_scatter = base_scatter.dropna(subset=["PRECIO", "POTENCIA"])
+        base_scatter = graficos["dispersion"]
 
         if base_scatter.empty:
             st.info("Sin datos para Precio/Potencia con los filtros actuales.")
         else:
-            fig = px.scatter(
-                base_scatter,
-                x="POTENCIA",
-                y="PRECIO",
-                color="TIPO_SIMPLIFICADO",
-                hover_data=["MARCA", "MODELO"],
-            )
-            fig.update_yaxes(tickprefix="€", separatethousands=True)
-            st.plotly_chart(fig, use_container_width=True)
+            with METRICAS.tramo("dashboard.precio_potencia") as tramo:
+                tramo.contar("filas", len(base_scatter))
+                fig = px.scatter(
+                    base_scatter,
+                    x="POTENCIA",
+                    y="PRECIO",
+                    color="TIPO_SIMPLIFICADO",
+                    hover_data=["MARCA", "MODELO"],
+                )
+                fig.update_yaxes(tickprefix="€", separatethousands=True)
+                st.plotly_chart(fig, use_container_width=True)
+                if len(base_scatter) < graficos["dispersion_total"]:
+                    st.caption(
+                        f"Mostrando {len(base_scatter):,} de {graficos['dispersion_total']:,} motos "
+                        "(las zonas densas se aclaran; los valores aislados se muestran todos)."
+                    )
 
     st.markdown("---")
 
@@ -318,57 +622,99 @@ with tab_dash:
 
     with c3:
         st.markdown("**Precio por tipo**")
-        base_precio = df_dash.dropna(subset=["PRECIO", "TIPO_SIMPLIFICADO"]).copy()
-        base_precio["PRECIO"] = (
-            base_precio["PRECIO"]
-            .astype(str)
-            .str.replace(r"[^\d.,]", "", regex=True)
-            .str.replace(".", "", regex=False)
-            .str.replace(",", ".", regex=False)
-        )
-        base_precio["PRECIO"] = pd.to_numeric(base_precio["PRECIO"], errors="coerce")
-        base_precio = base_precio.dropna(subset=["PRECIO"])
+        cajas_precio = graficos["precio_cajas"]
 
-        if base_precio.empty:
+        if cajas_precio.empty:
             st.info("Sin datos de precio para los filtros actuales.")
         else:
-            fig_box = px.box(
-                base_precio,
-                x="TIPO_SIMPLIFICADO",
-                y="PRECIO",
-                category_orders={"TIPO_SIMPLIFICADO": orden_tipos},
-            )
-            fig_box.update_yaxes(tickprefix="€", separatethousands=True)
-            st.plotly_chart(fig_box, use_container_width=True)
+            with METRICAS.tramo("dashboard.precio_tipo") as tramo:
+                atipicos = graficos["precio_atipicos"]
+                tramo.contar("filas", len(cajas_precio) + len(atipicos))
+                fig_box = go.Figure(
+                    go.Box(
+                        x=cajas_precio["TIPO_SIMPLIFICADO"],
+                        lowerfence=cajas_precio["precio_bigote_inf"],
+                        q1=cajas_precio["precio_q1"],
+                        median=cajas_precio["precio_mediana"],
+                        q3=cajas_precio["precio_q3"],
+                        upperfence=cajas_precio["precio_bigote_sup"],
+                        name="PRECIO",
+                        marker_color=px.colors.qualitative.Plotly[0],
+                    )
+                )
+                if not atipicos.empty:
+                    fig_box.add_trace(
+                        go.Scatter(
+                            x=atipicos["TIPO_SIMPLIFICADO"],
+                            y=atipicos["PRECIO"],
+                            mode="markers",
+                            name="PRECIO",
+                            marker_color=px.colors.qualitative.Plotly[0],
+                            customdata=atipicos[["MARCA", "MODELO"]],
+                            hovertemplate="%{customdata[0]} %{customdata[1]}<br>€%{y:,.0f}<extra></extra>",
+                        )
+                    )
+                fig_box.update_layout(showlegend=False)
+                fig_box.update_xaxes(
+                    title="TIPO_SIMPLIFICADO", categoryorder="array", categoryarray=orden_tipos
+                )
+                fig_box.update_yaxes(title="PRECIO", tickprefix="€", separatethousands=True)
+                st.plotly_chart(fig_box, use_container_width=True)
 
     with c4:
         st.markdown("**Licencias por tipo**")
-        base_lic = df_dash.dropna(subset=["CARNET_MINIMO", "TIPO_SIMPLIFICADO"]).copy()
+        base_lic = licencias_por_tipo(cubo, tipo_dash, marca_dash)
         orden_carnet = ["AM", "B", "A1", "A2", "A"]
-        base_lic["CARNET_MINIMO"] = pd.Categorical(
-            base_lic["CARNET_MINIMO"], categories=orden_carnet, ordered=True
-        )
 
         if base_lic.empty:
             st.info("Sin datos de licencias con los filtros actuales.")
         else:
-            chart_lic = (
-                alt.Chart(base_lic)
-                .mark_bar()
-                .encode(
-                    x=alt.X("TIPO_SIMPLIFICADO:N", sort=orden_tipos, title="Tipo"),
-                    y=alt.Y("count():Q", stack="normalize", title="Proporción"),
-                    color=alt.Color(
-                        "CARNET_MINIMO:N",
-                        sort=orden_carnet,
-                        legend=alt.Legend(title="Carnet"),
-                    ),
-                    tooltip=[
-                        alt.Tooltip("TIPO_SIMPLIFICADO:N", title="Tipo"),
-                        alt.Tooltip("CARNET_MINIMO:N", title="Carnet"),
-                        alt.Tooltip("count():Q", title="Modelos"),
-                    ],
+            with METRICAS.tramo("dashboard.licencias") as tramo:
+                tramo.contar("filas", len(base_lic))
+                chart_lic = (
+                    alt.Chart(base_lic)
+                    .mark_bar()
+                    .encode(
+                        x=alt.X("TIPO_SIMPLIFICADO:N", sort=orden_tipos, title="Tipo"),
+                        y=alt.Y("sum(MODELOS):Q", stack="normalize", title="Proporción"),
+                        color=alt.Color(
+                            "CARNET_MINIMO:N",
+                            sort=orden_carnet,
+                            legend=alt.Legend(title="Carnet"),
+                        ),
+                        tooltip=[
+                            alt.Tooltip("TIPO_SIMPLIFICADO:N", title="Tipo"),
+                            alt.Tooltip("CARNET_MINIMO:N", title="Carnet"),
+                            alt.Tooltip("sum(MODELOS):Q", title="Modelos"),
+                        ],
+                    )
+                    .properties(height=360)
                 )
-                .properties(height=360)
-            )
-            st.altair_chart(chart_lic, use_container_width=True)
+                st.altair_chart(chart_lic, use_container_width=True)
+
+
+# ── Métricas ──
+cerrar_metricas()
+
+# Panel de depuración, solo con ?debug=1 en la URL
+if st.query_params.get("debug") == "1":
+    with st.expander("⏱️ Métricas de rendimiento"):
+        # El registro es del proceso (lo comparten todas las sesiones): solo se activa por entorno
+        st.caption(
+            "Registro de métricas: "
+            + ("activo" if METRICAS.activo else "inactivo; arranca la app con `MOTOFIT_METRICAS=1` para activarlo")
+            + ". Las mediciones son de todo el proceso, no solo de esta sesión."
+        )
+        resumen = METRICAS.resumen()
+        if resumen["tramos"]:
+            st.dataframe(pd.DataFrame.from_dict(resumen["tramos"], orient="index"), use_container_width=True)
+            st.dataframe(pd.Series(resumen["contadores"], name="valor", dtype="float64"), use_container_width=True)
+        else:
+            st.info("Aún no hay mediciones.")
+        st.caption(f"Logos en caché: {LOGOS.estadisticas()}")
+        cold1, cold2, cold3 = st.columns(3)
+        cold1.download_button("Prometheus", METRICAS.a_prometheus(), "motofit_metricas.prom")
+        cold2.download_button("JSON", json.dumps(resumen, ensure_ascii=False, indent=2), "motofit_metricas.json")
+        if cold3.button("Reiniciar"):
+            METRICAS.reiniciar()
+            st.rerun()
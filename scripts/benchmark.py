@@ -0,0 +1,242 @@
+# scripts/benchmark.py
+"""
+Benchmarks de los caminos críticos de MotoFit sobre catálogos sintéticos.
+
+Genera catálogos de 10k, 100k y 1M motos con `src.synthetic_catalog`, mide
+tiempo y pico de memoria (tracemalloc) de carga, índice, recomendador, recuentos
+de facetas, tarjetas, cubo y gráficos del Dashboard y motos parecidas, y guarda los
+resultados en JSON para comparar entre commits:
+
+    python scripts/benchmark.py                       # benchmarks/<commit>.json
+    python scripts/benchmark.py --tamanos 10000 -o base.json
+    python scripts/benchmark.py --comparar base.json nuevo.json
+"""
+from pathlib import Path
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.catalog_cache import guardar_catalogo_compilado  # noqa: E402
+from src.catalog_index import CatalogIndex, CARNET_ORDEN  # noqa: E402
+from src.card_renderer import CardRenderer  # noqa: E402
+from src.dashboard_stats import construir_cubo, GraficosDashboard  # noqa: E402
+from src.facet_counts import FacetCounter  # noqa: E402
+from src.data_preprocessing import cargar_catalogo, hash_fuente, leer_y_preprocesar  # noqa: E402
+from src.query_cache import QueryCache  # noqa: E402
+from src.recommender_logic import recomendar_motos, recomendar_motos_batch  # noqa: E402
+from src.similar_bikes import SimilarBikesIndex  # noqa: E402
+from src.synthetic_catalog import generar_catalogo  # noqa: E402
+from src.utils import _render_single_card_html  # noqa: E402
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "desconocido"
+
+
+def medir(fn, repeticiones=1, memoria=True):
+    """
+    Mide el tiempo (mejor de `repeticiones`) y el pico de memoria de `fn`.
+
+    El pico se mide en una ejecución aparte con tracemalloc, que ralentiza el
+    código Python y no debe contaminar los tiempos.
+    """
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        gc.collect()
+        t0 = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - t0)
+    medida = {"segundos": min(tiempos)}
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        medida["pico_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return medida, resultado
+
+
+def latencias(fn, argumentos):
+    """Tiempo por llamada de `fn` sobre cada argumento (media, p50 y p99 en ms)."""
+    ms = []
+    for arg in argumentos:
+        t0 = time.perf_counter()
+        fn(arg)
+        ms.append((time.perf_counter() - t0) * 1000)
+    ms = np.array(ms)
+    return {
+        "llamadas": len(ms),
+        "media_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def perfiles_aleatorios(indice, n, semilla=0):
+    """Perfiles de usuario variados, con las mismas opciones que ofrece la app."""
+    rng = np.random.default_rng(semilla)
+    marcas = list(indice.categorias["MARCA"])
+    tipos = list(indice.categorias["TIPO_SIMPLIFICADO"])
+    perfiles = []
+    for _ in range(n):
+        precio_min = int(rng.choice([0, 0, 2000, 5000]))
+        cc_min = int(rng.choice([0, 0, 125, 500]))
+        perfiles.append({
+            "presupuesto_max": int(rng.integers(precio_min + 1000, 50000)),
+            "precio_min": precio_min,
+            "carnet": str(rng.choice(list(CARNET_ORDEN))),
+            "altura": int(rng.integers(150, 200)),
+            "cilindrada_min": cc_min,
+            "cilindrada_max": int(rng.integers(cc_min + 50, 2000)),
+            "marca": [str(rng.choice(marcas))] if rng.random() < 0.3 else None,
+            "tipos": list(rng.choice(tipos, size=rng.integers(1, len(tipos) + 1), replace=False)),
+        })
+    return perfiles
+
+
+def _recomendar(indice, perfil, cache):
+    return recomendar_motos(
+        indice.df, perfil["presupuesto_max"], perfil["carnet"], perfil["altura"],
+        precio_min=perfil["precio_min"], marca=perfil["marca"], tipos=perfil["tipos"],
+        cilindrada_min=perfil["cilindrada_min"], cilindrada_max=perfil["cilindrada_max"],
+        indice=indice, cache=cache,
+    )
+
+
+def benchmark_tamano(base, n, directorio, consultas=200, memoria=True):
+    """Ejecuta todos los benchmarks sobre un catálogo sintético de `n` motos."""
+    res = {}
+    path_csv = str(Path(directorio) / f"sintetico_{n}.csv")
+    generar_catalogo(base, n).to_csv(path_csv, index=False)
+    dir_cache = str(Path(directorio) / "cache")
+
+    res["cargar_csv"], df = medir(lambda: leer_y_preprocesar(path_csv), memoria=memoria)
+    hash_csv = hash_fuente(path_csv)
+    res["compilar"], _ = medir(lambda: guardar_catalogo_compilado(df, path_csv, hash_csv, dir_cache), memoria=memoria)
+    res["cargar_compilado"], df = medir(lambda: cargar_catalogo(path_csv, dir_cache), repeticiones=3, memoria=memoria)
+
+    res["indice"], indice = medir(lambda: CatalogIndex(df), memoria=memoria)
+    perfiles = perfiles_aleatorios(indice, consultas)
+
+    res["recomendar"] = latencias(lambda p: _recomendar(indice, p, None), perfiles)
+    cache = QueryCache()
+    for p in perfiles:
+        _recomendar(indice, p, cache)
+    res["recomendar_cache"] = latencias(lambda p: _recomendar(indice, p, cache), perfiles)
+
+    facetas = FacetCounter(indice)
+    res["facetas"] = latencias(
+        lambda p: facetas.contar(
+            p["presupuesto_max"], CARNET_ORDEN[p["carnet"]], p["altura"],
+            precio_min=p["precio_min"], marca=p["marca"], tipos=p["tipos"],
+            cilindrada_min=p["cilindrada_min"], cilindrada_max=p["cilindrada_max"],
+        ),
+        perfiles,
+    )
+
+    lote = pd.DataFrame(perfiles_aleatorios(indice, 10_000, semilla=1))
+    res["recomendar_lote_10k"], _ = medir(lambda: recomendar_motos_batch(indice, lote), memoria=memoria)
+
+    paginas = [indice.orden_completo("PRECIO")[i * 9:(i + 1) * 9] for i in range(100)]
+    res["tarjeta_por_fila"] = latencias(
+        lambda ids: [_render_single_card_html(fila) for fila in df.iloc[ids].itertuples()], paginas
+    )
+    # Cada página es distinta: todas las tarjetas se generan en frío
+    renderer = CardRenderer(indice)
+    res["tarjetas_lote"] = latencias(renderer.tarjetas, paginas)
+
+    res["cubo"], cubo = medir(lambda: construir_cubo(df), memoria=memoria)
+    # Datos reducidos de los gráficos: cada combinación de filtros se calcula en frío
+    graficos = GraficosDashboard(indice, cubo)
+    combinaciones = [("Todos", "Todas")] + [(t, "Todas") for t in indice.categorias["TIPO_SIMPLIFICADO"]] + [
+        ("Todos", m) for m in indice.categorias["MARCA"][:10]
+    ]
+    res["graficos"] = latencias(lambda c: graficos.obtener(*c), combinaciones)
+
+    res["similares_construir"], similares = medir(lambda: SimilarBikesIndex(indice), memoria=memoria)
+    filas = np.random.default_rng(2).integers(0, n, size=consultas).tolist()
+    res["similares"] = latencias(lambda f: similares.similares(f, carnet_usuario=2, altura=170), filas)
+    return res
+
+
+def comparar(path_base, path_nuevo, umbral=1.25):
+    """
+    Compara dos ficheros de resultados y muestra el cociente nuevo / base.
+
+    Returns:
+        int: Número de mediciones que empeoran más que `umbral`.
+    """
+    base = json.loads(Path(path_base).read_text(encoding="utf-8"))
+    nuevo = json.loads(Path(path_nuevo).read_text(encoding="utf-8"))
+    print(f"{'tamaño':>9}  {'prueba':<22} {'base':>10} {'nuevo':>10} {'x':>6}")
+    regresiones = 0
+    for n, pruebas in nuevo["resultados"].items():
+        for prueba, medida in pruebas.items():
+            anterior = base["resultados"].get(n, {}).get(prueba)
+            if anterior is None:
+                continue
+            metrica = "segundos" if "segundos" in medida else "p50_ms"
+            cociente = medida[metrica] / anterior[metrica] if anterior[metrica] else float("inf")
+            marca = "  <-- regresión" if cociente > umbral else ""
+            regresiones += cociente > umbral
+            print(f"{n:>9}  {prueba:<22} {anterior[metrica]:>10.4f} {medida[metrica]:>10.4f} {cociente:>6.2f}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de MotoFit sobre catálogos sintéticos.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS, help="Tamaños de catálogo")
+    parser.add_argument("--base", default=str(ROOT / "data" / "motofit_demo.csv"), help="Catálogo real de partida")
+    parser.add_argument("--consultas", type=int, default=200, help="Consultas por prueba de latencia")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir el pico de memoria")
+    parser.add_argument("-o", "--salida", help="JSON de resultados (por defecto benchmarks/<commit>.json)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos JSON de resultados")
+    parser.add_argument("--umbral", type=float, default=1.25, help="Cociente a partir del cual hay regresión")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar, umbral=args.umbral) else 0)
+
+    commit = commit_actual()
+    base = leer_y_preprocesar(args.base)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for n in args.tamanos:
+            print(f"Catálogo de {n} motos...", file=sys.stderr)
+            resultados[str(n)] = benchmark_tamano(base, n, directorio, args.consultas, not args.sin_memoria)
+
+    salida = Path(args.salida) if args.salida else ROOT / "benchmarks" / f"{commit}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps({
+        "commit": commit,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# scripts/load_test.py
+"""
+Prueba de carga del servicio de consultas (`python -m src.query_service`).
+
+Lanza peticiones POST /recomendar con perfiles aleatorios desde N conexiones
+keep-alive simultáneas y, para cada nivel de concurrencia, muestra latencia
+p50/p99 y peticiones por segundo:
+
+    python scripts/load_test.py --url http://127.0.0.1:8080 --concurrencia 1 4 16 64
+"""
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+
+async def _peticion(reader, writer, host, metodo, ruta, cuerpo=None):
+    datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+    writer.write(
+        f"{metodo} {ruta} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(datos)}\r\n\r\n".encode() + datos
+    )
+    await writer.drain()
+    estado = int((await reader.readline()).split()[1])
+    longitud = 0
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        if nombre.strip().lower() == "content-length":
+            longitud = int(valor)
+    respuesta = await reader.readexactly(longitud)
+    return estado, json.loads(respuesta)
+
+
+def perfil_aleatorio(catalogo, rng):
+    precio_min = rng.choice([0, 0, 2000, 5000])
+    return {
+        "presupuesto_max": rng.randint(precio_min + 1000, 50000),
+        "precio_min": precio_min,
+        "carnet": rng.choice(catalogo["carnets"]),
+        "altura": rng.randint(150, 199),
+        "cilindrada_max": rng.choice([500, 750, 1000, 2000]),
+        "marca": [rng.choice(catalogo["marcas"])] if rng.random() < 0.3 else None,
+        "tipos": rng.sample(catalogo["tipos"], rng.randint(1, len(catalogo["tipos"]))),
+    }
+
+
+async def _cliente(host, puerto, catalogo, fin, latencias, errores, semilla):
+    rng = random.Random(semilla)
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            estado, _ = await _peticion(reader, writer, host, "POST", "/recomendar", perfil_aleatorio(catalogo, rng))
+            latencias.append(time.perf_counter() - t0)
+            if estado != 200:
+                errores.append(estado)
+    finally:
+        writer.close()
+
+
+async def nivel(host, puerto, catalogo, concurrencia, duracion):
+    """Mide un nivel de concurrencia durante `duracion` segundos."""
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*[
+        _cliente(host, puerto, catalogo, fin, latencias, errores, semilla=i) for i in range(concurrencia)
+    ])
+    total = time.perf_counter() - inicio
+    ms = np.array(latencias) * 1000
+    return {
+        "concurrencia": concurrencia,
+        "peticiones": len(ms),
+        "errores": len(errores),
+        "rps": len(ms) / total,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+    }
+
+
+async def ejecutar(url, concurrencias, duracion):
+    partes = urlsplit(url)
+    host, puerto = partes.hostname, partes.port or 80
+    reader, writer = await asyncio.open_connection(host, puerto)
+    _, catalogo = await _peticion(reader, writer, host, "GET", "/catalogo")
+    writer.close()
+    print(f"Catálogo {catalogo['version']}: {catalogo['motos']} motos", file=sys.stderr)
+
+    resultados = []
+    print(f"{'conc.':>6} {'peticiones':>11} {'errores':>8} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for c in concurrencias:
+        r = await nivel(host, puerto, catalogo, c, duracion)
+        resultados.append(r)
+        print(f"{r['concurrencia']:>6} {r['peticiones']:>11} {r['errores']:>8} {r['rps']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de consultas de MotoFit.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="URL base del servicio")
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="Niveles de concurrencia (conexiones simultáneas)")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por nivel")
+    parser.add_argument("-o", "--salida", help="Guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    resultados = asyncio.run(ejecutar(args.url, args.concurrencia, args.duracion))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "duracion": args.duracion, "resultados": resultados}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 # scripts/prepare_public_release.py
 from pathlib import Path
 import pandas as pd
-import re, shutil, os, random
+import re, shutil, os, random, sys
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from src.catalog_history import CatalogHistory
+from src.data_preprocessing import cargar_catalogo
+
 DATA = ROOT / "data"
 ASSETS = ROOT / "assets" / "logos"
 DATA.mkdir(parents=True, exist_ok=True)
@@ -55,6 +59,10 @@ OUT = DATA / "motofit_demo.csv"
 df_demo.to_csv(OUT, index=False)
 print(f"Demo guardado: {OUT} ({len(df_demo)} filas)")
 
+# 5b) Registrar la versión en el historial (solo guarda las filas que cambian)
+version = CatalogHistory(str(DATA / "historial")).registrar(cargar_catalogo(str(OUT), directorio_cache=None))
+print(f"Historial: versión {version['version']} ({version['cambios']} filas en el delta)")
+
 # 6) Limpiar logos inexistentes (opcional: dejar solo los de marcas_demo)
 if ASSETS.exists():
     for logo in ASSETS.glob("*.png"):
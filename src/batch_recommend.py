@@ -0,0 +1,116 @@
+# src/batch_recommend.py
+import sys
+import json
+import argparse
+import itertools
+import pandas as pd
+
+from src.catalog_cache import DIRECTORIO_CACHE
+from src.catalog_index import CatalogIndex
+from src.data_preprocessing import cargar_catalogo
+from src.recommender_logic import recomendar_motos_batch
+
+
+def leer_perfiles(path, tam_bloque=5000):
+    """
+    Lee perfiles de usuario por bloques desde un CSV o un JSONL.
+
+    Args:
+        path (str): Ruta del fichero ('-' para leer JSONL de la entrada estándar).
+        tam_bloque (int, opcional): Número de perfiles por bloque.
+
+    Yields:
+        pd.DataFrame: Bloques de como mucho `tam_bloque` perfiles.
+    """
+    if path.lower().endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=tam_bloque)
+        return
+
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        lineas = (linea for linea in f if linea.strip())
+        while True:
+            bloque = [json.loads(linea) for linea in itertools.islice(lineas, tam_bloque)]
+            if not bloque:
+                break
+            yield pd.DataFrame(bloque)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def recomendar_fichero(indice, entrada, salida, top_n=9, ordenar_por='PRECIO', ascendente=True, tam_bloque=5000):
+    """
+    Genera recomendaciones para un fichero de perfiles y las escribe en JSONL.
+
+    Los perfiles se procesan por bloques y cada bloque se escribe en cuanto está
+    calculado, así que la memoria no depende del tamaño del fichero.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+        entrada (str): Fichero de perfiles (CSV o JSONL).
+        salida (TextIO): Destino de las líneas JSONL.
+        top_n (int, opcional): Motos por perfil.
+        ordenar_por (str, opcional): Columna de ordenación.
+        ascendente (bool, opcional): Dirección de la ordenación.
+        tam_bloque (int, opcional): Perfiles por bloque.
+
+    Returns:
+        int: Número de perfiles procesados.
+    """
+    marcas = indice.df['MARCA'].to_numpy()
+    modelos = indice.df['MODELO'].to_numpy()
+    procesados = 0
+
+    for bloque in leer_perfiles(entrada, tam_bloque):
+        resultados = recomendar_motos_batch(
+            indice, bloque, top_n=top_n, ordenar_por=ordenar_por, ascendente=ascendente
+        )
+        perfil_ids = bloque['id'].tolist() if 'id' in bloque.columns else range(procesados, procesados + len(bloque))
+        for perfil_id, ids in zip(perfil_ids, resultados):
+            salida.write(json.dumps({
+                "perfil": perfil_id,
+                "ids": ids.tolist(),
+                "motos": [f"{marcas[i]} {modelos[i]}" for i in ids],
+            }, ensure_ascii=False, default=str) + "\n")
+        salida.flush()
+        procesados += len(bloque)
+
+    return procesados
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI de recomendaciones por lotes."""
+    parser = argparse.ArgumentParser(
+        description="Recomienda motos para un fichero de perfiles (CSV o JSONL) y escribe JSONL."
+    )
+    parser.add_argument("perfiles", help="Fichero de perfiles (.csv o .jsonl; '-' para stdin)")
+    parser.add_argument("-o", "--salida", default="-", help="Fichero JSONL de salida ('-' para stdout)")
+    parser.add_argument("--catalogo", default="data/motofit_demo.csv", help="CSV del catálogo")
+    parser.add_argument("--cache-dir", default=DIRECTORIO_CACHE, help="Carpeta de catálogos compilados")
+    parser.add_argument("--top-n", type=int, default=9, help="Motos por perfil")
+    parser.add_argument("--ordenar-por", default="PRECIO",
+                        choices=["PRECIO", "POTENCIA", "ALTURA_ASIENTO", "PESO_VACIO"])
+    parser.add_argument("--descendente", action="store_true", help="Ordenar de forma descendente")
+    parser.add_argument("--bloque", type=int, default=5000, help="Perfiles por bloque")
+    args = parser.parse_args(argv)
+
+    indice = CatalogIndex(cargar_catalogo(args.catalogo, args.cache_dir))
+
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+    try:
+        total = recomendar_fichero(
+            indice, args.perfiles, salida,
+            top_n=args.top_n,
+            ordenar_por=args.ordenar_por,
+            ascendente=not args.descendente,
+            tam_bloque=args.bloque,
+        )
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    print(f"{total} perfiles procesados", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# src/bike_comparator.py
+import numpy as np
+import pandas as pd
+
+# Especificaciones que se comparan (en este orden)
+COLUMNAS_COMPARADAS = ['PRECIO', 'POTENCIA', 'CILINDRADA', 'PESO_VACIO', 'ALTURA_ASIENTO']
+
+# Columnas de las que dependen los percentiles
+COLUMNAS_COMPARADOR = COLUMNAS_COMPARADAS + ['TIPO_SIMPLIFICADO']
+
+MAX_COMPARADAS = 4
+
+# Etiqueta y unidad de cada especificación en la tabla comparativa
+ETIQUETAS = {
+    'PRECIO': ("💰 Precio", "€"),
+    'POTENCIA': ("🏍️ Potencia", "cv"),
+    'CILINDRADA': ("🔧 Cilindrada", "cc"),
+    'PESO_VACIO': ("⚖️ Peso", "kg"),
+    'ALTURA_ASIENTO': ("📏 Altura", "mm"),
+}
+
+
+def percentiles(valores, grupos=None):
+    """
+    Calcula el percentil de cada valor dentro de su grupo.
+
+    Se usa el rango medio: el percentil es el porcentaje de motos del grupo
+    con un valor menor más la mitad de las que tienen el mismo valor, así que
+    dos motos iguales comparten percentil y la mediana queda en 50.
+
+    Args:
+        valores (np.ndarray): Valores numéricos (NaN = sin dato).
+        grupos (np.ndarray, opcional): Código de grupo de cada valor (-1 = sin
+                                       grupo); por defecto, todo el catálogo.
+
+    Returns:
+        np.ndarray: Percentil (0-100, float32) de cada valor; NaN si no tiene
+                    dato o grupo.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if grupos is None:
+        grupos = np.zeros(len(valores), dtype=np.int64)
+    grupos = np.asarray(grupos, dtype=np.int64)
+    salida = np.full(len(valores), np.nan, dtype=np.float32)
+    validos = np.flatnonzero(~np.isnan(valores) & (grupos >= 0))
+    if not len(validos):
+        return salida
+
+    # Orden por (grupo, valor): cada grupo es un tramo ordenado del array
+    orden = validos[np.lexsort((valores[validos], grupos[validos]))]
+    g, v = grupos[orden], valores[orden]
+    inicio_grupo = np.searchsorted(g, g, side="left")
+    fin_grupo = np.searchsorted(g, g, side="right")
+    # Menores e iguales dentro del grupo: búsquedas sobre una clave entera
+    # (grupo, rango denso del valor), ordenada igual que el array
+    distintos, rango = np.unique(v, return_inverse=True)
+    clave = g * len(distintos) + rango
+    menores = np.searchsorted(clave, clave, side="left") - inicio_grupo
+    iguales = np.searchsorted(clave, clave, side="right") - inicio_grupo - menores
+    salida[orden] = 100.0 * (menores + 0.5 * iguales) / (fin_grupo - inicio_grupo)
+    return salida
+
+
+class ComparadorMotos:
+    """
+    Comparador de motos con los percentiles de cada especificación precalculados.
+
+    Al construirlo (una vez por versión del catálogo) se calcula, para cada
+    especificación de `COLUMNAS_COMPARADAS`, el percentil de cada moto dentro
+    de su tipo y dentro de todo el catálogo. Comparar motos es entonces leer
+    unas pocas posiciones de esos arrays, sin agrupar ni recalcular
+    estadísticas, y todas las sesiones comparten los mismos arrays de solo lectura.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+    """
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.version = indice.version
+        tipos = indice.codigos['TIPO_SIMPLIFICADO']
+        self.percentil_tipo = {}
+        self.percentil_global = {}
+        for col in COLUMNAS_COMPARADAS:
+            valores = indice.numericas[col]
+            self.percentil_tipo[col] = percentiles(valores, tipos)
+            self.percentil_global[col] = percentiles(valores)
+            self.percentil_tipo[col].setflags(write=False)
+            self.percentil_global[col].setflags(write=False)
+
+    def comparar(self, filas):
+        """
+        Devuelve las especificaciones de varias motos con sus percentiles.
+
+        Args:
+            filas (Iterable[int]): Ids de fila de las motos (como mucho `MAX_COMPARADAS`).
+
+        Returns:
+            pd.DataFrame: Una fila por moto y especificación, con las columnas
+                          "fila", "especificacion", "valor", "percentil_tipo" y
+                          "percentil_global".
+
+        Raises:
+            ValueError: Si se piden más de `MAX_COMPARADAS` motos.
+        """
+        filas = np.asarray(list(filas), dtype=np.int64)
+        if len(filas) > MAX_COMPARADAS:
+            raise ValueError(f"Se pueden comparar como mucho {MAX_COMPARADAS} motos.")
+        return pd.DataFrame({
+            "fila": np.tile(filas, len(COLUMNAS_COMPARADAS)),
+            "especificacion": np.repeat(COLUMNAS_COMPARADAS, len(filas)),
+            "valor": np.concatenate([self.indice.numericas[col][filas] for col in COLUMNAS_COMPARADAS]),
+            "percentil_tipo": np.concatenate([self.percentil_tipo[col][filas] for col in COLUMNAS_COMPARADAS]),
+            "percentil_global": np.concatenate([self.percentil_global[col][filas] for col in COLUMNAS_COMPARADAS]),
+        })
+
+
+def tabla_comparacion(comparacion, nombres):
+    """
+    Da forma de tabla a una comparación: una fila por especificación y una
+    columna por moto, con el valor y sus percentiles ("P62 tipo · P48 total").
+
+    Args:
+        comparacion (pd.DataFrame): Resultado de `ComparadorMotos.comparar`.
+        nombres (dict): Nombre a mostrar de cada id de fila.
+
+    Returns:
+        pd.DataFrame: Tabla de texto lista para `st.dataframe`.
+    """
+    def celda(fila):
+        if pd.isna(fila.valor):
+            return "N/A"
+        texto = f"{fila.valor:,.0f} {ETIQUETAS[fila.especificacion][1]}"
+        if not pd.isna(fila.percentil_tipo):
+            texto += f" · P{fila.percentil_tipo:.0f} tipo"
+        return texto + f" · P{fila.percentil_global:.0f} total"
+
+    tabla = comparacion.assign(
+        moto=comparacion["fila"].map(nombres),
+        celda=[celda(fila) for fila in comparacion.itertuples()],
+    ).pivot(index="especificacion", columns="moto", values="celda")
+    orden_motos = list(dict.fromkeys(comparacion["fila"].map(nombres)))
+    tabla = tabla.reindex(index=COLUMNAS_COMPARADAS, columns=orden_motos)
+    tabla.index = [ETIQUETAS[col][0] for col in tabla.index]
+    tabla.columns.name = None
+    return tabla
@@ -0,0 +1,184 @@
+# src/card_renderer.py
+import html
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from src.logo_cache import LOGOS
+from src.metrics import METRICAS
+
+# Estilos compartidos por todas las tarjetas; se inyectan una sola vez en la página
+CARD_CSS = """
+.mf-grid { display:grid; grid-template-columns:repeat(3, minmax(0, 1fr)); gap:1rem; }
+.mf-card {
+    background-color:#1e1e1e; border-radius:12px; padding:16px;
+    box-shadow:0 2px 6px rgba(0,0,0,0.4); color:#f0f0f0; text-align:center;
+    min-height:280px; margin-bottom:20px;
+}
+.mf-card h4 { color:#00cc99; margin:10px 0; }
+.mf-card ul { list-style:none; padding:0; text-align:left; font-size:0.9em; }
+"""
+
+# Columnas del catálogo que aparecen en una tarjeta
+COLUMNAS_TARJETA = ["MARCA", "MODELO", "PRECIO", "POTENCIA", "ALTURA_ASIENTO", "PESO_VACIO"]
+
+# Hilo que prepara las tarjetas de las páginas vecinas (compartido por todas las sesiones)
+_PRECARGA = ThreadPoolExecutor(max_workers=1, thread_name_prefix="motofit-tarjetas")
+
+_PLANTILLA = (
+    "<div class='mf-card'>{logo}<h4>{modelo}</h4><ul>"
+    "<li>💰 <b>Precio:</b> {precio}</li>"
+    "<li>🏍️ <b>Potencia:</b> {potencia}</li>"
+    "<li>📏 <b>Altura:</b> {altura}</li>"
+    "<li>⚖️ <b>Peso:</b> {peso}</li>"
+    "</ul></div>"
+)
+
+
+def _fmt(valor, unidad):
+    return "N/A" if pd.isna(valor) else f"{valor} {unidad}"
+
+
+def html_tarjeta(marca, modelo, precio, potencia, altura, peso, logo_tag=None):
+    """
+    Genera el HTML de una tarjeta de moto usando las clases de `CARD_CSS`.
+
+    Args:
+        marca (str): Marca de la moto.
+        modelo (str): Modelo de la moto.
+        precio (float): Precio en euros.
+        potencia (float): Potencia en cv.
+        altura (float): Altura del asiento en mm.
+        peso (float): Peso en vacío en kg.
+        logo_tag (str, opcional): Etiqueta <img> del logo; si no se indica se busca
+            en la caché de logos y, si la marca no tiene logo, se muestra su nombre.
+
+    Returns:
+        str: HTML de la tarjeta.
+    """
+    if logo_tag is None:
+        logo_tag = LOGOS.obtener_por_marca(marca) or f"<b>{html.escape(str(marca))}</b>"
+    return _PLANTILLA.format(
+        logo=logo_tag,
+        modelo=html.escape(str(modelo)),
+        precio=f"€{int(precio):,}" if not pd.isna(precio) else "N/A",
+        potencia=_fmt(potencia, "cv"),
+        altura=_fmt(altura, "mm"),
+        peso=_fmt(peso, "kg"),
+    )
+
+
+class CardRenderer:
+    """
+    Genera y memoriza el HTML de las tarjetas de una versión del catálogo.
+
+    Las tarjetas se construyen por lotes a partir de las columnas del
+    `CatalogIndex` y se guardan por id de fila, de modo que una página (o la
+    sección de favoritas) solo formatea las tarjetas que nunca se han mostrado.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo (define la versión).
+        max_entradas (int, opcional): Número máximo de tarjetas en memoria.
+    """
+
+    def __init__(self, indice, max_entradas=20000):
+        self.version = indice.version
+        self.max_entradas = max_entradas
+        self._marcas = indice.df["MARCA"].to_numpy()
+        self._modelos = indice.df["MODELO"].to_numpy()
+        self._precio = indice.numericas["PRECIO"]
+        self._potencia = indice.numericas["POTENCIA"]
+        self._altura = indice.numericas["ALTURA_ASIENTO"]
+        self._peso = indice.numericas["PESO_VACIO"]
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tarjetas(self, ids):
+        """
+        Devuelve el HTML de las tarjetas de los ids de fila dados, en el mismo orden.
+
+        Args:
+            ids (Iterable[int]): Ids de fila del catálogo.
+
+        Returns:
+            List[str]: HTML de cada tarjeta.
+        """
+        return self._generar(ids, "tarjetas")
+
+    def precargar(self, ids):
+        """
+        Genera en segundo plano las tarjetas de los ids que aún no están en memoria.
+
+        Se llama con las páginas vecinas de la que se acaba de mostrar, de modo
+        que al pasar de página sus tarjetas ya están hechas.
+
+        Args:
+            ids (Iterable[int]): Ids de fila del catálogo.
+
+        Returns:
+            Optional[Future]: La tarea en curso, o None si ya estaban todas.
+        """
+        ids = [int(i) for i in ids]
+        with self._lock:
+            faltan = [i for i in ids if i not in self._cache]
+        if not faltan:
+            return None
+        return _PRECARGA.submit(self._generar, faltan, "tarjetas.precarga")
+
+    def _generar(self, ids, etapa):
+        tramo = METRICAS.tramo(etapa)
+        ids = [int(i) for i in ids]
+        with self._lock:
+            encontradas = {i: self._cache.get(i) for i in ids}
+            for i, tarjeta in encontradas.items():
+                if tarjeta is not None:
+                    self._cache.move_to_end(i)
+
+        nuevas = np.array([i for i, tarjeta in encontradas.items() if tarjeta is None], dtype=np.int64)
+        if nuevas.size:
+            marcas = self._marcas[nuevas]
+            logos = {m: LOGOS.obtener_por_marca(m) or f"<b>{html.escape(str(m))}</b>" for m in set(marcas)}
+            generadas = [
+                html_tarjeta(m, mo, p, po, a, pe, logos[m])
+                for m, mo, p, po, a, pe in zip(
+                    marcas,
+                    self._modelos[nuevas],
+                    self._precio[nuevas],
+                    self._potencia[nuevas],
+                    self._altura[nuevas],
+                    self._peso[nuevas],
+                )
+            ]
+            with self._lock:
+                for i, tarjeta in zip(nuevas.tolist(), generadas):
+                    encontradas[i] = tarjeta
+                    self._cache[i] = tarjeta
+                while len(self._cache) > self.max_entradas:
+                    self._cache.popitem(last=False)
+
+        resultado = [encontradas[i] for i in ids]
+        if METRICAS.activo:
+            tramo.contar("cache_aciertos", len(encontradas) - int(nuevas.size))
+            tramo.contar("generadas", int(nuevas.size))
+            tramo.contar("bytes", sum(map(len, resultado)))
+        tramo.cerrar()
+        return resultado
+
+    def filas(self, ids, num_col=3):
+        """
+        Agrupa las tarjetas en filas de una rejilla CSS (un bloque HTML por fila).
+
+        Args:
+            ids (Iterable[int]): Ids de fila del catálogo, en orden de aparición.
+            num_col (int, opcional): Tarjetas por fila.
+
+        Returns:
+            List[str]: HTML de cada fila de la rejilla.
+        """
+        tarjetas = self.tarjetas(ids)
+        return [
+            f"<div class='mf-grid'>{''.join(tarjetas[i:i + num_col])}</div>"
+            for i in range(0, len(tarjetas), num_col)
+        ]
@@ -0,0 +1,150 @@
+# src/catalog_cache.py
+import os
+import glob
+import hashlib
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Carpeta por defecto para los catálogos compilados (configurable por entorno)
+DIRECTORIO_CACHE = os.environ.get("MOTOFIT_CATALOG_CACHE_DIR", os.path.join("data", "cache"))
+
+_CLAVE_HASH = b"motofit.source_sha256"
+_TAM_BLOQUE = 1 << 20
+
+
+def hash_fichero(path):
+    """
+    Calcula el SHA-256 del contenido de un fichero leyéndolo por bloques.
+
+    Args:
+        path (str): Ruta del fichero.
+
+    Returns:
+        str: Hash hexadecimal del contenido.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(_TAM_BLOQUE), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def ruta_compilado(path_csv, hash_csv, directorio=DIRECTORIO_CACHE):
+    """Ruta del catálogo compilado para un CSV y un hash de contenido dados."""
+    nombre = os.path.splitext(os.path.basename(path_csv))[0]
+    return os.path.join(directorio, f"{nombre}-{hash_csv[:16]}.arrow")
+
+
+def _a_tabla(df, hash_csv):
+    # Las columnas numéricas se guardan tal cual (NaN como valor, no como nulo)
+    # para que al leer desde el fichero mapeado en memoria no haya que copiarlas.
+    columnas = []
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype):
+            columnas.append(pa.array(serie.to_numpy()))
+        else:
+            columnas.append(pa.array(serie.astype(object).where(serie.notna(), None), type=pa.string()))
+    schema = pa.schema(
+        [pa.field(str(col), arr.type) for col, arr in zip(df.columns, columnas)],
+        metadata={_CLAVE_HASH: hash_csv.encode()},
+    )
+    return pa.Table.from_arrays(columnas, schema=schema)
+
+
+def guardar_catalogo_compilado(df, path_csv, hash_csv, directorio=DIRECTORIO_CACHE):
+    """
+    Escribe el catálogo ya limpio en formato Arrow IPC sin comprimir.
+
+    Los compilados anteriores del mismo CSV se eliminan. La escritura es atómica
+    (fichero temporal + rename), por lo que varios workers pueden compilar a la vez.
+
+    Args:
+        df (pd.DataFrame): Catálogo preprocesado.
+        path_csv (str): CSV de origen, usado para nombrar el compilado.
+        hash_csv (str): Hash de la fuente del catálogo, la única clave de la caché
+                        (ver `data_preprocessing.hash_fuente`: CSV + versión de las reglas de corrección).
+        directorio (str, opcional): Carpeta de la caché.
+
+    Returns:
+        str: Ruta del catálogo compilado.
+    """
+    destino = ruta_compilado(path_csv, hash_csv, directorio)
+    os.makedirs(directorio, exist_ok=True)
+
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    feather.write_feather(_a_tabla(df, hash_csv), tmp, compression="uncompressed")
+    os.replace(tmp, destino)
+
+    nombre = os.path.splitext(os.path.basename(path_csv))[0]
+    for antiguo in glob.glob(os.path.join(directorio, f"{nombre}-*.arrow")):
+        if antiguo != destino:
+            try:
+                os.remove(antiguo)
+            except OSError:
+                pass
+    return destino
+
+
+def leer_catalogo_compilado(path_csv, hash_csv, directorio=DIRECTORIO_CACHE, columnas=None):
+    """
+    Carga el catálogo compilado de un CSV si existe y coincide su hash.
+
+    El fichero se abre mapeado en memoria; las columnas numéricas se entregan
+    a pandas sin copia.
+
+    Args:
+        path_csv (str): CSV de origen.
+        hash_csv (str): Hash de la fuente del catálogo (ver `data_preprocessing.hash_fuente`).
+        directorio (str, opcional): Carpeta de la caché.
+        columnas (List[str], opcional): Leer solo estas columnas (se ignoran las
+                                        inexistentes); por defecto, todas.
+
+    Returns:
+        Optional[pd.DataFrame]: El catálogo o None si no hay un compilado válido.
+    """
+    ruta = ruta_compilado(path_csv, hash_csv, directorio)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        tabla = feather.read_table(ruta, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    metadata = tabla.schema.metadata or {}
+    if metadata.get(_CLAVE_HASH) != hash_csv.encode():
+        return None
+    if columnas is not None:
+        # Las columnas no pedidas ni siquiera se convierten a pandas
+        tabla = tabla.select([col for col in columnas if col in tabla.column_names])
+    return tabla.to_pandas(split_blocks=True)
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI: precompila catálogos en el despliegue."""
+    from src.data_preprocessing import hash_fuente, leer_y_preprocesar
+
+    parser = argparse.ArgumentParser(
+        description="Precompila uno o varios CSV de catálogo a Arrow IPC para acelerar el arranque."
+    )
+    parser.add_argument("csv", nargs="+", help="CSV de catálogo a compilar")
+    parser.add_argument("--cache-dir", default=DIRECTORIO_CACHE, help="Carpeta de la caché")
+    parser.add_argument("--force", action="store_true", help="Recompilar aunque el hash no haya cambiado")
+    args = parser.parse_args(argv)
+
+    for path_csv in args.csv:
+        hash_csv = hash_fuente(path_csv)
+        destino = ruta_compilado(path_csv, hash_csv, args.cache_dir)
+        if os.path.exists(destino) and not args.force:
+            print(f"Al día: {destino}")
+            continue
+        informe = []
+        df = leer_y_preprocesar(path_csv, informe=informe)
+        destino = guardar_catalogo_compilado(df, path_csv, hash_csv, args.cache_dir)
+        print(f"Compilado: {destino} ({len(df)} filas, {len(informe[0])} correcciones o avisos de las reglas)")
+
+
+if __name__ == "__main__":
+    main()
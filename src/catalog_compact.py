@@ -0,0 +1,199 @@
+# src/catalog_compact.py
+import os
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+from src.catalog_cache import DIRECTORIO_CACHE
+
+# Modo compacto de la app (activo salvo MOTOFIT_CATALOGO_COMPACTO=0)
+CATALOGO_COMPACTO = os.environ.get("MOTOFIT_CATALOGO_COMPACTO", "1").strip() != "0"
+
+# Columnas que usa la app; el resto se carga solo cuando se pide (ver `ColumnasDiferidas`)
+COLUMNAS_APP = [
+    'MARCA', 'MODELO', 'TIPO_SIMPLIFICADO', 'CARNET_MINIMO',
+    'PRECIO', 'CILINDRADA', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO',
+]
+
+# Columnas de pocos valores distintos: categóricas (códigos de 1 byte)
+COLUMNAS_CATEGORIA = ['MARCA', 'TIPO_SIMPLIFICADO']
+
+COLUMNAS_FLOAT32 = ['PRECIO', 'CILINDRADA', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO']
+
+# Carnets de menor a mayor (categórica ordenada)
+ORDEN_CARNET = ['AM', 'B', 'A1', 'A2', 'A']
+
+
+def compactar_catalogo(df, columnas=COLUMNAS_APP):
+    """
+    Devuelve el catálogo con tipos compactos y solo las columnas de la app.
+
+    - MARCA y TIPO_SIMPLIFICADO pasan a categóricas y CARNET_MINIMO a
+      categórica ordenada (AM < B < A1 < A2 < A, con los valores desconocidos
+      detrás), así que cada fila ocupa un byte en lugar de una cadena.
+    - Las columnas numéricas pasan a float32 (siete cifras significativas, de
+      sobra para precios, cilindradas, alturas, pesos y potencias).
+      `CatalogIndex` las usa tal cual, sin ampliarlas a float64.
+    - MODELO, casi único por fila, se queda como cadena (Arrow).
+
+    Args:
+        df (pd.DataFrame): Catálogo preprocesado.
+        columnas (List[str], opcional): Columnas a conservar (se ignoran las inexistentes).
+
+    Returns:
+        pd.DataFrame: Catálogo compacto, con el mismo índice de filas.
+    """
+    compacto = {}
+    for col in columnas:
+        if col not in df.columns:
+            continue
+        serie = df[col]
+        if col in COLUMNAS_FLOAT32:
+            serie = pd.to_numeric(serie, errors="coerce").astype(np.float32)
+        elif col == 'CARNET_MINIMO':
+            presentes = pd.unique(serie.dropna().astype(str))
+            categorias = ORDEN_CARNET + sorted(set(presentes) - set(ORDEN_CARNET))
+            serie = serie.astype(pd.CategoricalDtype(categorias, ordered=True))
+        elif col in COLUMNAS_CATEGORIA:
+            serie = serie.astype("category").cat.remove_unused_categories()
+        compacto[col] = serie
+    return pd.DataFrame(compacto, index=df.index)
+
+
+class ColumnasDiferidas:
+    """
+    Columnas del catálogo que el modo compacto no carga, leídas bajo demanda.
+
+    La primera vez que se pide una columna se lee del catálogo compilado
+    (mapeado en memoria) y se guarda. Antes de usarla se comprueba con los ids
+    estables (MARCA + MODELO) que el compilado sigue siendo la versión cargada.
+
+    Args:
+        path_local (str): CSV del catálogo.
+        directorio_cache (str, opcional): Carpeta de los catálogos compilados.
+    """
+
+    def __init__(self, path_local, directorio_cache=DIRECTORIO_CACHE):
+        self.path_local = path_local
+        self.directorio_cache = directorio_cache
+        self._columnas = {}
+        self._lock = threading.Lock()
+
+    def leer(self, columnas, id_moto):
+        """
+        Devuelve las columnas pedidas que existan en el catálogo compilado.
+
+        Args:
+            columnas (Iterable[str]): Columnas a leer.
+            id_moto (np.ndarray): Ids estables de las filas cargadas (`CatalogIndex.id_moto`).
+
+        Returns:
+            dict: Columna -> valores de todas las filas (las inexistentes se omiten).
+
+        Raises:
+            ValueError: Si el catálogo compilado ya no corresponde a las filas cargadas.
+        """
+        from src.catalog_index import ids_moto
+        from src.data_preprocessing import cargar_catalogo
+
+        with self._lock:
+            faltan = [col for col in columnas if col not in self._columnas]
+            if faltan:
+                df = cargar_catalogo(
+                    self.path_local, self.directorio_cache, columnas=[*faltan, 'MARCA', 'MODELO']
+                )
+                if len(df) != len(id_moto) or not np.array_equal(ids_moto(df['MARCA'], df['MODELO']), id_moto):
+                    raise ValueError(f"El catálogo {self.path_local} ha cambiado desde que se cargó.")
+                for col in faltan:
+                    # None: la columna no existe en el catálogo (no se vuelve a buscar)
+                    self._columnas[col] = df[col].array if col in df.columns else None
+            return {col: self._columnas[col] for col in columnas if self._columnas.get(col) is not None}
+
+
+def bytes_por_fila(df):
+    """
+    Calcula la memoria por fila de cada columna de un catálogo.
+
+    Args:
+        df (pd.DataFrame): Catálogo.
+
+    Returns:
+        pd.Series: Bytes por fila de cada columna (incluidas las cadenas).
+    """
+    return df.memory_usage(deep=True, index=False) / max(len(df), 1)
+
+
+def bytes_indice(indice):
+    """
+    Calcula la memoria por fila de las estructuras propias de un `CatalogIndex`.
+
+    Solo cuenta los arrays que el índice posee; las vistas de las columnas del
+    catálogo (p. ej. las numéricas que ya eran float) no suman.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+
+    Returns:
+        float: Bytes por fila.
+    """
+    def propios(valor):
+        if isinstance(valor, np.ndarray):
+            return valor.nbytes if valor.base is None else 0
+        if isinstance(valor, dict):
+            return sum(propios(v) for v in valor.values())
+        return 0
+
+    total = sum(
+        propios(getattr(indice, nombre))
+        for nombre in ("numericas", "orden", "ordenados", "codigos", "bitmaps", "carnet_ordinal", "id_moto", "_orden_id")
+    )
+    return total / max(indice.n, 1)
+
+
+def informe_memoria(df, compacto):
+    """
+    Compara la memoria por fila del catálogo completo y del compacto.
+
+    Args:
+        df (pd.DataFrame): Catálogo completo, tal y como lo devuelve `cargar_catalogo`.
+        compacto (pd.DataFrame): El mismo catálogo tras `compactar_catalogo`.
+
+    Returns:
+        pd.DataFrame: Una fila por columna y una de total, con el tipo y los bytes
+                      por fila antes y después (0 si la columna se carga bajo demanda).
+    """
+    antes = bytes_por_fila(df)
+    despues = bytes_por_fila(compacto)
+    informe = pd.DataFrame({
+        "tipo_antes": df.dtypes.astype(str),
+        "bytes_fila_antes": antes,
+        "tipo_despues": compacto.dtypes.astype(str).reindex(df.columns, fill_value="(bajo demanda)"),
+        "bytes_fila_despues": despues.reindex(df.columns, fill_value=0.0),
+    })
+    informe.loc["TOTAL"] = ["", antes.sum(), "", despues.sum()]
+    return informe.round(1)
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI: bytes por fila del catálogo completo y del compacto."""
+    from src.catalog_index import CatalogIndex
+    from src.data_preprocessing import cargar_catalogo
+
+    parser = argparse.ArgumentParser(
+        description="Compara la memoria por fila del catálogo completo y del compacto (y de sus índices)."
+    )
+    parser.add_argument("csv", help="CSV del catálogo")
+    parser.add_argument("--cache-dir", default=DIRECTORIO_CACHE, help="Carpeta de los catálogos compilados")
+    args = parser.parse_args(argv)
+
+    df = cargar_catalogo(args.csv, args.cache_dir)
+    compacto = compactar_catalogo(df)
+    print(f"{len(df)} motos")
+    print(informe_memoria(df, compacto).to_string())
+    antes, despues = bytes_indice(CatalogIndex(df)), bytes_indice(CatalogIndex(compacto))
+    print(f"\nÍndice (CatalogIndex): {antes:.1f} -> {despues:.1f} bytes por fila")
+
+
+if __name__ == "__main__":
+    main()
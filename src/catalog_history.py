@@ -0,0 +1,451 @@
+# src/catalog_history.py
+import os
+import json
+import bisect
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from src.catalog_index import ids_moto
+
+# Carpeta por defecto del historial de versiones del catálogo (configurable por entorno)
+DIRECTORIO_HISTORIAL = os.environ.get("MOTOFIT_HISTORIAL_DIR", os.path.join("data", "historial"))
+
+# Se guarda una copia completa (checkpoint) cuando las filas de los deltas
+# desde la anterior superan esta fracción del catálogo: así los checkpoints
+# ocupan como mucho ~1/FRACCION veces lo que los deltas y cargar una versión
+# nunca aplica más de esa fracción del catálogo en cambios
+FRACCION_CHECKPOINT = float(os.environ.get("MOTOFIT_HISTORIAL_CHECKPOINT", "0.5"))
+
+# Deltas seguidos como mucho sin checkpoint (acota los ficheros que se leen por carga)
+MAX_DELTAS_SEGUIDOS = 64
+
+COLUMNA_ID = 'ID_MOTO'
+COLUMNA_BAJA = 'BAJA'
+
+_INDICE = "indice.json"
+
+
+def _fecha(fecha):
+    # Instante naive en UTC; None = ahora
+    ts = pd.Timestamp.now(tz="UTC") if fecha is None else pd.Timestamp(fecha)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts
+
+
+def _limite(fecha):
+    # Un día sin hora ("2025-03-01") cuenta entero: vale lo registrado hasta su final
+    ts = _fecha(fecha)
+    if isinstance(fecha, str) and len(fecha.strip()) <= 10:
+        return ts + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    return ts
+
+
+def _con_ids(df):
+    # Ids estables de MARCA + MODELO; si el catálogo repite una moto se queda la
+    # primera (como `deduplicar` en la ingesta)
+    ids = ids_moto(df['MARCA'], df['MODELO'])
+    unicas = ~pd.Series(ids).duplicated().to_numpy()
+    df = df.drop(columns=[COLUMNA_ID, COLUMNA_BAJA], errors="ignore")[unicas].reset_index(drop=True)
+    return df.assign(**{COLUMNA_ID: ids[unicas]})
+
+
+def _distintas(anterior, nuevo):
+    # Máscara de las filas emparejadas (mismo orden) con alguna columna de `nuevo` distinta
+    distintas = np.zeros(len(nuevo), dtype=bool)
+    for col in nuevo.columns:
+        if col == COLUMNA_ID:
+            continue
+        y = nuevo[col].reset_index(drop=True)
+        if col not in anterior.columns:
+            distintas |= y.notna().to_numpy()
+            continue
+        x = anterior[col].reset_index(drop=True)
+        if x.dtype != y.dtype:
+            x, y = x.astype(object), y.astype(object)
+        distintas |= ~((x == y) | (x.isna() & y.isna())).to_numpy(dtype=bool, na_value=False)
+    return distintas
+
+
+def calcular_delta(anterior, nuevo):
+    """
+    Calcula las filas que cambian entre dos versiones del catálogo.
+
+    Las motos se emparejan por su id estable (`COLUMNA_ID`, ver `ids_moto`).
+    El delta lleva la fila completa de cada moto nueva o con algún valor
+    distinto y, para cada moto que desaparece, solo su id con `BAJA` = True.
+
+    Args:
+        anterior (pd.DataFrame): Versión previa, con `COLUMNA_ID`.
+        nuevo (pd.DataFrame): Versión nueva, con `COLUMNA_ID`.
+
+    Returns:
+        pd.DataFrame: Filas del delta, con las columnas de `nuevo` y `BAJA`.
+    """
+    posicion = pd.Index(anterior[COLUMNA_ID]).get_indexer(nuevo[COLUMNA_ID])
+    cambian = posicion < 0
+    comunes = np.flatnonzero(~cambian)
+    cambian[comunes] = _distintas(anterior.iloc[posicion[comunes]], nuevo.iloc[comunes])
+
+    bajas = ~np.isin(anterior[COLUMNA_ID].to_numpy(), nuevo[COLUMNA_ID].to_numpy())
+    delta = nuevo[cambian].assign(**{COLUMNA_BAJA: False})
+    if bajas.any():
+        delta = pd.concat(
+            [delta, pd.DataFrame({COLUMNA_ID: anterior[COLUMNA_ID].to_numpy()[bajas], COLUMNA_BAJA: True})],
+            ignore_index=True,
+        )
+    return delta.reset_index(drop=True)
+
+
+def aplicar_delta(df, delta):
+    """
+    Aplica un delta (o varios concatenados en orden) a una versión del catálogo.
+
+    Las motos modificadas conservan su posición, las nuevas van al final y las
+    dadas de baja se eliminan. Si una moto aparece en varios deltas, cuenta el último.
+
+    Args:
+        df (pd.DataFrame): Versión de partida, con `COLUMNA_ID`.
+        delta (pd.DataFrame): Filas de `calcular_delta`.
+
+    Returns:
+        pd.DataFrame: La versión resultante, con el índice reiniciado.
+    """
+    delta = delta.drop_duplicates(COLUMNA_ID, keep="last")
+    posicion = pd.Index(df[COLUMNA_ID]).get_indexer(delta[COLUMNA_ID])
+    tocadas = np.zeros(len(df), dtype=bool)
+    tocadas[posicion[posicion >= 0]] = True
+
+    vivas = ~delta[COLUMNA_BAJA].to_numpy(dtype=bool)
+    # Cada fila del delta ocupa el sitio de la que sustituye; las nuevas, detrás
+    sitio = np.where(posicion >= 0, posicion, len(df) + np.arange(len(delta)))[vivas]
+    orden = np.argsort(np.concatenate([np.flatnonzero(~tocadas), sitio]), kind="stable")
+    resultado = pd.concat([df[~tocadas], delta[vivas].drop(columns=COLUMNA_BAJA)], ignore_index=True)
+    return resultado.iloc[orden].reset_index(drop=True)
+
+
+class CatalogHistory:
+    """
+    Historial de versiones del catálogo: una copia base y deltas por fila.
+
+    Cada versión registrada guarda solo las filas que cambian respecto a la
+    anterior (ver `calcular_delta`), en Arrow IPC comprimido. De vez en cuando
+    se guarda además una copia completa (checkpoint), cuando los cambios
+    acumulados desde la última superan `FRACCION_CHECKPOINT` del catálogo o
+    cambian las columnas. Cargar una versión es leer su checkpoint más
+    cercano y aplicar de una vez los deltas que le siguen, sin reconstruir la
+    historia desde el principio; el índice (`indice.json`) guarda la fecha y
+    los ficheros de cada versión para encontrarlos con una búsqueda binaria.
+    Lo que ocupa el historial crece con los cambios, no con el tamaño del
+    catálogo por el número de versiones.
+
+    Args:
+        directorio (str, opcional): Carpeta del historial.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_HISTORIAL):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._cabeza = None  # (versión, catálogo con ids) de la última registrada
+        self._versiones = self._leer_indice()
+
+    def _leer_indice(self):
+        try:
+            with open(os.path.join(self.directorio, _INDICE), encoding="utf-8") as f:
+                return json.load(f)["versiones"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _guardar_indice(self):
+        ruta = os.path.join(self.directorio, _INDICE)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"versiones": self._versiones}, f, indent=1, ensure_ascii=False)
+        os.replace(tmp, ruta)
+
+    def _escribir(self, df, nombre):
+        tmp = os.path.join(self.directorio, f"{nombre}.{os.getpid()}.tmp")
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp, compression="zstd")
+        os.replace(tmp, os.path.join(self.directorio, nombre))
+        return nombre
+
+    def _leer(self, nombre, columnas=None):
+        tabla = feather.read_table(os.path.join(self.directorio, nombre), memory_map=True)
+        if columnas is not None:
+            tabla = tabla.select([col for col in columnas if col in tabla.column_names])
+        return tabla
+
+    def __len__(self):
+        return len(self._versiones)
+
+    def versiones(self):
+        """
+        Devuelve el índice del historial.
+
+        Returns:
+            pd.DataFrame: Una fila por versión con su fecha, filas del catálogo,
+                          filas del delta y si tiene checkpoint.
+        """
+        return pd.DataFrame(
+            [
+                {
+                    "version": v["version"],
+                    "fecha": pd.Timestamp(v["fecha"]),
+                    "filas": v["filas"],
+                    "cambios": v["cambios"],
+                    "checkpoint": v["completo"] is not None,
+                }
+                for v in self._versiones
+            ],
+            columns=["version", "fecha", "filas", "cambios", "checkpoint"],
+        )
+
+    def version_a_fecha(self, fecha):
+        """
+        Devuelve la versión vigente en una fecha: la última registrada hasta entonces.
+
+        Args:
+            fecha (str | datetime): Instante; si es un día sin hora ("2025-03-01"),
+                                    cuenta lo registrado durante todo ese día.
+
+        Returns:
+            Optional[int]: Número de versión o None si no hay ninguna anterior.
+        """
+        fechas = [pd.Timestamp(v["fecha"]) for v in self._versiones]
+        posicion = bisect.bisect_right(fechas, _limite(fecha))
+        return posicion - 1 if posicion else None
+
+    def _cargar_con_ids(self, version):
+        if self._cabeza is not None and self._cabeza[0] == version:
+            return self._cabeza[1]
+        if not 0 <= version < len(self._versiones):
+            raise ValueError(f"No existe la versión {version} del catálogo ({len(self._versiones)} registradas).")
+        base = version
+        while self._versiones[base]["completo"] is None:
+            base -= 1
+        df = self._leer(self._versiones[base]["completo"]).to_pandas()
+        deltas = [self._leer(v["delta"]) for v in self._versiones[base + 1:version + 1]]
+        if deltas:
+            delta = pa.concat_tables(deltas, promote_options="permissive").to_pandas()
+            df = aplicar_delta(df, delta)
+        return df[self._versiones[version]["columnas"] + [COLUMNA_ID]]
+
+    def cargar(self, version=None):
+        """
+        Carga una versión del catálogo.
+
+        Args:
+            version (int, opcional): Número de versión; por defecto, la última.
+
+        Returns:
+            pd.DataFrame: El catálogo de esa versión, con las columnas con que se registró.
+
+        Raises:
+            ValueError: Si la versión no existe.
+        """
+        version = len(self._versiones) - 1 if version is None else version
+        return self._cargar_con_ids(version).drop(columns=COLUMNA_ID)
+
+    def cargar_a_fecha(self, fecha):
+        """
+        Carga el catálogo tal y como estaba en una fecha (ver `version_a_fecha`).
+
+        Args:
+            fecha (str | datetime): Instante o día.
+
+        Returns:
+            pd.DataFrame: El catálogo vigente en esa fecha.
+
+        Raises:
+            ValueError: Si no hay ninguna versión registrada hasta esa fecha.
+        """
+        version = self.version_a_fecha(fecha)
+        if version is None:
+            raise ValueError(f"No hay versiones del catálogo registradas hasta {fecha}.")
+        return self.cargar(version)
+
+    def registrar(self, df, fecha=None):
+        """
+        Registra una nueva versión del catálogo.
+
+        Si no cambia nada respecto a la última versión, no se escribe nada.
+
+        Args:
+            df (pd.DataFrame): Catálogo preprocesado (ver `cargar_catalogo`).
+            fecha (str | datetime, opcional): Fecha de la versión; por defecto, ahora.
+
+        Returns:
+            dict: Entrada del índice de la versión (la última si no había cambios).
+
+        Raises:
+            ValueError: Si la fecha es anterior a la de la última versión.
+        """
+        fecha = _fecha(fecha)
+        nuevo = _con_ids(df)
+        columnas = [col for col in nuevo.columns if col != COLUMNA_ID]
+        with self._lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            numero = len(self._versiones)
+            entrada = {
+                "version": numero,
+                "fecha": fecha.isoformat(),
+                "filas": len(nuevo),
+                "columnas": columnas,
+                "delta": None,
+                "completo": None,
+                "cambios": len(nuevo),
+            }
+            checkpoint = not numero
+            if numero:
+                ultima = self._versiones[-1]
+                if fecha < pd.Timestamp(ultima["fecha"]):
+                    raise ValueError(f"La fecha {fecha} es anterior a la de la última versión ({ultima['fecha']}).")
+                delta = calcular_delta(self._cargar_con_ids(numero - 1), nuevo)
+                if not len(delta) and columnas == ultima["columnas"]:
+                    return ultima
+                entrada["delta"] = self._escribir(delta, f"v{numero:06d}.delta.arrow")
+                entrada["cambios"] = len(delta)
+
+                # Cambios acumulados desde el último checkpoint
+                acumulados, seguidos = 0, 0
+                for v in reversed(self._versiones + [entrada]):
+                    if v["completo"] is not None:
+                        break
+                    acumulados, seguidos = acumulados + v["cambios"], seguidos + 1
+                checkpoint = (
+                    acumulados >= FRACCION_CHECKPOINT * max(len(nuevo), 1)
+                    or seguidos >= MAX_DELTAS_SEGUIDOS
+                    or columnas != ultima["columnas"]
+                )
+            if checkpoint:
+                entrada["completo"] = self._escribir(nuevo, f"v{numero:06d}.completo.arrow")
+
+            self._versiones.append(entrada)
+            self._guardar_indice()
+            self._cabeza = (numero, nuevo)
+            return entrada
+
+    def historial_precios(self, ids=None):
+        """
+        Devuelve los cambios de precio de cada moto a lo largo del historial.
+
+        Solo se leen las columnas de id y precio de la copia base y de los
+        deltas (que contienen todas las filas que han cambiado), sin cargar
+        ninguna versión completa.
+
+        Args:
+            ids (Iterable[int], opcional): Ids estables de las motos (ver `ids_moto`);
+                                           por defecto, todas.
+
+        Returns:
+            pd.DataFrame: Una fila por moto y cambio (incluida su primera aparición
+                          y su baja, con PRECIO NaN), ordenada por moto y versión,
+                          con MARCA, MODELO, VERSION, FECHA, PRECIO_ANTERIOR y PRECIO.
+        """
+        columnas = [COLUMNA_ID, COLUMNA_BAJA, 'MARCA', 'MODELO', 'PRECIO']
+        salida = [COLUMNA_ID, 'MARCA', 'MODELO', 'VERSION', 'FECHA', 'PRECIO_ANTERIOR', 'PRECIO']
+        if not self._versiones:
+            return pd.DataFrame(columns=salida)
+        ids = None if ids is None else np.asarray(list(ids), dtype=np.uint64)
+
+        partes = []
+        for v in self._versiones:
+            nombre = v["completo"] if v["version"] == 0 else v["delta"]
+            tabla = self._leer(nombre, columnas).to_pandas()
+            if ids is not None:
+                tabla = tabla[np.isin(tabla[COLUMNA_ID].to_numpy(), ids)]
+            partes.append(tabla.assign(VERSION=v["version"]))
+        cambios = pd.concat(partes, ignore_index=True)
+        if COLUMNA_BAJA not in cambios.columns:
+            cambios[COLUMNA_BAJA] = False
+        if 'PRECIO' not in cambios.columns:
+            cambios['PRECIO'] = np.nan
+        cambios[COLUMNA_BAJA] = cambios[COLUMNA_BAJA].fillna(False).astype(bool)
+        cambios.loc[cambios[COLUMNA_BAJA], 'PRECIO'] = np.nan
+        cambios = cambios.sort_values([COLUMNA_ID, 'VERSION'], kind="stable").reset_index(drop=True)
+
+        # Las bajas no llevan nombre: se toma el de la misma moto
+        por_moto = cambios.groupby(COLUMNA_ID, sort=False)
+        for col in ('MARCA', 'MODELO'):
+            cambios[col] = por_moto[col].ffill()
+
+        # Solo las filas en que cambia el precio (o la moto aparece)
+        anterior = por_moto['PRECIO'].shift()
+        primera = ~cambios[COLUMNA_ID].duplicated()
+        igual = (cambios['PRECIO'] == anterior) | (cambios['PRECIO'].isna() & anterior.isna())
+        reaparece = ~cambios[COLUMNA_BAJA] & por_moto[COLUMNA_BAJA].shift(fill_value=False).astype(bool)
+        cambios = cambios.assign(PRECIO_ANTERIOR=anterior)[primera | ~igual | reaparece]
+
+        fechas = pd.to_datetime(pd.Series([v["fecha"] for v in self._versiones]))
+        cambios['FECHA'] = fechas.to_numpy()[cambios['VERSION'].to_numpy()]
+        return cambios[salida].reset_index(drop=True)
+
+    def serie_precio(self, marca, modelo):
+        """
+        Devuelve la evolución del precio de un modelo (ver `historial_precios`).
+
+        Args:
+            marca (str): Marca.
+            modelo (str): Modelo.
+
+        Returns:
+            pd.DataFrame: FECHA, VERSION y PRECIO en cada cambio, por fecha.
+        """
+        serie = self.historial_precios(ids_moto([marca], [modelo]))
+        return serie[['FECHA', 'VERSION', 'PRECIO']]
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI del historial del catálogo."""
+    from src.catalog_cache import DIRECTORIO_CACHE
+    from src.data_preprocessing import cargar_catalogo
+
+    parser = argparse.ArgumentParser(description="Historial de versiones del catálogo (base + deltas por fila).")
+    parser.add_argument("--dir", default=DIRECTORIO_HISTORIAL, help="Carpeta del historial")
+    sub = parser.add_subparsers(dest="orden", required=True)
+
+    p = sub.add_parser("registrar", help="Registra el CSV como nueva versión (si ha cambiado)")
+    p.add_argument("csv", help="CSV del catálogo")
+    p.add_argument("--fecha", default=None, help="Fecha de la versión (por defecto, ahora)")
+    p.add_argument("--cache-dir", default=DIRECTORIO_CACHE, help="Carpeta de los catálogos compilados")
+
+    sub.add_parser("versiones", help="Lista las versiones registradas")
+
+    p = sub.add_parser("a-fecha", help="Escribe el catálogo vigente en una fecha")
+    p.add_argument("fecha", help="Fecha (AAAA-MM-DD o instante ISO)")
+    p.add_argument("-o", "--salida", required=True, help="CSV de salida")
+
+    p = sub.add_parser("precios", help="Evolución del precio de un modelo")
+    p.add_argument("marca")
+    p.add_argument("modelo")
+    args = parser.parse_args(argv)
+
+    historial = CatalogHistory(args.dir)
+    if args.orden == "registrar":
+        previas = len(historial)
+        entrada = historial.registrar(cargar_catalogo(args.csv, args.cache_dir), args.fecha)
+        if len(historial) == previas:
+            print(f"Sin cambios desde la versión {entrada['version']} ({entrada['fecha']}).")
+        elif entrada["delta"] is None:
+            print(f"Versión {entrada['version']} ({entrada['fecha']}): {entrada['filas']} motos, copia completa.")
+        else:
+            print(
+                f"Versión {entrada['version']} ({entrada['fecha']}): {entrada['filas']} motos, "
+                f"{entrada['cambios']} filas en el delta{', con checkpoint' if entrada['completo'] else ''}."
+            )
+    elif args.orden == "versiones":
+        print(historial.versiones().to_string(index=False))
+    elif args.orden == "a-fecha":
+        df = historial.cargar_a_fecha(args.fecha)
+        df.to_csv(args.salida, index=False)
+        print(f"Catálogo a {args.fecha}: {args.salida} ({len(df)} filas)")
+    else:
+        print(historial.serie_precio(args.marca, args.modelo).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
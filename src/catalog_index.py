@@ -0,0 +1,560 @@
+# src/catalog_index.py
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Orden de los carnets: un usuario puede conducir cualquier moto cuyo carnet
+# mínimo tenga un ordinal menor o igual que el suyo.
+CARNET_ORDEN = {'AM': 0, 'B': 1, 'A1': 1, 'A2': 2, 'A': 3}
+CARNET_DESCONOCIDO = np.iinfo(np.int8).max
+
+COLUMNAS_RANGO = ['PRECIO', 'CILINDRADA', 'ALTURA_ASIENTO']
+COLUMNAS_NUMERICAS = ['PRECIO', 'CILINDRADA', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO']
+COLUMNAS_CATEGORICAS = ['MARCA', 'TIPO_SIMPLIFICADO', 'CARNET_MINIMO']
+
+BUFFER_ALTURA_MM = 80
+
+
+def altura_asiento_maxima(altura):
+    """
+    Calcula la altura de asiento máxima (mm) recomendada para una estatura.
+
+    Args:
+        altura (int): Altura del usuario en cm.
+
+    Returns:
+        float: Altura de asiento máxima en mm, incluyendo el buffer de tolerancia.
+    """
+    return (altura * 0.46 - 3) * 10 + BUFFER_ALTURA_MM
+
+
+def hashes_columnas(df):
+    """
+    Calcula un hash del contenido (en orden de filas) de cada columna del catálogo.
+
+    Args:
+        df (pd.DataFrame): Catálogo.
+
+    Returns:
+        dict: Hash hexadecimal corto por nombre de columna.
+    """
+    return {
+        col: hashlib.sha256(
+            pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes()
+        ).hexdigest()[:16]
+        for col in df.columns
+    }
+
+
+def _combinar(hashes, columnas):
+    h = hashlib.sha256()
+    for col in columnas:
+        h.update(f"{col}={hashes.get(col, '-')};".encode())
+    return h.hexdigest()[:16]
+
+
+def version_catalogo(df):
+    """
+    Calcula un identificador de versión a partir del contenido del catálogo.
+
+    Args:
+        df (pd.DataFrame): Catálogo.
+
+    Returns:
+        str: Hash hexadecimal corto que cambia si cambia cualquier valor o columna.
+    """
+    return _combinar(hashes_columnas(df), df.columns)
+
+
+def congelar_catalogo(df):
+    """
+    Devuelve el catálogo con sus columnas NumPy marcadas como de solo lectura.
+
+    No se copian los datos: el DataFrame resultante usa vistas de solo lectura
+    de los mismos arrays (las columnas Arrow ya son inmutables). Cualquier
+    intento de modificar un valor numérico lanza `ValueError`.
+
+    Args:
+        df (pd.DataFrame): Catálogo.
+
+    Returns:
+        pd.DataFrame: El mismo catálogo, protegido contra modificaciones.
+    """
+    columnas = {}
+    for col in df.columns:
+        valores = df[col].array
+        if isinstance(valores, pd.arrays.NumpyExtensionArray):
+            valores = np.asarray(valores).view()
+            valores.setflags(write=False)
+        columnas[col] = valores
+    return pd.DataFrame(columnas, index=df.index, copy=False)
+
+
+def ids_moto(marcas, modelos):
+    """
+    Calcula el id estable de cada moto a partir de su MARCA y MODELO.
+
+    El id no depende de la posición de la moto en el catálogo, así que se
+    conserva entre versiones y distingue modelos con el mismo nombre en marcas
+    distintas.
+
+    Args:
+        marcas (Iterable[str]): Marca de cada moto.
+        modelos (Iterable[str]): Modelo de cada moto.
+
+    Returns:
+        np.ndarray: Ids de 64 bits (uint64), uno por moto.
+    """
+    claves = pd.Series(marcas, dtype=object).astype(str).str.strip().str.lower() + "\x1f" + \
+        pd.Series(modelos, dtype=object).astype(str).str.strip().str.lower()
+    return pd.util.hash_pandas_object(claves, index=False).to_numpy()
+
+
+def _columna_numerica(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    if df[col].dtype == np.float32:
+        # Catálogo compacto: se usa la columna tal cual, sin ampliarla a float64
+        return df[col].to_numpy()
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _orden_valores(valores):
+    # Ids de fila con valor (sin N/A), ordenados por valor de forma estable
+    validos = np.flatnonzero(~np.isnan(valores))
+    return validos[np.argsort(valores[validos], kind="stable")]
+
+
+class CatalogIndex:
+    """
+    Índice de filtrado construido una sola vez sobre el catálogo de motos.
+
+    Guarda, para cada columna de rango (precio, cilindrada y altura de asiento),
+    los valores ordenados junto con el orden de filas, de modo que un rango se
+    resuelve con dos búsquedas binarias. Para MARCA, TIPO_SIMPLIFICADO y
+    CARNET_MINIMO guarda un bitmap por valor y, para el carnet, una columna
+    ordinal. Una consulta se responde intersectando conjuntos de ids de fila
+    sin copiar ni recorrer el DataFrame.
+
+    El índice guarda el catálogo protegido con `congelar_catalogo`, de modo que
+    puede compartirse entre sesiones y procesos sin copias. Quien necesite un
+    DataFrame propio debe usar `vista()`.
+
+    Args:
+        df (pd.DataFrame): Catálogo tal y como lo devuelve `cargar_datos`.
+        version (str, opcional): Versión del catálogo; si no se indica se calcula
+                                 a partir de su contenido.
+        anterior (CatalogIndex, opcional): Índice de una versión previa del catálogo;
+                                 se reutilizan sus estructuras para las columnas
+                                 cuyo contenido no ha cambiado y se amplían (sin
+                                 reordenar desde cero) las de las columnas a las
+                                 que solo se han añadido filas al final. Si se
+                                 eliminan motos, las filas posteriores se desplazan
+                                 y esas columnas se reconstruyen. Las estructuras
+                                 derivadas que dependen de `version_de` (cubo,
+                                 tarjetas, vecinos...) se reconstruyen siempre que
+                                 cambia el número de filas.
+        diferidas (ColumnasDiferidas, opcional): Columnas que no están en `df`
+                                 (catálogo compacto) y que `materializar` lee
+                                 bajo demanda.
+    """
+
+    def __init__(self, df, version=None, anterior=None, diferidas=None):
+        df = congelar_catalogo(df)
+        self.df = df
+        self.n = len(df)
+        self.diferidas = diferidas
+        self.hash_columnas = hashes_columnas(df)
+        self.version = version or _combinar(self.hash_columnas, df.columns)
+
+        # Columnas idénticas a las de la versión anterior (mismo contenido y orden)
+        self.reutilizadas = set()
+        if anterior is not None and anterior.n == self.n:
+            self.reutilizadas = {
+                col for col, h in self.hash_columnas.items()
+                if anterior.hash_columnas.get(col) == h
+            }
+        # Columnas cuyas primeras `anterior.n` filas no han cambiado (solo hay motos
+        # nuevas al final, como deja el catálogo `alinear_con_anterior`)
+        self.ampliadas = set()
+        if anterior is not None and 0 < anterior.n < self.n:
+            self.ampliadas = {
+                col for col, h in hashes_columnas(df.iloc[:anterior.n]).items()
+                if anterior.hash_columnas.get(col) == h
+            }
+        n0 = anterior.n if self.ampliadas else 0
+
+        # Columnas numéricas convertidas una única vez
+        self.numericas = {}
+        for col in COLUMNAS_NUMERICAS:
+            if col in self.reutilizadas:
+                self.numericas[col] = anterior.numericas[col]
+            elif col in self.ampliadas:
+                self.numericas[col] = np.concatenate([anterior.numericas[col], _columna_numerica(df.iloc[n0:], col)])
+            else:
+                self.numericas[col] = _columna_numerica(df, col)
+
+        # Valores ordenados (sin N/A) y su correspondiente id de fila
+        self.orden = {}
+        self.ordenados = {}
+        for col in COLUMNAS_RANGO:
+            if col in self.reutilizadas:
+                self.orden[col] = anterior.orden[col]
+                self.ordenados[col] = anterior.ordenados[col]
+                continue
+            valores = self.numericas[col]
+            if col in self.ampliadas:
+                # Se ordenan solo las filas nuevas y se intercalan en el orden anterior
+                nuevas = _orden_valores(valores[n0:]) + n0
+                pos = np.searchsorted(anterior.ordenados[col], valores[nuevas], side="right")
+                orden = np.insert(anterior.orden[col], pos, nuevas)
+            else:
+                orden = _orden_valores(valores)
+            self.orden[col] = orden
+            self.ordenados[col] = valores[orden]
+
+        # Códigos por valor y bitmaps para las columnas categóricas
+        self.codigos = {}
+        self.categorias = {}
+        self.bitmaps = {}
+        for col in COLUMNAS_CATEGORICAS:
+            if col in self.reutilizadas:
+                self.codigos[col] = anterior.codigos[col]
+                self.categorias[col] = anterior.categorias[col]
+                self.bitmaps[col] = anterior.bitmaps[col]
+                continue
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Categóricas del catálogo compacto: se reutilizan sus códigos
+                codigos = df[col].cat.codes.to_numpy()
+                categorias = pd.Index(df[col].cat.categories)
+            elif col in self.ampliadas and not isinstance(anterior.df[col].dtype, pd.CategoricalDtype):
+                # Los valores nuevos reciben códigos a continuación de los existentes,
+                # igual que si se factorizara la columna completa
+                codigos_nuevas, valores_nuevos = pd.factorize(df[col].iloc[n0:])
+                posicion = anterior.categorias[col].get_indexer(valores_nuevos)
+                faltan = posicion < 0
+                posicion[faltan] = len(anterior.categorias[col]) + np.arange(faltan.sum())
+                categorias = anterior.categorias[col].append(valores_nuevos[faltan])
+                codigos = np.concatenate([anterior.codigos[col], np.where(codigos_nuevas >= 0, posicion[codigos_nuevas], -1)])
+            elif col in df.columns:
+                codigos, categorias = pd.factorize(df[col])
+            else:
+                codigos, categorias = np.full(self.n, -1), pd.Index([])
+            self.codigos[col] = codigos
+            self.categorias[col] = categorias
+            self.bitmaps[col] = {
+                valor: codigos == k for k, valor in enumerate(categorias)
+            }
+        # Columnas en las que todas las filas tienen valor (seleccionar todas las
+        # categorías equivale entonces a no filtrar)
+        self._sin_nulos = {col: bool((self.codigos[col] >= 0).all()) for col in COLUMNAS_CATEGORICAS}
+
+        # Columna ordinal de carnet (los valores desconocidos nunca pasan el filtro)
+        carnet_por_codigo = np.array(
+            [CARNET_ORDEN.get(str(c), CARNET_DESCONOCIDO) for c in self.categorias['CARNET_MINIMO']]
+            + [CARNET_DESCONOCIDO],
+            dtype=np.int8,
+        )
+        self.carnet_ordinal = carnet_por_codigo[self.codigos['CARNET_MINIMO']]
+
+        # Id estable de cada moto y su orden, para resolver ids -> filas con búsquedas binarias
+        if {'MARCA', 'MODELO'} <= self.reutilizadas:
+            self.id_moto = anterior.id_moto
+            self._orden_id = anterior._orden_id
+        elif {'MARCA', 'MODELO'} <= self.ampliadas:
+            nuevos = ids_moto(df['MARCA'].iloc[n0:], df['MODELO'].iloc[n0:])
+            self.id_moto = np.concatenate([anterior.id_moto, nuevos])
+            self.id_moto.setflags(write=False)
+            orden_nuevos = np.argsort(nuevos, kind="stable")
+            pos = np.searchsorted(anterior.id_moto[anterior._orden_id], nuevos[orden_nuevos], side="right")
+            self._orden_id = np.insert(anterior._orden_id, pos, orden_nuevos + n0)
+        else:
+            self.id_moto = ids_moto(
+                df['MARCA'] if 'MARCA' in df.columns else [""] * self.n,
+                df['MODELO'] if 'MODELO' in df.columns else [""] * self.n,
+            )
+            self.id_moto.setflags(write=False)
+            self._orden_id = np.argsort(self.id_moto, kind="stable")
+
+        # Órdenes completos ya calculados sobre columnas que no han cambiado
+        self._ordenes = {
+            clave: orden for clave, orden in (anterior._ordenes.items() if anterior is not None else ())
+            if clave[0] in self.reutilizadas
+        }
+
+    def __len__(self):
+        return self.n
+
+    def vista(self):
+        """
+        Devuelve una vista del catálogo para una sesión o un script.
+
+        Es una copia superficial (no copia datos): con copy-on-write, cualquier
+        modificación de la vista copia solo lo modificado y nunca llega al
+        catálogo compartido.
+
+        Returns:
+            pd.DataFrame: Vista del catálogo.
+        """
+        return self.df.copy(deep=False)
+
+    def claves_moto(self, filas):
+        """
+        Devuelve el id estable (en hexadecimal) de las motos de unas filas.
+
+        Args:
+            filas (Iterable[int]): Ids de fila del catálogo.
+
+        Returns:
+            List[str]: Id estable de cada moto, en el mismo orden.
+        """
+        return [f"{v:016x}" for v in self.id_moto[np.asarray(filas, dtype=np.int64)]]
+
+    def filas_de(self, claves):
+        """
+        Resuelve ids estables de moto (ver `claves_moto`) a ids de fila.
+
+        Args:
+            claves (Iterable[str]): Ids estables en hexadecimal.
+
+        Returns:
+            np.ndarray: Ids de fila de las motos encontradas, en el orden de
+                        `claves`; las que ya no están en el catálogo se omiten.
+        """
+        buscados = np.array([int(c, 16) for c in claves], dtype=np.uint64)
+        ordenados = self.id_moto[self._orden_id]
+        pos = np.searchsorted(ordenados, buscados)
+        pos_valida = np.minimum(pos, max(self.n - 1, 0))
+        encontrados = (pos < self.n) & (ordenados[pos_valida] == buscados) if self.n else np.zeros(len(buscados), bool)
+        return self._orden_id[pos_valida[encontrados]]
+
+    def version_de(self, columnas):
+        """
+        Versión restringida a unas columnas: solo cambia si cambia alguna de ellas.
+
+        Sirve para que cada estructura derivada (cubo, tarjetas, vecinos...) se
+        reconstruya únicamente cuando cambian las columnas de las que depende.
+
+        Args:
+            columnas (Iterable[str]): Columnas de las que depende la estructura.
+
+        Returns:
+            str: Hash hexadecimal corto.
+        """
+        return _combinar(self.hash_columnas, [f"#filas{self.n}", *columnas])
+
+    def rango(self, col, minimo=-np.inf, maximo=np.inf):
+        """
+        Devuelve los ids de fila cuyo valor en `col` está en [minimo, maximo].
+
+        Args:
+            col (str): Una de las columnas de rango indexadas.
+            minimo (float, opcional): Límite inferior (incluido).
+            maximo (float, opcional): Límite superior (incluido).
+
+        Returns:
+            np.ndarray: Ids de fila en el orden de `col` (una vista, sin copia).
+        """
+        valores = self.ordenados[col]
+        inicio = np.searchsorted(valores, minimo, side="left")
+        fin = np.searchsorted(valores, maximo, side="right")
+        return self.orden[col][inicio:fin]
+
+    def pertenece(self, col, valores, ids):
+        """
+        Indica qué ids de fila tienen en `col` alguno de los `valores` dados.
+
+        Args:
+            col (str): Una de las columnas categóricas indexadas.
+            valores (Iterable[str]): Valores aceptados.
+            ids (np.ndarray): Ids de fila candidatos.
+
+        Returns:
+            np.ndarray: Máscara booleana alineada con `ids`.
+        """
+        mascara = np.zeros(len(ids), dtype=bool)
+        bitmaps = self.bitmaps[col]
+        for valor in set(valores):
+            bitmap = bitmaps.get(valor)
+            if bitmap is not None:
+                mascara |= bitmap[ids]
+        return mascara
+
+    def _seleccion(self, col, valores):
+        # Normaliza una selección categórica: None si no restringe nada
+        if not valores:
+            return None
+        seleccion = set(valores)
+        if self._sin_nulos[col] and seleccion.issuperset(self.categorias[col]):
+            return None
+        return tuple(sorted(map(str, seleccion)))
+
+    def _posicion(self, col, valor, side):
+        return int(np.searchsorted(self.ordenados[col], valor, side=side))
+
+    def clave_consulta(
+        self,
+        presupuesto_max,
+        carnet_usuario,
+        altura,
+        precio_min=0,
+        marca=None,
+        tipos=None,
+        cilindrada_min=0,
+        cilindrada_max=2000,
+        ordenar_por='PRECIO',
+        ascendente=True,
+    ):
+        """
+        Normaliza los parámetros de una consulta a una clave de caché.
+
+        Los rangos numéricos se sustituyen por sus posiciones en los valores
+        ordenados del catálogo, de modo que dos consultas que seleccionan las
+        mismas filas (p. ej. dos estaturas con la misma altura de asiento
+        efectiva) comparten clave.
+
+        Args:
+            Los mismos que `filtrar`, más `ordenar_por` y `ascendente`.
+
+        Returns:
+            tuple: Clave hashable de la consulta.
+        """
+        if marca == ["Todas"]:
+            marca = None
+        return (
+            self._posicion('PRECIO', precio_min, "left"),
+            self._posicion('PRECIO', presupuesto_max, "right"),
+            self._posicion('CILINDRADA', cilindrada_min, "left"),
+            self._posicion('CILINDRADA', cilindrada_max, "right"),
+            self._posicion('ALTURA_ASIENTO', altura_asiento_maxima(altura), "right"),
+            int(carnet_usuario),
+            self._seleccion('MARCA', marca),
+            self._seleccion('TIPO_SIMPLIFICADO', tipos),
+            ordenar_por,
+            bool(ascendente),
+        )
+
+    def filtrar(
+        self,
+        presupuesto_max,
+        carnet_usuario,
+        altura,
+        precio_min=0,
+        marca=None,
+        tipos=None,
+        cilindrada_min=0,
+        cilindrada_max=2000,
+    ):
+        """
+        Resuelve los filtros de `recomendar_motos` y devuelve los ids de fila que los cumplen.
+
+        Args:
+            presupuesto_max (int): Presupuesto máximo en euros.
+            carnet_usuario (int): Ordinal del carnet del usuario (ver `CARNET_ORDEN`).
+            altura (int): Altura del usuario en cm.
+            precio_min (int, opcional): Presupuesto mínimo.
+            marca (List[str], opcional): Marcas aceptadas.
+            tipos (List[str], opcional): Tipos de moto aceptados.
+            cilindrada_min (int, opcional): Cilindrada mínima en cc.
+            cilindrada_max (int, opcional): Cilindrada máxima en cc.
+
+        Returns:
+            np.ndarray: Ids de fila ordenados de forma ascendente.
+        """
+        rangos = [
+            ('PRECIO', precio_min, presupuesto_max),
+            ('CILINDRADA', cilindrada_min, cilindrada_max),
+            ('ALTURA_ASIENTO', -np.inf, altura_asiento_maxima(altura)),
+        ]
+        candidatos = [(col, lo, hi, self.rango(col, lo, hi)) for col, lo, hi in rangos]
+
+        # Se parte del rango más selectivo y el resto se comprueba sobre esos ids
+        candidatos.sort(key=lambda c: len(c[3]))
+        ids = np.sort(candidatos[0][3])
+        for col, lo, hi, _ in candidatos[1:]:
+            valores = self.numericas[col][ids]
+            ids = ids[(valores >= lo) & (valores <= hi)]
+
+        ids = ids[self.carnet_ordinal[ids] <= carnet_usuario]
+
+        if marca and marca != ["Todas"]:
+            ids = ids[self.pertenece('MARCA', marca, ids)]
+        if tipos:
+            ids = ids[self.pertenece('TIPO_SIMPLIFICADO', tipos, ids)]
+
+        return ids
+
+    def ordenar(self, ids, ordenar_por='PRECIO', ascendente=True):
+        """
+        Ordena los ids de fila por una columna, descartando los que no tienen valor.
+
+        Args:
+            ids (np.ndarray): Ids de fila a ordenar.
+            ordenar_por (str, opcional): Columna de ordenación.
+            ascendente (bool, opcional): Dirección de la ordenación.
+
+        Returns:
+            np.ndarray: Ids de fila ordenados.
+        """
+        if ordenar_por in self.numericas:
+            valores = self.numericas[ordenar_por][ids]
+            validos = ~np.isnan(valores)
+            ids, valores = ids[validos], valores[validos]
+            orden = np.argsort(valores if ascendente else -valores, kind="stable")
+            return ids[orden]
+
+        serie = self.df[ordenar_por].iloc[ids].reset_index(drop=True).dropna()
+        serie = serie.sort_values(ascending=ascendente, kind="stable")
+        return ids[serie.index.to_numpy()]
+
+    def orden_completo(self, ordenar_por='PRECIO', ascendente=True):
+        """
+        Devuelve (y memoriza) el orden de todo el catálogo según una columna.
+
+        Args:
+            ordenar_por (str, opcional): Columna de ordenación.
+            ascendente (bool, opcional): Dirección de la ordenación.
+
+        Returns:
+            np.ndarray: Ids de fila con valor en `ordenar_por`, ya ordenados (solo lectura).
+        """
+        clave = (ordenar_por, bool(ascendente))
+        orden = self._ordenes.get(clave)
+        if orden is None:
+            orden = self.ordenar(np.arange(self.n), ordenar_por, ascendente)
+            orden.setflags(write=False)
+            self._ordenes[clave] = orden
+        return orden
+
+    def materializar(self, ids, columnas):
+        """
+        Construye el DataFrame de salida para los ids dados.
+
+        Las columnas numéricas se devuelven ya convertidas a número. Las que el
+        catálogo compacto no tiene en memoria se leen con `diferidas`.
+
+        Args:
+            ids (np.ndarray): Ids de fila en el orden deseado.
+            columnas (List[str]): Columnas a incluir (se ignoran las inexistentes).
+
+        Returns:
+            pd.DataFrame: Subconjunto del catálogo indexado por id de fila.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        faltan = [col for col in columnas if col not in self.df.columns]
+        diferidas = self.diferidas.leer(faltan, self.id_moto) if faltan and self.diferidas is not None else {}
+        datos = {}
+        for col in columnas:
+            if col in diferidas:
+                datos[col] = diferidas[col].take(ids)
+                continue
+            if col not in self.df.columns:
+                continue
+            if col in self.numericas:
+                datos[col] = self.numericas[col][ids]
+            elif col in self.codigos:
+                # Las categóricas se reconstruyen desde sus códigos, sin tocar el DataFrame
+                datos[col] = self.categorias[col].take(self.codigos[col][ids], allow_fill=True)
+            else:
+                datos[col] = self.df[col].array.take(ids)
+        return pd.DataFrame(datos, index=pd.Index(ids))
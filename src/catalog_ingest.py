@@ -0,0 +1,414 @@
+# src/catalog_ingest.py
+import os
+import re
+import json
+import argparse
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.feather as feather
+
+from src.catalog_cache import DIRECTORIO_CACHE, hash_fichero, guardar_catalogo_compilado
+from src.catalog_index import ids_moto
+
+# Carpeta por defecto de los CSV por marca y del catálogo consolidado
+DIRECTORIO_RAW = os.path.join("data", "raw")
+SALIDA_CATALOGO = os.path.join("data", "motofit_limpio.csv")
+
+# Partes normalizadas por marca y manifiesto del modo incremental
+DIRECTORIO_PARTES = os.path.join(DIRECTORIO_CACHE, "ingesta")
+_MANIFIESTO = "manifiesto.json"
+
+# Orden de columnas del catálogo consolidado (las desconocidas van al final)
+COLUMNAS_CATALOGO = [
+    "MODELO", "CON_CARNET", "CILINDRADA", "POTENCIA", "RUEDA_DELANTERA", "RUEDA_TRASERA",
+    "FRENO_DELANTERO", "FRENO_TRASERO", "ALTURA_ASIENTO", "PESO_VACIO", "PRECIO", "MARCA",
+    "CARNET_MINIMO", "TIPO_CORREGIDO", "TIPO_SIMPLIFICADO", "PROPULSION",
+]
+
+# Cabeceras de los CSV por marca (ya normalizadas, ver `normalizar_cabecera`)
+# que corresponden a otra columna del catálogo
+ALIAS_COLUMNAS = {
+    "CARNET": "CON_CARNET",
+    "CC": "CILINDRADA",
+    "NEUMATICO_DELANTERO": "RUEDA_DELANTERA",
+    "NEUMATICO_TRASERO": "RUEDA_TRASERA",
+    "PESO": "PESO_VACIO",
+    "TIPO": "TIPO_CORREGIDO",
+}
+
+COLUMNAS_NUMERICAS = ["PRECIO", "CILINDRADA", "POTENCIA", "ALTURA_ASIENTO", "PESO_VACIO"]
+
+# Factores a la unidad del catálogo (CV, mm, kg, cc, €) por columna y unidad de origen.
+# La unidad sale del sufijo de la cabecera (POTENCIA_KW) o del propio valor ("11 kW").
+FACTORES_UNIDAD = {
+    "POTENCIA": {"KW": 1.35962, "HP": 1.01387},
+    "ALTURA_ASIENTO": {"CM": 10.0},
+    "PESO_VACIO": {"LB": 0.453592, "LBS": 0.453592},
+}
+_SUFIJOS_UNIDAD = ("KW", "HP", "CV", "CM3", "CC", "CM", "MM", "KG", "LB", "LBS", "EUR")
+
+# Columnas en las que "17.490" o "1,868" es un separador de miles (en potencia
+# o altura, "63.989" es un decimal)
+_COLUMNAS_CON_MILES = {"PRECIO", "CILINDRADA", "PESO_VACIO"}
+
+# Nombre de las marcas que no se escriben como el nombre de su fichero en formato título
+NOMBRES_MARCA = {
+    "bmw": "BMW",
+    "ktm": "KTM",
+    "sym": "SYM",
+    "cf moto": "CF Moto",
+    "mv agusta": "MV Agusta",
+    "harley davidson": "Harley-Davidson",
+}
+
+# Agrupación de los tipos detallados en los tipos del recomendador (notebook 04)
+MAPA_TIPOS = {
+    "Scooter": "Scooter", "Scooter Eléctrico": "Scooter", "Adventure Scooter": "Scooter",
+    "Maxi Scooter": "Scooter", "Electric": "Scooter",
+    "Adventure": "Adventure", "Trail": "Adventure", "Adventure Tourer": "Adventure",
+    "Dual Purpose": "Adventure",
+    "Sport": "Sport", "Super Sport": "Sport", "Supermoto": "Sport", "Naked Sport": "Sport",
+    "Sport Touring": "Sport", "Sport Tourer": "Sport",
+    "Scrambler": "Custom", "Bobber": "Custom", "Cafe Racer": "Custom", "Cruiser": "Custom",
+    "Custom": "Custom",
+    "Tourer": "Tourer", "Gran Turismo": "Tourer", "Touring": "Tourer",
+    "Naked": "Naked", "Hypernaked": "Naked", "Hyper-Naked": "Naked", "Classic": "Naked",
+    "Off-road": "Off-road",
+    "Otro": "Otro", "Otro/no definido": "Otro", "Urban": "Otro", "MiniMOTO": "Otro",
+}
+
+# Carnets de CON_CARNET de menor a mayor exigencia: el mínimo es el primero que aparece
+_ORDEN_CARNETS = ["AM", "A1", "A2", "A", "B"]
+
+TAM_BLOQUE = 50_000
+
+
+def normalizar_cabecera(nombre):
+    """
+    Normaliza el nombre de una columna de un CSV por marca.
+
+    Quita acentos y espacios, pasa a mayúsculas, sustituye separadores por "_"
+    y resuelve los alias (`ALIAS_COLUMNAS`) y los sufijos de unidad.
+
+    Args:
+        nombre (str): Cabecera original.
+
+    Returns:
+        Tuple[str, Optional[str]]: Columna del catálogo y unidad indicada en la
+                                   cabecera (o None).
+    """
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    texto = re.sub(r"[^A-Z0-9]+", "_", texto.strip().upper()).strip("_")
+    unidad = None
+    for sufijo in _SUFIJOS_UNIDAD:
+        if texto.endswith(f"_{sufijo}"):
+            texto, unidad = texto[: -len(sufijo) - 1], sufijo
+            break
+    return ALIAS_COLUMNAS.get(texto, texto), unidad
+
+
+def _a_numero(texto, col, unidad_cabecera=None):
+    # Texto libre ("17.490 €", "11 kW", "79,5 cm") -> número en la unidad del catálogo
+    # Las expresiones regulares no usan grupos ni lookarounds para que se
+    # resuelvan en Arrow sin pasar por Python fila a fila
+    texto = texto.str.strip()
+    unidad = texto.str.replace(r"[^A-Za-z]", "", regex=True).str.upper().replace("", pd.NA)
+    if unidad_cabecera:
+        unidad = unidad.fillna(unidad_cabecera)
+    cifras = texto.str.replace(r"[^\d.,\-]", "", regex=True)
+    if col in _COLUMNAS_CON_MILES:
+        # Separadores de miles ("17.490", "1,868") frente a decimales ("95,5")
+        miles = cifras.str.contains(r"^-?\d{1,3}(?:[.,]\d{3})+$", regex=True).fillna(False).astype(bool)
+        cifras = cifras.mask(miles, cifras.str.replace(r"[.,]", "", regex=True))
+    cifras = cifras.str.replace(",", ".", regex=False)
+    valores = pd.to_numeric(cifras, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    factores = FACTORES_UNIDAD.get(col)
+    if factores:
+        valores = valores * unidad.map(factores).fillna(1.0).to_numpy(dtype="float64")
+    return valores
+
+
+def _carnet_minimo(con_carnet):
+    # Primer carnet, en orden de exigencia, que aparece en CON_CARNET ("A2-A", "A1/B"...)
+    texto = " " + con_carnet.str.upper().str.replace(r"[^A-Z0-9]+", " ", regex=True) + " "
+    condiciones = [
+        texto.str.contains(f" {c} ", regex=False).fillna(False).astype(bool).to_numpy()
+        for c in _ORDEN_CARNETS
+    ]
+    minimo = np.select(condiciones, _ORDEN_CARNETS, default="")
+    return pd.Series(minimo, index=con_carnet.index).replace("", None)
+
+
+def normalizar_bloque(bloque, cabeceras, marca):
+    """
+    Normaliza un bloque de filas de un CSV por marca al esquema del catálogo.
+
+    Args:
+        bloque (pd.DataFrame): Filas leídas como texto.
+        cabeceras (dict): Columna original -> (columna del catálogo, unidad).
+        marca (str): Marca por defecto (la del nombre del fichero).
+
+    Returns:
+        pd.DataFrame: Bloque con las columnas del catálogo.
+    """
+    columnas = {}
+    for original, (col, unidad) in cabeceras.items():
+        if col in columnas:
+            continue  # cabeceras duplicadas tras normalizar: gana la primera
+        texto = bloque[original].astype("string").str.strip().replace("", pd.NA)
+        columnas[col] = _a_numero(texto, col, unidad) if col in COLUMNAS_NUMERICAS else texto
+    df = pd.DataFrame(columnas, index=bloque.index)
+
+    if "MARCA" not in df.columns:
+        df["MARCA"] = marca
+    else:
+        df["MARCA"] = df["MARCA"].fillna(marca)
+    if "CON_CARNET" in df.columns:
+        derivado = _carnet_minimo(df["CON_CARNET"])
+        df["CARNET_MINIMO"] = df["CARNET_MINIMO"].fillna(derivado) if "CARNET_MINIMO" in df.columns else derivado
+    if "TIPO_CORREGIDO" in df.columns:
+        derivado = df["TIPO_CORREGIDO"].map(MAPA_TIPOS)
+        df["TIPO_SIMPLIFICADO"] = (
+            df["TIPO_SIMPLIFICADO"].fillna(derivado) if "TIPO_SIMPLIFICADO" in df.columns else derivado
+        )
+    return df.dropna(subset=["MODELO"]) if "MODELO" in df.columns else df
+
+
+def deduplicar(df):
+    """
+    Elimina motos repetidas por MARCA + MODELO (sin distinguir mayúsculas ni espacios).
+
+    Se conserva la primera aparición de cada moto.
+
+    Args:
+        df (pd.DataFrame): Catálogo con MARCA y MODELO.
+
+    Returns:
+        pd.DataFrame: Catálogo sin repetidos, con el índice reiniciado.
+    """
+    repetidas = pd.Series(ids_moto(df["MARCA"], df["MODELO"])).duplicated().to_numpy()
+    return df[~repetidas].reset_index(drop=True)
+
+
+def marca_de_fichero(path):
+    """Marca por defecto de un CSV por marca: su nombre sin extensión ("royal_enfield" -> "Royal Enfield")."""
+    nombre = re.sub(r"[_\-\s]+", " ", os.path.splitext(os.path.basename(path))[0]).strip()
+    return NOMBRES_MARCA.get(nombre.lower(), nombre.title())
+
+
+def procesar_marca(path, destino, tam_bloque=TAM_BLOQUE):
+    """
+    Lee un CSV por marca por bloques, lo normaliza y guarda la parte en Arrow IPC.
+
+    Se ejecuta en un proceso del pool; solo tiene en memoria un bloque del CSV
+    de origen a la vez, además de la parte ya normalizada.
+
+    Args:
+        path (str): CSV de la marca.
+        destino (str): Fichero Arrow de la parte normalizada.
+        tam_bloque (int, opcional): Filas por bloque de lectura.
+
+    Returns:
+        dict: Filas leídas y filas de la parte.
+    """
+    marca = marca_de_fichero(path)
+    bloques, leidas, cabeceras = [], 0, None
+    lector = pd.read_csv(
+        path, dtype=str, keep_default_na=False, chunksize=tam_bloque,
+        encoding="utf-8-sig", encoding_errors="replace", skipinitialspace=True,
+    )
+    with lector:
+        for bloque in lector:
+            if cabeceras is None:
+                cabeceras = {c: normalizar_cabecera(c) for c in bloque.columns}
+            leidas += len(bloque)
+            bloques.append(normalizar_bloque(bloque, cabeceras, marca))
+    parte = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame({"MARCA": [], "MODELO": []})
+    if "MODELO" in parte.columns:
+        parte = deduplicar(parte)
+
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    feather.write_feather(parte, tmp, compression="uncompressed")
+    os.replace(tmp, destino)
+    return {"leidas": leidas, "filas": len(parte)}
+
+
+def _procesar(tarea):
+    path, destino, tam_bloque = tarea
+    try:
+        return procesar_marca(path, destino, tam_bloque)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _leer_manifiesto(directorio):
+    try:
+        with open(os.path.join(directorio, _MANIFIESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_manifiesto(directorio, manifiesto):
+    ruta = os.path.join(directorio, _MANIFIESTO)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def consolidar(partes):
+    """
+    Une las partes normalizadas de todas las marcas en un catálogo.
+
+    Args:
+        partes (List[str]): Ficheros Arrow de las partes, en orden.
+
+    Returns:
+        pd.DataFrame: Catálogo sin repetidos, con las columnas en el orden de `COLUMNAS_CATALOGO`.
+    """
+    # Se unen como tablas Arrow (las columnas que falten en una marca quedan nulas)
+    # y se pasa a pandas una sola vez
+    tablas = [feather.read_table(p, memory_map=True) for p in partes]
+    tablas = [t for t in tablas if t.num_rows]
+    if not tablas:
+        return pd.DataFrame(columns=COLUMNAS_CATALOGO)
+    df = deduplicar(pa.concat_tables(tablas, promote_options="permissive").to_pandas())
+    orden = [c for c in COLUMNAS_CATALOGO if c in df.columns]
+    return df[orden + [c for c in df.columns if c not in orden]]
+
+
+def ingerir(
+    directorio_raw=DIRECTORIO_RAW,
+    salida=SALIDA_CATALOGO,
+    directorio_partes=DIRECTORIO_PARTES,
+    directorio_cache=DIRECTORIO_CACHE,
+    incremental=False,
+    procesos=None,
+    tam_bloque=TAM_BLOQUE,
+):
+    """
+    Construye el catálogo consolidado a partir de los CSV por marca.
+
+    Cada CSV se normaliza en un proceso del pool y se guarda como parte en
+    `directorio_partes`. En modo incremental solo se reprocesan los CSV cuyo
+    hash ha cambiado desde la última ejecución; el resto reutiliza su parte.
+    Después se unen todas las partes, se eliminan los repetidos por
+    MARCA + MODELO, se escribe el CSV de salida y se compila (ver
+    `src.catalog_cache`) para que `cargar_datos` lo cargue sin volver a procesarlo.
+
+    Args:
+        directorio_raw (str, opcional): Carpeta de los CSV por marca.
+        salida (str, opcional): CSV del catálogo consolidado.
+        directorio_partes (str, opcional): Carpeta de las partes y del manifiesto.
+        directorio_cache (str, opcional): Carpeta de los catálogos compilados (None para no compilar).
+        incremental (bool, opcional): Reutilizar las partes de los CSV sin cambios.
+        procesos (int, opcional): Procesos del pool (por defecto, uno por CPU).
+        tam_bloque (int, opcional): Filas por bloque de lectura.
+
+    Returns:
+        dict: Resumen de la ejecución (marcas procesadas, reutilizadas, con error,
+              filas y correcciones o avisos de las reglas).
+
+    Raises:
+        FileNotFoundError: Si no hay CSV en `directorio_raw`.
+    """
+    ficheros = sorted(
+        os.path.join(directorio_raw, f) for f in os.listdir(directorio_raw) if f.lower().endswith(".csv")
+    )
+    if not ficheros:
+        raise FileNotFoundError(f"No hay CSV en {directorio_raw}.")
+    os.makedirs(directorio_partes, exist_ok=True)
+
+    anterior = _leer_manifiesto(directorio_partes) if incremental else {}
+    manifiesto, tareas, reutilizadas = {}, [], []
+    for path in ficheros:
+        nombre = os.path.basename(path)
+        hash_csv = hash_fichero(path)
+        parte = os.path.join(directorio_partes, f"{os.path.splitext(nombre)[0]}.arrow")
+        previo = anterior.get(nombre)
+        if previo and previo["hash"] == hash_csv and os.path.exists(parte):
+            manifiesto[nombre] = previo
+            reutilizadas.append(nombre)
+        else:
+            manifiesto[nombre] = {"hash": hash_csv, "parte": parte}
+            tareas.append((path, parte, tam_bloque))
+
+    errores = {}
+    if tareas:
+        with ProcessPoolExecutor(max_workers=min(procesos or os.cpu_count() or 1, len(tareas))) as pool:
+            for (path, _, _), resultado in zip(tareas, pool.map(_procesar, tareas)):
+                nombre = os.path.basename(path)
+                if "error" in resultado:
+                    errores[nombre] = resultado["error"]
+                    # Se mantiene la última parte válida, si la hay
+                    if anterior.get(nombre):
+                        manifiesto[nombre] = anterior[nombre]
+                    else:
+                        del manifiesto[nombre]
+                else:
+                    manifiesto[nombre].update(resultado)
+    _guardar_manifiesto(directorio_partes, manifiesto)
+
+    df = consolidar([manifiesto[n]["parte"] for n in sorted(manifiesto)])
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    tmp = f"{salida}.{os.getpid()}.tmp"
+    pcsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), tmp)
+    os.replace(tmp, salida)
+
+    informe = []
+    if directorio_cache:
+        # Se compila desde memoria, sin volver a leer el CSV recién escrito
+        from src.data_preprocessing import hash_fuente, preprocesar_datos
+        compilado = preprocesar_datos(df, informe=informe)
+        guardar_catalogo_compilado(compilado, salida, hash_fuente(salida), directorio_cache)
+
+    return {
+        "procesadas": [os.path.basename(t[0]) for t in tareas if os.path.basename(t[0]) not in errores],
+        "reutilizadas": reutilizadas,
+        "errores": errores,
+        "filas": len(df),
+        "avisos": len(informe[0]) if informe else 0,
+    }
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI de ingesta de los CSV por marca."""
+    parser = argparse.ArgumentParser(
+        description="Normaliza los CSV por marca en paralelo y construye el catálogo consolidado."
+    )
+    parser.add_argument("raw", nargs="?", default=DIRECTORIO_RAW, help="Carpeta de los CSV por marca")
+    parser.add_argument("-o", "--salida", default=SALIDA_CATALOGO, help="CSV del catálogo consolidado")
+    parser.add_argument("--incremental", action="store_true", help="Reprocesar solo los CSV que han cambiado")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--partes-dir", default=DIRECTORIO_PARTES, help="Carpeta de las partes normalizadas")
+    parser.add_argument("--cache-dir", default=DIRECTORIO_CACHE, help="Carpeta de los catálogos compilados")
+    parser.add_argument("--sin-compilar", action="store_true", help="No compilar el catálogo a Arrow IPC")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE, help="Filas por bloque de lectura")
+    args = parser.parse_args(argv)
+
+    resumen = ingerir(
+        args.raw,
+        args.salida,
+        args.partes_dir,
+        None if args.sin_compilar else args.cache_dir,
+        incremental=args.incremental,
+        procesos=args.procesos,
+        tam_bloque=args.tam_bloque,
+    )
+    print(
+        f"Catálogo guardado: {args.salida} ({resumen['filas']} filas). "
+        f"Marcas procesadas: {len(resumen['procesadas'])}, reutilizadas: {len(resumen['reutilizadas'])}. "
+        f"Correcciones o avisos de las reglas: {resumen['avisos']}."
+    )
+    for nombre, error in resumen["errores"].items():
+        print(f"Error en {nombre}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# src/catalog_refresh.py
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+
+from src.catalog_index import CatalogIndex
+from src.data_preprocessing import preprocesar_datos
+from src.catalog_compact import compactar_catalogo
+
+logger = logging.getLogger(__name__)
+
+# Columnas que identifican una moto entre versiones del catálogo
+CLAVE_MOTO = ['MARCA', 'MODELO']
+
+
+def _claves(df):
+    # MARCA + MODELO (+ nº de aparición, por si el catálogo repite un modelo)
+    partes = [df[col].astype(str) for col in CLAVE_MOTO if col in df.columns]
+    base = partes[0].str.cat(partes[1:], sep="\x1f") if partes else pd.Series([""] * len(df), index=df.index)
+    return base + "\x1f" + base.groupby(base).cumcount().astype(str)
+
+
+def diferencias_catalogo(anterior, nuevo):
+    """
+    Compara dos versiones del catálogo fila a fila por MARCA + MODELO.
+
+    Args:
+        anterior (pd.DataFrame): Catálogo previo.
+        nuevo (pd.DataFrame): Catálogo nuevo.
+
+    Returns:
+        dict: Número de motos 'añadidas', 'eliminadas' y 'modificadas', y la
+              lista 'columnas_modificadas' con las columnas que cambian en alguna moto.
+    """
+    a = anterior.set_axis(_claves(anterior))
+    b = nuevo.set_axis(_claves(nuevo))
+    comunes = a.index.intersection(b.index)
+    columnas = [col for col in a.columns if col in b.columns]
+
+    distintas = pd.DataFrame(False, index=comunes, columns=columnas)
+    for col in columnas:
+        x = a.loc[comunes, col]
+        y = b.loc[comunes, col]
+        # Dos categóricas solo se comparan si tienen las mismas categorías
+        if isinstance(x.dtype, pd.CategoricalDtype) or isinstance(y.dtype, pd.CategoricalDtype):
+            x, y = x.astype(object), y.astype(object)
+        distintas[col] = ~((x == y) | (x.isna() & y.isna())).to_numpy()
+
+    return {
+        "añadidas": int(len(b.index.difference(a.index))),
+        "eliminadas": int(len(a.index.difference(b.index))),
+        "modificadas": int(distintas.any(axis=1).sum()),
+        "columnas_modificadas": [col for col in columnas if distintas[col].any()]
+                                + [col for col in b.columns if col not in a.columns],
+    }
+
+
+def alinear_con_anterior(anterior, nuevo):
+    """
+    Reordena el catálogo nuevo para que las motos existentes conserven su posición.
+
+    Las motos que ya estaban mantienen el orden de la versión anterior y las
+    nuevas van al final. Así los ids de fila no cambian entre versiones y las
+    columnas sin cambios tienen el mismo contenido (y el mismo hash), lo que
+    permite reutilizar sus índices.
+
+    Args:
+        anterior (pd.DataFrame): Catálogo previo.
+        nuevo (pd.DataFrame): Catálogo nuevo.
+
+    Returns:
+        pd.DataFrame: El catálogo nuevo reordenado y con el índice reiniciado.
+    """
+    claves_nuevo = _claves(nuevo)
+    posicion = pd.Series(np.arange(len(anterior)), index=_claves(anterior).to_numpy())
+    previa = posicion.reindex(claves_nuevo.to_numpy()).to_numpy()
+    # Las motos nuevas (sin posición previa) se ordenan detrás, en su orden original
+    previa = np.where(np.isnan(previa), len(anterior) + np.arange(len(nuevo)), previa)
+    orden = np.argsort(previa, kind="stable")
+    return nuevo.iloc[orden].reset_index(drop=True)
+
+
+class CatalogRefresher:
+    """
+    Mantiene actualizado en segundo plano el catálogo publicado en una URL.
+
+    Cada `intervalo` segundos hace una petición condicional (If-None-Match /
+    If-Modified-Since): si el servidor responde 304, o el cuerpo tiene el mismo
+    SHA-256 que la última descarga, no se procesa nada. Si hay cambios, el CSV se
+    descarga por bloques a un fichero temporal, se preprocesa, se alinea con la
+    versión anterior por MARCA + MODELO y se construye un `CatalogIndex` que
+    reutiliza las estructuras de las columnas que no han cambiado. La nueva
+    versión se publica de forma atómica en `actual`.
+
+    Args:
+        url (str): URL del CSV del catálogo.
+        intervalo (float, opcional): Segundos entre comprobaciones.
+        tam_bloque (int, opcional): Bytes por bloque al descargar el cuerpo.
+        timeout (float, opcional): Timeout de cada petición en segundos.
+        compacto (bool, opcional): Publicar el catálogo de `compactar_catalogo`.
+    """
+
+    def __init__(self, url, intervalo=300, tam_bloque=1 << 16, timeout=30, compacto=False):
+        self.url = url
+        self.compacto = compacto
+        self.intervalo = intervalo
+        self.tam_bloque = tam_bloque
+        self.timeout = timeout
+        self.actual = None
+        self.etag = None
+        self.last_modified = None
+        self.hash_cuerpo = None
+        self.ultima_comprobacion = None
+        self.ultimo_error = None
+        self.ultimo_cambio = None
+        self.comprobaciones = 0
+        self.no_modificados = 0
+        self.actualizaciones = 0
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def _descargar(self):
+        # Devuelve (fichero temporal, sha256, ETag, Last-Modified) o None si el
+        # servidor responde 304. Las cabeceras no se guardan aquí: solo cuando
+        # el cuerpo se ha procesado bien (si no, la siguiente petición condicional
+        # recibiría un 304 y esa versión no se aplicaría nunca)
+        peticion = urllib.request.Request(self.url)
+        if self.actual is not None:
+            if self.etag:
+                peticion.add_header("If-None-Match", self.etag)
+            if self.last_modified:
+                peticion.add_header("If-Modified-Since", self.last_modified)
+        try:
+            respuesta = urllib.request.urlopen(peticion, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+
+        with respuesta:
+            cuerpo = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+            h = hashlib.sha256()
+            for bloque in iter(lambda: respuesta.read(self.tam_bloque), b""):
+                h.update(bloque)
+                cuerpo.write(bloque)
+            etag = respuesta.headers.get("ETag")
+            last_modified = respuesta.headers.get("Last-Modified")
+        cuerpo.seek(0)
+        return cuerpo, h.hexdigest(), etag, last_modified
+
+    def comprobar(self):
+        """
+        Comprueba una vez si el catálogo ha cambiado y, si es así, publica la nueva versión.
+
+        Returns:
+            Optional[dict]: Diferencias con la versión anterior (ver
+            `diferencias_catalogo`) si se ha publicado una versión nueva, o None
+            si no había cambios.
+
+        Raises:
+            urllib.error.URLError: Si no se puede descargar el catálogo.
+        """
+        self.comprobaciones += 1
+        self.ultima_comprobacion = time.time()
+        descarga = self._descargar()
+        if descarga is None:
+            self.no_modificados += 1
+            return None
+        cuerpo, hash_cuerpo, etag, last_modified = descarga
+        with cuerpo:
+            if self.actual is not None and hash_cuerpo == self.hash_cuerpo:
+                with self._lock:
+                    self.etag, self.last_modified = etag, last_modified
+                self.no_modificados += 1
+                return None
+            df = preprocesar_datos(pd.read_csv(cuerpo))
+        if self.compacto:
+            df = compactar_catalogo(df)
+
+        anterior = self.actual
+        if anterior is None:
+            cambios = {"añadidas": len(df), "eliminadas": 0, "modificadas": 0,
+                       "columnas_modificadas": list(df.columns)}
+            indice = CatalogIndex(df)
+        else:
+            df = alinear_con_anterior(anterior.df, df)
+            cambios = diferencias_catalogo(anterior.df, df)
+            if not (cambios["añadidas"] or cambios["eliminadas"] or cambios["modificadas"]
+                    or cambios["columnas_modificadas"]):
+                # Mismo contenido con otro orden o formato: se conserva la versión actual
+                with self._lock:
+                    self.hash_cuerpo = hash_cuerpo
+                    self.etag, self.last_modified = etag, last_modified
+                self.no_modificados += 1
+                return None
+            indice = CatalogIndex(df, anterior=anterior)
+
+        with self._lock:
+            self.actual = indice
+            self.hash_cuerpo = hash_cuerpo
+            self.etag, self.last_modified = etag, last_modified
+            self.ultimo_cambio = cambios
+            self.actualizaciones += 1
+        logger.info("Catálogo actualizado (%s): %s", indice.version, cambios)
+        return cambios
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.comprobar()
+                self.ultimo_error = None
+            except Exception as e:
+                # Se sigue sirviendo la última versión buena
+                self.ultimo_error = e
+                logger.warning("No se pudo actualizar el catálogo desde %s: %s", self.url, e)
+
+    def iniciar(self):
+        """Arranca la comprobación periódica en un hilo en segundo plano."""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="motofit-catalog-refresh", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene la comprobación periódica."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def estadisticas(self):
+        """
+        Devuelve el estado del refresco para depuración.
+
+        Returns:
+            dict: Versión actual, comprobaciones, respuestas sin cambios,
+                  actualizaciones, último cambio y último error.
+        """
+        return {
+            "version": self.actual.version if self.actual is not None else None,
+            "comprobaciones": self.comprobaciones,
+            "no_modificados": self.no_modificados,
+            "actualizaciones": self.actualizaciones,
+            "ultimo_cambio": self.ultimo_cambio,
+            "ultimo_error": repr(self.ultimo_error) if self.ultimo_error else None,
+        }
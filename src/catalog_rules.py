@@ -0,0 +1,255 @@
+# src/catalog_rules.py
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+# Fichero de reglas por defecto (configurable por entorno)
+RUTA_REGLAS = os.environ.get("MOTOFIT_REGLAS", os.path.join("data", "reglas_catalogo.json"))
+
+# Columnas del informe de correcciones y avisos
+COLUMNAS_INFORME = ["regla", "tipo", "fila", "MARCA", "MODELO", "columna", "antes", "despues"]
+
+ACCIONES_RANGO = ("informar", "anular")
+
+
+def _normalizar(serie):
+    # Clave de comparación: sin mayúsculas ni espacios sobrantes
+    return serie.astype(str).str.strip().str.lower().to_numpy(dtype=object)
+
+
+def _claves(marcas, modelos):
+    return (pd.Series(marcas, dtype=object) + "\x1f" + pd.Series(modelos, dtype=object)).to_numpy(dtype=object)
+
+
+class ReglasCatalogo:
+    """
+    Reglas declarativas de corrección del catálogo, aplicadas en una pasada vectorizada.
+
+    Sustituyen a las correcciones manuales de los notebooks (`df.loc[...] = ...`),
+    que se perdían al reconstruir el catálogo. Hay cuatro tipos de regla, que se
+    aplican en este orden:
+
+    - "unidades": multiplica por `factor` los valores de `columna` menores que
+      `menor_que` (o mayores que `mayor_que`), p. ej. alturas en cm.
+    - "sobrescribir": fija `valores` para las motos con esa MARCA + MODELO (o
+      solo MODELO, si no se indica marca), sin distinguir mayúsculas.
+    - "reclasificar": pone `valor` en `columna` a las motos cuyo campo `en`
+      encaja con la expresión regular `patron`.
+    - "rangos": comprueba que `columna` esté en [min, max]; con `accion`
+      "informar" solo se avisa y con "anular" además se descarta el valor.
+
+    Las reglas de unidades, reclasificación y rangos admiten una condición "si"
+    ({columna: [valores aceptados]}). Cada regla se resuelve con operaciones
+    sobre columnas completas, y las sobrescrituras con una búsqueda por clave
+    (`get_indexer`) por columna afectada, sea cual sea el número de reglas.
+    Cada cambio o aviso queda en el informe.
+
+    Args:
+        definicion (dict): Reglas con las claves "unidades", "sobrescribir",
+                           "reclasificar" y "rangos" (todas opcionales).
+
+    Raises:
+        ValueError: Si alguna regla está mal formada.
+    """
+
+    def __init__(self, definicion=None):
+        definicion = definicion or {}
+        self.definicion = definicion
+        self.version = hashlib.sha256(
+            json.dumps(definicion, sort_keys=True, ensure_ascii=False).encode()
+        ).hexdigest()[:16]
+        self.unidades = list(definicion.get("unidades", []))
+        self.reclasificar = list(definicion.get("reclasificar", []))
+        self.rangos = list(definicion.get("rangos", []))
+        for regla in self.rangos:
+            if regla.get("accion", "informar") not in ACCIONES_RANGO:
+                raise ValueError(f"Acción desconocida en la regla {regla.get('id')}: {regla.get('accion')}")
+
+        # Sobrescrituras compiladas por columna y tipo de clave ("modelo" o
+        # "marca" + modelo): claves, valores e id de la regla de cada clave
+        self.sobrescribir = list(definicion.get("sobrescribir", []))
+        tablas = {}
+        for i, regla in enumerate(self.sobrescribir):
+            if "MODELO" not in regla or not regla.get("valores"):
+                raise ValueError(f"La regla de sobrescritura {regla.get('id', i)} necesita MODELO y valores.")
+            modelo = str(regla["MODELO"]).strip().lower()
+            tipo_clave = "marca" if regla.get("MARCA") else "modelo"
+            clave = f"{str(regla['MARCA']).strip().lower()}\x1f{modelo}" if regla.get("MARCA") else modelo
+            for col, valor in regla["valores"].items():
+                tabla = tablas.setdefault((tipo_clave, col), {})
+                tabla[clave] = (valor, regla.get("id", f"sobrescribir_{i}"))
+        # Las de solo modelo van antes: las de marca, más específicas, prevalecen
+        self._sobrescrituras = [
+            (tipo_clave, col, pd.Index(list(tabla)), [v for v, _ in tabla.values()],
+             np.array([r for _, r in tabla.values()], dtype=object))
+            for (tipo_clave, col), tabla in sorted(tablas.items(), key=lambda t: t[0][0] == "marca")
+        ]
+
+    def __len__(self):
+        return len(self.unidades) + len(self.sobrescribir) + len(self.reclasificar) + len(self.rangos)
+
+    @staticmethod
+    def _condicion(df, regla):
+        mascara = np.ones(len(df), dtype=bool)
+        for col, aceptados in (regla.get("si") or {}).items():
+            if col not in df.columns:
+                return np.zeros(len(df), dtype=bool)
+            if isinstance(aceptados, str):
+                aceptados = [aceptados]
+            mascara &= np.isin(_normalizar(df[col]), [str(v).strip().lower() for v in aceptados])
+        return mascara
+
+    def aplicar(self, df):
+        """
+        Aplica las reglas al catálogo (modifica `df`).
+
+        Args:
+            df (pd.DataFrame): Catálogo con las columnas numéricas ya convertidas.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: El catálogo corregido y el informe,
+            con una fila por valor cambiado o aviso (ver `COLUMNAS_INFORME`).
+        """
+        if not len(self) or df.empty:
+            return df, pd.DataFrame(columns=COLUMNAS_INFORME)
+
+        partes = []
+        marcas = df["MARCA"].astype(str).to_numpy(dtype=object) if "MARCA" in df.columns else np.full(len(df), "")
+        modelos = df["MODELO"].astype(str).to_numpy(dtype=object) if "MODELO" in df.columns else np.full(len(df), "")
+
+        def anotar(regla, tipo, mascara, col, antes, despues):
+            filas = np.flatnonzero(mascara)
+            if len(filas):
+                id_regla = regla.get("id", tipo)
+                partes.append(pd.DataFrame({
+                    "regla": id_regla[filas] if isinstance(id_regla, np.ndarray) else id_regla,
+                    "tipo": tipo,
+                    "fila": df.index.to_numpy()[filas],
+                    "MARCA": marcas[filas],
+                    "MODELO": modelos[filas],
+                    "columna": col,
+                    "antes": np.asarray(antes, dtype=object)[filas],
+                    "despues": np.asarray(despues, dtype=object)[filas],
+                }))
+
+        # 1. Unidades
+        for regla in self.unidades:
+            col = regla["columna"]
+            if col not in df.columns:
+                continue
+            valores = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            mascara = self._condicion(df, regla)
+            if "menor_que" in regla:
+                mascara &= valores < regla["menor_que"]
+            if "mayor_que" in regla:
+                mascara &= valores > regla["mayor_que"]
+            nuevos = np.where(mascara, valores * regla["factor"], valores)
+            anotar(regla, "unidades", mascara, col, valores, nuevos)
+            df[col] = nuevos
+
+        # 2. Sobrescrituras: una búsqueda por clave para cada columna afectada
+        if self._sobrescrituras:
+            modelos_norm = _normalizar(pd.Series(modelos))
+            claves_fila = {
+                "modelo": modelos_norm,
+                "marca": _claves(_normalizar(pd.Series(marcas)), modelos_norm),
+            }
+            for tipo_clave, col, claves, valores, ids_regla in self._sobrescrituras:
+                if col not in df.columns:
+                    continue
+                pos = claves.get_indexer(claves_fila[tipo_clave])
+                encontradas = pos >= 0
+                numerica = pd.api.types.is_numeric_dtype(df[col].dtype)
+                if numerica:
+                    actual = df[col].to_numpy(dtype="float64", na_value=np.nan)
+                    tabla = np.asarray(valores, dtype="float64")
+                else:
+                    actual = df[col].to_numpy(dtype=object)
+                    tabla = np.asarray(valores, dtype=object)
+                nuevos = actual.copy()
+                nuevos[encontradas] = tabla[pos[encontradas]]
+                cambia = encontradas & ~pd.Series(actual).eq(pd.Series(nuevos)).to_numpy()
+                regla = {"id": np.where(encontradas, ids_regla[pos], None)}
+                anotar(regla, "sobrescribir", cambia, col, actual, nuevos)
+                df[col] = nuevos if numerica else pd.array(nuevos, dtype=df[col].dtype)
+
+        # 3. Reclasificación por expresión regular
+        for regla in self.reclasificar:
+            col, en = regla["columna"], regla.get("en", "MODELO")
+            if col not in df.columns or en not in df.columns:
+                continue
+            encaja = df[en].astype(str).str.contains(regla["patron"], case=False, regex=True)
+            actual = df[col].to_numpy(dtype=object)
+            mascara = encaja.fillna(False).to_numpy(dtype=bool) & self._condicion(df, regla)
+            mascara &= actual != regla["valor"]
+            nuevos = np.where(mascara, regla["valor"], actual)
+            anotar(regla, "reclasificar", mascara, col, actual, nuevos)
+            df[col] = pd.array(nuevos, dtype=df[col].dtype)
+
+        # 4. Rangos
+        for regla in self.rangos:
+            col = regla["columna"]
+            if col not in df.columns:
+                continue
+            valores = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            fuera = np.zeros(len(df), dtype=bool)
+            if "min" in regla:
+                fuera |= valores < regla["min"]
+            if "max" in regla:
+                fuera |= valores > regla["max"]
+            fuera &= self._condicion(df, regla)
+            if regla.get("accion", "informar") == "anular":
+                nuevos = np.where(fuera, np.nan, valores)
+                df[col] = nuevos
+            else:
+                nuevos = valores
+            anotar(regla, "rangos", fuera, col, valores, nuevos)
+
+        informe = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_INFORME)
+        return df, informe
+
+
+def cargar_reglas(ruta=RUTA_REGLAS):
+    """
+    Lee el fichero de reglas de corrección del catálogo.
+
+    Args:
+        ruta (str, opcional): Fichero JSON de reglas.
+
+    Returns:
+        ReglasCatalogo: Las reglas; vacías si el fichero no existe.
+    """
+    if not ruta or not os.path.exists(ruta):
+        return ReglasCatalogo()
+    with open(ruta, encoding="utf-8") as f:
+        return ReglasCatalogo(json.load(f))
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI: informe de las reglas sobre un catálogo."""
+    from src.data_preprocessing import preprocesar_datos
+
+    parser = argparse.ArgumentParser(
+        description="Aplica las reglas de corrección a un catálogo y muestra el informe de cambios y avisos."
+    )
+    parser.add_argument("csv", help="CSV del catálogo")
+    parser.add_argument("--reglas", default=RUTA_REGLAS, help="Fichero JSON de reglas")
+    parser.add_argument("-o", "--salida", help="Guardar el informe en CSV")
+    args = parser.parse_args(argv)
+
+    informe = []
+    preprocesar_datos(pd.read_csv(args.csv), reglas=cargar_reglas(args.reglas), informe=informe)
+    informe = informe[0] if informe else pd.DataFrame(columns=COLUMNAS_INFORME)
+    if args.salida:
+        informe.to_csv(args.salida, index=False)
+    if informe.empty:
+        print("Sin correcciones ni avisos.")
+    else:
+        print(informe.groupby(["tipo", "regla"]).size().rename("filas").to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# src/dashboard_stats.py
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Valor de las dimensiones del cubo que agrega todas las categorías
+TODOS = "all"
+
+# Columnas del catálogo de las que depende el cubo
+COLUMNAS_CUBO = ["TIPO_SIMPLIFICADO", "MARCA", "CARNET_MINIMO", "PRECIO", "ALTURA_ASIENTO"]
+
+# Columnas del catálogo de las que dependen los datos de los gráficos
+COLUMNAS_GRAFICOS = COLUMNAS_CUBO + ["POTENCIA", "MODELO"]
+
+# Puntos por gráfico a partir de los cuales se reduce lo que se envía al navegador
+MAX_PUNTOS_GRAFICO = int(os.environ.get("MOTOFIT_MAX_PUNTOS_GRAFICO", 2000))
+
+ORDEN_CARNET = ["AM", "B", "A1", "A2", "A"]
+_CUANTILES = {"q02": 0.02, "q1": 0.25, "mediana": 0.5, "q3": 0.75, "q98": 0.98}
+
+
+def _resumen(base, columna, prefijo):
+    # Cuantiles, extremos y bigotes (1.5 × IQR, como el boxplot de Altair/Plotly)
+    # de `columna` para cada celda (TIPO, MARCA) del cubo.
+    valores = base.dropna(subset=[columna])
+    grupos = valores.groupby(["TIPO", "MARCA"], sort=False)[columna]
+
+    resumen = grupos.quantile(list(_CUANTILES.values())).unstack()
+    resumen.columns = [f"{prefijo}_{nombre}" for nombre in _CUANTILES]
+    resumen[f"{prefijo}_min"] = grupos.min()
+    resumen[f"{prefijo}_max"] = grupos.max()
+
+    q1 = grupos.transform("quantile", 0.25)
+    q3 = grupos.transform("quantile", 0.75)
+    iqr = q3 - q1
+    dentro = valores[columna].where(valores[columna].between(q1 - 1.5 * iqr, q3 + 1.5 * iqr))
+    por_celda = dentro.groupby([valores["TIPO"], valores["MARCA"]], sort=False)
+    resumen[f"{prefijo}_bigote_inf"] = por_celda.min()
+    resumen[f"{prefijo}_bigote_sup"] = por_celda.max()
+    return resumen
+
+
+def construir_cubo(df):
+    """
+    Precalcula las estadísticas del Dashboard para todas las combinaciones de filtros.
+
+    El cubo tiene una fila por cada (TIPO_SIMPLIFICADO, MARCA) existente y por sus
+    agregados (tipo, "all"), ("all", marca) y ("all", "all"), con el número de
+    modelos, medianas, cuantiles, extremos y resúmenes de boxplot de precio y
+    altura de asiento, y el número de modelos por carnet.
+
+    Args:
+        df (pd.DataFrame): Catálogo de motos.
+
+    Returns:
+        pd.DataFrame: Cubo indexado por (TIPO, MARCA).
+    """
+    base = pd.DataFrame({
+        "TIPO": df["TIPO_SIMPLIFICADO"].astype(str).to_numpy(),
+        "MARCA": df["MARCA"].astype(str).to_numpy(),
+        "CARNET_MINIMO": df["CARNET_MINIMO"].astype(str).to_numpy(),
+        # El catálogo ya llega tipado y corregido desde `preprocesar_datos`
+        "PRECIO": df["PRECIO"].to_numpy(dtype="float64", na_value=np.nan),
+        "ALTURA_ASIENTO": df["ALTURA_ASIENTO"].to_numpy(dtype="float64", na_value=np.nan),
+    })
+    # Los cuatro niveles de agregación se resuelven con un único groupby
+    base = pd.concat(
+        [
+            base,
+            base.assign(MARCA=TODOS),
+            base.assign(TIPO=TODOS),
+            base.assign(TIPO=TODOS, MARCA=TODOS),
+        ],
+        ignore_index=True,
+    )
+
+    cubo = base.groupby(["TIPO", "MARCA"], sort=False).size().to_frame("modelos")
+    cubo = cubo.join(_resumen(base, "PRECIO", "precio"))
+    cubo = cubo.join(_resumen(base, "ALTURA_ASIENTO", "altura"))
+
+    licencias = pd.crosstab([base["TIPO"], base["MARCA"]], base["CARNET_MINIMO"])
+    licencias = licencias.reindex(columns=ORDEN_CARNET, fill_value=0).add_prefix("lic_")
+    cubo = cubo.join(licencias).fillna({f"lic_{c}": 0 for c in ORDEN_CARNET})
+
+    return cubo.sort_index()
+
+
+def _clave(tipo, marca):
+    tipo = TODOS if tipo in (None, "Todos", TODOS) else tipo
+    marca = TODOS if marca in (None, "Todas", TODOS) else marca
+    return tipo, marca
+
+
+def estadisticas(cubo, tipo=None, marca=None):
+    """
+    Devuelve las estadísticas de una combinación de filtros del Dashboard.
+
+    Args:
+        cubo (pd.DataFrame): Cubo de `construir_cubo`.
+        tipo (str, opcional): Tipo seleccionado ('Todos' o None para todos).
+        marca (str, opcional): Marca seleccionada ('Todas' o None para todas).
+
+    Returns:
+        Optional[pd.Series]: Estadísticas de la celda o None si no hay modelos.
+    """
+    try:
+        return cubo.loc[_clave(tipo, marca)]
+    except KeyError:
+        return None
+
+
+def resumen_por_tipo(cubo, tipo=None, marca=None):
+    """
+    Devuelve las estadísticas desglosadas por tipo para una combinación de filtros.
+
+    Args:
+        cubo (pd.DataFrame): Cubo de `construir_cubo`.
+        tipo (str, opcional): Tipo seleccionado ('Todos' o None para todos).
+        marca (str, opcional): Marca seleccionada ('Todas' o None para todas).
+
+    Returns:
+        pd.DataFrame: Una fila por tipo, con la columna TIPO_SIMPLIFICADO.
+    """
+    tipo, marca = _clave(tipo, marca)
+    try:
+        filas = cubo.xs(marca, level="MARCA", drop_level=True)
+    except KeyError:
+        return pd.DataFrame(columns=["TIPO_SIMPLIFICADO", *cubo.columns])
+    filas = filas[filas.index != TODOS]
+    if tipo != TODOS:
+        filas = filas[filas.index == tipo]
+    return filas.rename_axis("TIPO_SIMPLIFICADO").reset_index()
+
+
+def licencias_por_tipo(cubo, tipo=None, marca=None):
+    """
+    Devuelve el número de modelos por tipo y carnet en formato largo (para gráficos).
+
+    Args:
+        cubo (pd.DataFrame): Cubo de `construir_cubo`.
+        tipo (str, opcional): Tipo seleccionado.
+        marca (str, opcional): Marca seleccionada.
+
+    Returns:
+        pd.DataFrame: Columnas TIPO_SIMPLIFICADO, CARNET_MINIMO y MODELOS.
+    """
+    por_tipo = resumen_por_tipo(cubo, tipo, marca)
+    largo = por_tipo.melt(
+        id_vars="TIPO_SIMPLIFICADO",
+        value_vars=[f"lic_{c}" for c in ORDEN_CARNET],
+        var_name="CARNET_MINIMO",
+        value_name="MODELOS",
+    )
+    largo["CARNET_MINIMO"] = largo["CARNET_MINIMO"].str.removeprefix("lic_")
+    largo["MODELOS"] = largo["MODELOS"].astype(np.int64)
+    return largo[largo["MODELOS"] > 0].reset_index(drop=True)
+
+
+# Celdas por eje de la rejilla con la que se reducen los gráficos de dispersión
+_REJILLA = 64
+
+_ESTADISTICOS_CAJA = ["bigote_inf", "q1", "mediana", "q3", "bigote_sup"]
+_COLUMNAS_PUNTO = ["MARCA", "MODELO", "TIPO_SIMPLIFICADO"]
+
+
+def reducir_por_densidad(x, y, grupos, max_puntos, semilla=0):
+    """
+    Elige los puntos de un gráfico de dispersión que se envían cuando hay demasiados.
+
+    Reparte los puntos en una rejilla de `x` × `y` (una por grupo) y limita
+    cuántos se conservan de cada celda: las zonas densas se aclaran y las poco
+    pobladas, como los valores atípicos, se mantienen enteras, así que la forma
+    de la nube no cambia. El tope por celda es el mayor que deja el total en
+    `max_puntos`; si ni con un punto por celda se cabe, se muestrean las celdas.
+
+    Args:
+        x (np.ndarray): Coordenada horizontal de cada punto (sin NaN).
+        y (np.ndarray): Coordenada vertical de cada punto (sin NaN).
+        grupos (np.ndarray): Código de grupo (color) de cada punto.
+        max_puntos (int): Número máximo de puntos.
+        semilla (int, opcional): Semilla del muestreo dentro de cada celda.
+
+    Returns:
+        np.ndarray: Posiciones, en orden creciente, de los puntos conservados.
+    """
+    n = len(x)
+    if n <= max_puntos:
+        return np.arange(n)
+
+    def celda(v):
+        lo, hi = float(v.min()), float(v.max())
+        if hi <= lo:
+            return np.zeros(n, dtype=np.int64)
+        return np.minimum(((v - lo) * (_REJILLA / (hi - lo))).astype(np.int64), _REJILLA - 1)
+
+    celdas = (np.asarray(grupos, dtype=np.int64) + 1) * _REJILLA * _REJILLA + celda(x) * _REJILLA + celda(y)
+    _, inversa, cuentas = np.unique(celdas, return_inverse=True, return_counts=True)
+
+    # Búsqueda binaria del tope por celda
+    lo, hi = 1, int(cuentas.max())
+    while lo < hi:
+        medio = (lo + hi + 1) // 2
+        if np.minimum(cuentas, medio).sum() <= max_puntos:
+            lo = medio
+        else:
+            hi = medio - 1
+
+    # Orden aleatorio (reproducible) dentro de cada celda y los `lo` primeros de cada una
+    generador = np.random.default_rng(semilla)
+    orden = np.lexsort((generador.random(n), inversa))
+    inicio_celda = np.concatenate([[0], np.cumsum(cuentas)[:-1]])
+    puesto = np.arange(n) - inicio_celda[inversa[orden]]
+    elegidos = orden[puesto < lo]
+    if len(elegidos) > max_puntos:
+        elegidos = generador.choice(elegidos, max_puntos, replace=False)
+    return np.sort(elegidos)
+
+
+class GraficosDashboard:
+    """
+    Datos ya reducidos de los gráficos del Dashboard, por combinación de filtros.
+
+    En lugar de serializar las filas del catálogo en cada gráfico, se envían:
+
+    - Cajas: los estadísticos de cada boxplot (bigotes, cuartiles y mediana),
+      tomados del cubo de `construir_cubo`.
+    - Puntos: solo las columnas que se muestran. En el boxplot de altura se
+      envían todas las motos hasta `max_puntos` y, por encima, solo los valores
+      atípicos; en el de precio, solo los atípicos (como dibuja Plotly).
+    - Dispersión precio/potencia: reducida por densidad por encima de
+      `max_puntos` (ver `reducir_por_densidad`).
+
+    Los resultados se memorizan por (tipo, marca), así que volver a una
+    combinación de filtros ya vista no recalcula nada.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+        cubo (pd.DataFrame): Cubo de `construir_cubo` para el mismo catálogo.
+        max_puntos (int, opcional): Puntos por gráfico a partir de los cuales se reduce.
+        max_entradas (int, opcional): Combinaciones de filtros en memoria.
+    """
+
+    def __init__(self, indice, cubo, max_puntos=MAX_PUNTOS_GRAFICO, max_entradas=64):
+        self.indice = indice
+        self.cubo = cubo
+        self.max_puntos = max_puntos
+        self.max_entradas = max_entradas
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _seleccion(self, tipo, marca):
+        indice = self.indice
+        mascara = np.ones(indice.n, dtype=bool)
+        for col, valor in (("TIPO_SIMPLIFICADO", tipo), ("MARCA", marca)):
+            if valor != TODOS:
+                bitmap = indice.bitmaps[col].get(valor)
+                mascara &= bitmap if bitmap is not None else False
+        return np.flatnonzero(mascara)
+
+    def _cajas(self, por_tipo, prefijo):
+        columnas = [f"{prefijo}_{e}" for e in _ESTADISTICOS_CAJA]
+        cajas = por_tipo[["TIPO_SIMPLIFICADO", *columnas]].dropna()
+        tipos = self.indice.categorias["TIPO_SIMPLIFICADO"]
+        return cajas[cajas["TIPO_SIMPLIFICADO"].isin(tipos)].reset_index(drop=True)
+
+    def _atipicos(self, ids, valores, cajas, prefijo):
+        # Filas fuera de los bigotes de la caja de su tipo (límites por código de tipo;
+        # los tipos sin caja y los nulos caen en NaN y no cuentan como atípicos)
+        posicion = pd.Index(cajas["TIPO_SIMPLIFICADO"]).get_indexer(self.indice.categorias["TIPO_SIMPLIFICADO"])
+        codigos = self.indice.codigos["TIPO_SIMPLIFICADO"][ids]
+        limites = []
+        for estadistico in ("bigote_inf", "bigote_sup"):
+            por_tipo = np.append(cajas[f"{prefijo}_{estadistico}"].to_numpy(dtype="float64"), np.nan)[posicion]
+            limites.append(np.append(por_tipo, np.nan)[codigos])
+        return (valores < limites[0]) | (valores > limites[1])
+
+    def _puntos(self, ids, col, cajas, prefijo, solo_atipicos):
+        valores = self.indice.numericas[col][ids]
+        validos = ~np.isnan(valores)
+        ids, valores = ids[validos], valores[validos]
+        if solo_atipicos or len(ids) > self.max_puntos:
+            atipicos = self._atipicos(ids, valores, cajas, prefijo)
+            ids, valores = ids[atipicos], valores[atipicos]
+        codigos = self.indice.codigos["TIPO_SIMPLIFICADO"][ids]
+        ids = ids[reducir_por_densidad(valores, valores, codigos, self.max_puntos)]
+        return self.indice.materializar(ids, [*_COLUMNAS_PUNTO, col]).reset_index(drop=True)
+
+    def _calcular(self, tipo, marca):
+        indice = self.indice
+        ids = self._seleccion(tipo, marca)
+        por_tipo = resumen_por_tipo(self.cubo, tipo, marca)
+        altura_cajas = self._cajas(por_tipo, "altura")
+        precio_cajas = self._cajas(por_tipo, "precio")
+
+        precio = indice.numericas["PRECIO"][ids]
+        potencia = indice.numericas["POTENCIA"][ids]
+        con_valores = ids[~np.isnan(precio) & ~np.isnan(potencia)]
+        elegidos = reducir_por_densidad(
+            indice.numericas["POTENCIA"][con_valores],
+            indice.numericas["PRECIO"][con_valores],
+            indice.codigos["TIPO_SIMPLIFICADO"][con_valores],
+            self.max_puntos,
+        )
+        return {
+            "altura_cajas": altura_cajas,
+            "altura_puntos": self._puntos(ids, "ALTURA_ASIENTO", altura_cajas, "altura", solo_atipicos=False),
+            "precio_cajas": precio_cajas,
+            "precio_atipicos": self._puntos(ids, "PRECIO", precio_cajas, "precio", solo_atipicos=True),
+            "dispersion": indice.materializar(
+                con_valores[elegidos], ["POTENCIA", "PRECIO", *_COLUMNAS_PUNTO]
+            ).reset_index(drop=True),
+            "dispersion_total": len(con_valores),
+        }
+
+    def obtener(self, tipo=None, marca=None):
+        """
+        Devuelve los datos de los gráficos para una combinación de filtros.
+
+        Args:
+            tipo (str, opcional): Tipo seleccionado ('Todos' o None para todos).
+            marca (str, opcional): Marca seleccionada ('Todas' o None para todas).
+
+        Returns:
+            dict: Con las claves
+                - "altura_cajas" y "precio_cajas": estadísticos del boxplot por tipo.
+                - "altura_puntos": motos a dibujar sobre las cajas de altura.
+                - "precio_atipicos": motos fuera de los bigotes de precio.
+                - "dispersion": puntos del gráfico precio/potencia.
+                - "dispersion_total": motos con precio y potencia antes de reducir.
+            Los DataFrames son compartidos: no deben modificarse.
+        """
+        clave = _clave(tipo, marca)
+        with self._lock:
+            datos = self._cache.get(clave)
+            if datos is not None:
+                self._cache.move_to_end(clave)
+                return datos
+        datos = self._calcular(*clave)
+        with self._lock:
+            self._cache[clave] = datos
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+        return datos
@@ -3,22 +3,167 @@ import streamlit as st
 import pandas as pd
 import io
 
-@st.cache_data
-def cargar_datos(path_local="data/motofit_demo.csv"):
+import hashlib
+
+from src.catalog_cache import (
+    DIRECTORIO_CACHE,
+    hash_fichero,
+    leer_catalogo_compilado,
+    guardar_catalogo_compilado,
+)
+from src.catalog_rules import cargar_reglas
+from src.catalog_compact import compactar_catalogo, COLUMNAS_APP
+from src.metrics import METRICAS
+
+
+def preprocesar_datos(df, reglas=None, informe=None):
+    """
+    Limpia y tipa el catálogo leído del CSV y le aplica las reglas de corrección.
+
+    Args:
+        df (pd.DataFrame): Catálogo tal y como se lee del CSV.
+        reglas (ReglasCatalogo, opcional): Reglas de corrección; por defecto las
+                                           de `data/reglas_catalogo.json`.
+        informe (list, opcional): Si se indica, se le añade el informe de
+                                  correcciones y avisos de las reglas.
+
+    Returns:
+        pd.DataFrame: El catálogo con columnas numéricas y de texto normalizadas,
+                      corregido, sin filas incompletas y con el índice reiniciado.
     """
-    Carga y preprocesa los datos de las motos.
-    Prioriza la carga desde Streamlit Secrets (para producción)
-    y usa una ruta local como fallback (para desarrollo).
+
+    # 1. Conversión de tipos numéricos
+    cols_numericas = ['PRECIO', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO', 'CILINDRADA']
+    for col in cols_numericas:
+        if col in df.columns:
+            # Las columnas que ya son numéricas (p. ej. desde la ingesta) no pasan por texto
+            if not pd.api.types.is_numeric_dtype(df[col].dtype):
+                df[col] = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True)
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    
+    # 2. Conversión de tipos de texto
+    cols_texto = ['CARNET_MINIMO', 'MARCA', 'TIPO_SIMPLIFICADO', 'MODELO']
+    for col in cols_texto:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+
+    # 3. Reglas de corrección (unidades, valores conocidos, reclasificaciones y rangos)
+    df, informe_reglas = (reglas if reglas is not None else cargar_reglas()).aplicar(df)
+    if informe is not None:
+        informe.append(informe_reglas)
+
+    # 4. Eliminar filas con valores nulos en columnas esenciales
+    columnas_esenciales = ['PRECIO', 'ALTURA_ASIENTO', 'CARNET_MINIMO', 'MARCA', 'TIPO_SIMPLIFICADO', 'CILINDRADA']
+    df.dropna(subset=columnas_esenciales, inplace=True)
+    
+    # 5. Limpiar los índices
+    df.reset_index(drop=True, inplace=True)
+
+    return df
+
+
+def leer_y_preprocesar(path_csv, informe=None):
+    """
+    Lee un CSV de catálogo y lo preprocesa.
+
+    Args:
+        path_csv (str): Ruta del CSV.
+        informe (list, opcional): Recibe el informe de las reglas (ver `preprocesar_datos`).
+
+    Returns:
+        pd.DataFrame: El catálogo preprocesado.
+    """
+    return preprocesar_datos(pd.read_csv(path_csv), informe=informe)
+
+
+def hash_fuente(path_csv, reglas=None):
+    """
+    Identifica el catálogo compilado de un CSV: cambia con el CSV y con las reglas.
+
+    Args:
+        path_csv (str): Ruta del CSV.
+        reglas (ReglasCatalogo, opcional): Reglas de corrección; por defecto las del fichero.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    reglas = reglas if reglas is not None else cargar_reglas()
+    return hashlib.sha256(f"{hash_fichero(path_csv)}:{reglas.version}".encode()).hexdigest()
+
+
+def cargar_catalogo(path_local, directorio_cache=DIRECTORIO_CACHE, columnas=None):
+    """
+    Carga un catálogo local usando el compilado (Arrow IPC) si está al día.
+
+    Si no existe un compilado cuyo hash coincida con el del CSV y las reglas de
+    corrección (ver `hash_fuente`), se procesa el CSV y se compila para los
+    siguientes arranques, ya corregido. Con `directorio_cache=None`
+    se lee siempre el CSV. Pensada también para scripts y procesos sin Streamlit.
+
+    Args:
+        path_local (str): Ruta del CSV del catálogo.
+        directorio_cache (str, opcional): Carpeta de los catálogos compilados.
+        columnas (List[str], opcional): Cargar solo estas columnas (se ignoran
+                                        las inexistentes); por defecto, todas.
+
+    Returns:
+        pd.DataFrame: El catálogo preprocesado.
+
+    Raises:
+        FileNotFoundError: Si no existe el CSV.
+    """
+    hash_csv = None
+    if directorio_cache:
+        hash_csv = hash_fuente(path_local)
+        df = leer_catalogo_compilado(path_local, hash_csv, directorio_cache, columnas)
+        if df is not None:
+            return df
+
+    df = leer_y_preprocesar(path_local)
+
+    # Compilado para los siguientes arranques (si falla, se sigue con el CSV)
+    if directorio_cache:
+        try:
+            guardar_catalogo_compilado(df, path_local, hash_csv, directorio_cache)
+        except Exception:
+            pass
+
+    if columnas is not None:
+        df = df[[col for col in columnas if col in df.columns]]
+    return df
+
+
+def url_datos():
+    """
+    Devuelve la URL del catálogo configurada en Streamlit Secrets (DATA_URL), o "" si no hay.
+    """
+    try:
+        return st.secrets.get("DATA_URL", "").strip() if hasattr(st, "secrets") else ""
+    except Exception:
+        return ""
+
+
+@METRICAS.medir("leer_datos")
+def leer_datos(path_local="data/motofit_demo.csv", directorio_cache=DIRECTORIO_CACHE, compacto=False):
+    """
+    Carga y preprocesa los datos de las motos, sin caché de Streamlit.
+
+    Prioriza la carga desde Streamlit Secrets (para producción) y usa una ruta
+    local como fallback (para desarrollo). En local se usa el catálogo
+    compilado (ver `cargar_catalogo`). Con `compacto` se devuelve el catálogo
+    de `compactar_catalogo`; en local las demás columnas ni se leen del
+    compilado (ver `ColumnasDiferidas`). Los errores se muestran con `st.error`
+    y devuelven un DataFrame vacío.
     """
-    df = None
 
     # Intenta cargar el DataFrame desde la URL en Streamlit Secrets (alojado por ahora en Google Drive).
     # Esta es la lógica correcta para el despliegue en la nube.
-    url = st.secrets.get("DATA_URL", "").strip() if hasattr(st, "secrets") else ""
+    url = url_datos()
     if url:
         try:
             # Lee directamente el CSV desde la URL
-            return pd.read_csv(url)
+            df = pd.read_csv(url)
+            return compactar_catalogo(df) if compacto else df
         except Exception as e:
             st.error(f"Error al cargar los datos desde la URL: {e}")
             return pd.DataFrame()
@@ -26,7 +171,9 @@ def cargar_datos(path_local="data/motofit_demo.csv"):
     # Si no hay URL, usa el archivo local de demostración
     # Esta es la lógica para el desarrollo local.
     try:
-        df = pd.read_csv(path_local)
+        if compacto:
+            return compactar_catalogo(cargar_catalogo(path_local, directorio_cache, columnas=COLUMNAS_APP))
+        return cargar_catalogo(path_local, directorio_cache)
     except FileNotFoundError:
         st.error(f"Error: No se encontró el archivo de datos en {path_local}.")
         return pd.DataFrame()
@@ -34,26 +181,13 @@ def cargar_datos(path_local="data/motofit_demo.csv"):
         st.error(f"Error al cargar el archivo de datos local: {e}")
         return pd.DataFrame()
 
-    # --- Preprocesamiento de los datos ---
-    
-    # 1. Conversión de tipos numéricos
-    cols_numericas = ['PRECIO', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO', 'CILINDRADA']
-    for col in cols_numericas:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True)
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # 2. Conversión de tipos de texto
-    cols_texto = ['CARNET_MINIMO', 'MARCA', 'TIPO_SIMPLIFICADO', 'MODELO']
-    for col in cols_texto:
-        if col in df.columns:
-            df[col] = df[col].astype(str)
-            
-    # 3. Eliminar filas con valores nulos en columnas esenciales
-    columnas_esenciales = ['PRECIO', 'ALTURA_ASIENTO', 'CARNET_MINIMO', 'MARCA', 'TIPO_SIMPLIFICADO', 'CILINDRADA']
-    df.dropna(subset=columnas_esenciales, inplace=True)
-    
-    # 4. Limpiar los índices
-    df.reset_index(drop=True, inplace=True)
 
-    return df
\ No newline at end of file
+@st.cache_data
+def cargar_datos(path_local="data/motofit_demo.csv", directorio_cache=DIRECTORIO_CACHE, compacto=False):
+    """
+    Carga y preprocesa los datos de las motos (ver `leer_datos`).
+
+    `st.cache_data` entrega a cada llamada una copia deserializada del catálogo;
+    la app usa en su lugar un `CatalogIndex` compartido con `st.cache_resource`.
+    """
+    return leer_datos(path_local, directorio_cache, compacto)
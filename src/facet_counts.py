@@ -0,0 +1,128 @@
+# src/facet_counts.py
+import numpy as np
+
+from src.catalog_index import CARNET_ORDEN, COLUMNAS_CATEGORICAS, COLUMNAS_RANGO, altura_asiento_maxima
+
+# Facetas categóricas con recuento por valor
+COLUMNAS_FACETA = ['MARCA', 'TIPO_SIMPLIFICADO']
+
+# Columnas del catálogo de las que dependen los recuentos
+COLUMNAS_FACETAS = COLUMNAS_RANGO + COLUMNAS_CATEGORICAS
+
+# Ordinal máximo de carnet que se cuenta (los desconocidos nunca pasan el filtro)
+_CARNET_MAX = max(CARNET_ORDEN.values())
+
+# Por encima de 1/8 del catálogo en el rango más selectivo se filtra con máscaras
+_DENSIDAD_MAXIMA = 8
+
+
+class FacetCounter:
+    """
+    Recuentos en vivo de cada opción de los filtros del recomendador.
+
+    Para cada faceta (marca, tipo y carnet) cuenta cuántas motos quedarían si
+    se eligiera cada uno de sus valores manteniendo el resto de filtros, y
+    además el total de la consulta completa. Todo sale de una única pasada
+    sobre el índice: los rangos numéricos se resuelven con las búsquedas
+    binarias de `CatalogIndex` y los candidatos se cuentan con un solo
+    `np.bincount` por celda (marca, tipo, carnet), usando los códigos de los
+    bitmaps del índice. Los filtros categóricos y los recuentos de cada faceta
+    se resuelven después sobre esa tabla, que es diminuta. Es lo bastante
+    barato para ejecutarse en cada rerun de un slider.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+    """
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.categorias = {col: indice.categorias[col] for col in COLUMNAS_FACETA}
+        # Cada fila se reduce a una celda (marca, tipo, carnet); los códigos se
+        # desplazan en 1 para que el valor nulo (-1) caiga en la casilla 0
+        self.forma = (
+            len(self.categorias['MARCA']) + 1,
+            len(self.categorias['TIPO_SIMPLIFICADO']) + 1,
+            _CARNET_MAX + 2,
+        )
+        marca = indice.codigos['MARCA'].astype(np.int64) + 1
+        tipo = indice.codigos['TIPO_SIMPLIFICADO'].astype(np.int64) + 1
+        carnet = np.minimum(indice.carnet_ordinal, _CARNET_MAX + 1).astype(np.int64)
+        self.celdas = np.ravel_multi_index((marca, tipo, carnet), self.forma).astype(np.int32)
+
+    def _aceptados(self, col, valores):
+        # Máscara código -> aceptado (todo True si la selección no restringe nada)
+        categorias = self.categorias[col]
+        if not valores or valores == ["Todas"]:
+            return np.ones(len(categorias) + 1, dtype=bool)
+        tabla = np.zeros(len(categorias) + 1, dtype=bool)
+        posiciones = categorias.get_indexer(list(valores))
+        tabla[posiciones[posiciones >= 0] + 1] = True
+        return tabla
+
+    def contar(
+        self,
+        presupuesto_max,
+        carnet_usuario,
+        altura,
+        precio_min=0,
+        marca=None,
+        tipos=None,
+        cilindrada_min=0,
+        cilindrada_max=2000,
+    ):
+        """
+        Calcula los recuentos de todas las facetas para una consulta parcial.
+
+        El recuento de cada valor de una faceta aplica todos los filtros salvo
+        el de esa misma faceta (así, elegir otra marca no deja su contador a cero).
+
+        Args:
+            Los mismos que `CatalogIndex.filtrar`.
+
+        Returns:
+            dict: Con las claves
+                - "total": motos que cumplen todos los filtros.
+                - "MARCA" y "TIPO_SIMPLIFICADO": motos por valor de la faceta.
+                - "sin_marca": motos de cualquier marca (opción "Todas").
+                - "CARNET": motos por carnet del usuario, de `CARNET_ORDEN`.
+        """
+        indice = self.indice
+        rangos = [
+            ('PRECIO', precio_min, presupuesto_max),
+            ('CILINDRADA', cilindrada_min, cilindrada_max),
+            ('ALTURA_ASIENTO', -np.inf, altura_asiento_maxima(altura)),
+        ]
+        # Los rangos se resuelven como en `filtrar`: el más selectivo da los candidatos
+        candidatos = [(col, lo, hi, indice.rango(col, lo, hi)) for col, lo, hi in rangos]
+        candidatos.sort(key=lambda c: len(c[3]))
+        if len(candidatos[0][3]) * _DENSIDAD_MAXIMA > indice.n:
+            # Consultas poco selectivas: comparar columnas completas (acceso
+            # secuencial) es más barato que saltar por el orden de los candidatos
+            mascara = np.ones(indice.n, dtype=bool)
+            for col, lo, hi, _ in candidatos:
+                valores = indice.numericas[col]
+                mascara &= (valores >= lo) & (valores <= hi)
+            ids = np.flatnonzero(mascara)
+        else:
+            ids = candidatos[0][3]
+            for col, lo, hi, _ in candidatos[1:]:
+                valores = indice.numericas[col][ids]
+                ids = ids[(valores >= lo) & (valores <= hi)]
+
+        # Tabla de contingencia marca × tipo × carnet de los candidatos: el resto
+        # de filtros y todos los recuentos se resuelven sobre ella
+        tabla = np.bincount(self.celdas[ids], minlength=int(np.prod(self.forma))).reshape(self.forma)
+        ok_marca = self._aceptados('MARCA', marca)
+        ok_tipo = self._aceptados('TIPO_SIMPLIFICADO', tipos)
+        ok_carnet = np.arange(self.forma[2]) <= carnet_usuario
+
+        por_marca = tabla[:, ok_tipo][:, :, ok_carnet].sum(axis=(1, 2))
+        por_tipo = tabla[ok_marca][:, :, ok_carnet].sum(axis=(0, 2))
+        por_carnet = tabla[ok_marca][:, ok_tipo].sum(axis=(0, 1)).cumsum()
+        return {
+            "total": int(por_marca[ok_marca].sum()),
+            "MARCA": dict(zip(self.categorias['MARCA'], por_marca[1:].tolist())),
+            "sin_marca": int(por_marca.sum()),
+            "TIPO_SIMPLIFICADO": dict(zip(self.categorias['TIPO_SIMPLIFICADO'], por_tipo[1:].tolist())),
+            "CARNET": {c: int(por_carnet[o]) for c, o in CARNET_ORDEN.items()},
+        }
@@ -0,0 +1,132 @@
+# src/favorites_store.py
+import os
+import time
+import atexit
+import sqlite3
+import threading
+
+# Base de datos por defecto de favoritas (configurable por entorno)
+RUTA_FAVORITOS = os.environ.get("MOTOFIT_FAVORITOS_DB", os.path.join("data", "favoritos.sqlite3"))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS favoritos (
+    usuario TEXT NOT NULL,
+    moto_id TEXT NOT NULL,
+    marca TEXT,
+    modelo TEXT,
+    creado REAL NOT NULL,
+    PRIMARY KEY (usuario, moto_id)
+)
+"""
+
+
+class FavoritesStore:
+    """
+    Almacén persistente de motos favoritas por usuario (SQLite).
+
+    Las altas y bajas se acumulan en memoria y se escriben por lotes, en una
+    única transacción, cada `intervalo` segundos o al llegar a `max_pendientes`,
+    de modo que marcar una favorita no espera a la escritura en disco. Las
+    lecturas combinan lo guardado con lo pendiente. Las motos se identifican
+    por su id estable (ver `CatalogIndex.claves_moto`).
+
+    Args:
+        ruta (str, opcional): Fichero SQLite.
+        intervalo (float, opcional): Segundos entre escrituras de los cambios pendientes.
+        max_pendientes (int, opcional): Cambios pendientes que fuerzan una escritura.
+    """
+
+    def __init__(self, ruta=RUTA_FAVORITOS, intervalo=2.0, max_pendientes=200):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(_ESQUEMA)
+        self._conexion.commit()
+        # (usuario, moto_id) -> (marca, modelo) para altas o None para bajas
+        self._pendientes = {}
+        self._lock = threading.Lock()
+        self._escritura = threading.Lock()
+        self._parar = threading.Event()
+        self.escrituras = 0
+        self._hilo = threading.Thread(target=self._bucle, name="motofit-favoritos", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.volcar()
+
+    def _encolar(self, usuario, moto_id, valor):
+        with self._lock:
+            self._pendientes[(usuario, moto_id)] = valor
+            lleno = len(self._pendientes) >= self.max_pendientes
+        if lleno:
+            self.volcar()
+
+    def agregar(self, usuario, moto_id, marca=None, modelo=None):
+        """Marca una moto como favorita del usuario."""
+        self._encolar(usuario, moto_id, (marca, modelo))
+
+    def quitar(self, usuario, moto_id):
+        """Quita una moto de las favoritas del usuario."""
+        self._encolar(usuario, moto_id, None)
+
+    def favoritos(self, usuario):
+        """
+        Devuelve las favoritas de un usuario, incluidas las aún no escritas.
+
+        Args:
+            usuario (str): Identificador del usuario.
+
+        Returns:
+            List[str]: Ids estables de moto, de la más antigua a la más reciente.
+        """
+        # Con el cerrojo de escritura, ningún lote está a medio camino entre
+        # los pendientes y la base de datos
+        with self._escritura:
+            filas = self._conexion.execute(
+                "SELECT moto_id FROM favoritos WHERE usuario = ? ORDER BY creado, rowid", (usuario,)
+            ).fetchall()
+            ids = {moto_id: True for (moto_id,) in filas}
+            with self._lock:
+                for (u, moto_id), valor in self._pendientes.items():
+                    if u != usuario:
+                        continue
+                    if valor is None:
+                        ids.pop(moto_id, None)
+                    else:
+                        ids[moto_id] = True
+        return list(ids)
+
+    def volcar(self):
+        """Escribe en disco los cambios pendientes en una sola transacción."""
+        with self._escritura:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, {}
+            if not pendientes:
+                return
+            ahora = time.time()
+            altas = [(u, m, v[0], v[1], ahora) for (u, m), v in pendientes.items() if v is not None]
+            bajas = [(u, m) for (u, m), v in pendientes.items() if v is None]
+            with self._conexion:
+                self._conexion.executemany(
+                    "INSERT OR IGNORE INTO favoritos (usuario, moto_id, marca, modelo, creado) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    altas,
+                )
+                self._conexion.executemany("DELETE FROM favoritos WHERE usuario = ? AND moto_id = ?", bajas)
+            self.escrituras += 1
+
+    def cerrar(self):
+        """Escribe los cambios pendientes y detiene la escritura periódica."""
+        if self._parar.is_set():
+            return
+        self._parar.set()
+        self.volcar()
+        with self._escritura:
+            self._conexion.close()
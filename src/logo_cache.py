@@ -0,0 +1,193 @@
+# src/logo_cache.py
+import os
+import base64
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image
+
+from src.metrics import METRICAS
+
+DIRECTORIO_LOGOS = os.path.join("assets", "logos")
+
+
+def marca_a_clave(marca):
+    """
+    Normaliza el nombre de una marca al nombre de fichero de su logo (sin extensión).
+
+    Args:
+        marca (str): Nombre de la marca, p. ej. 'Royal Enfield'.
+
+    Returns:
+        str: Clave de la marca, p. ej. 'royal_enfield'.
+    """
+    return str(marca).lower().replace(" ", "_")
+
+
+@METRICAS.medir("logos.codificar")
+def _codificar_logo(path, width):
+    """Abre, redimensiona y codifica en Base64 un logo PNG. Devuelve None si falla."""
+    try:
+        img = Image.open(path)
+        img.thumbnail((width, width), Image.LANCZOS)
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        return base64.b64encode(buf.getvalue()).decode()
+    except Exception:
+        return None
+
+
+def _img_tag(b64, width):
+    return f"<img src='data:image/png;base64,{b64}' width='{width}' style='margin-bottom:10px;'/>"
+
+
+class LogoCache:
+    """
+    Caché LRU de logos ya redimensionados y codificados como etiqueta <img>.
+
+    Cada entrada se identifica por (marca, ancho, mtime del fichero), de modo que
+    si el PNG cambia en disco la entrada antigua deja de usarse. Opcionalmente
+    persiste el Base64 en un directorio para que los siguientes arranques no
+    tengan que volver a decodificar las imágenes.
+
+    Args:
+        directorio (str, opcional): Carpeta con los logos `<marca>.png`.
+        max_entradas (int, opcional): Número máximo de entradas en memoria.
+        directorio_cache (str, opcional): Carpeta donde persistir los logos codificados.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_LOGOS, max_entradas=256, directorio_cache=None):
+        self.directorio = directorio
+        self.max_entradas = max_entradas
+        self.directorio_cache = directorio_cache
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.aciertos_disco = 0
+
+    def _ruta_disco(self, clave):
+        marca_key, width, mtime = clave
+        return os.path.join(self.directorio_cache, f"{marca_key}-{width}-{mtime}.b64")
+
+    def _leer_disco(self, clave):
+        if not self.directorio_cache:
+            return None
+        try:
+            with open(self._ruta_disco(clave), encoding="ascii") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _escribir_disco(self, clave, b64):
+        if not self.directorio_cache:
+            return
+        try:
+            os.makedirs(self.directorio_cache, exist_ok=True)
+            destino = self._ruta_disco(clave)
+            tmp = f"{destino}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="ascii") as f:
+                f.write(b64)
+            os.replace(tmp, destino)
+        except OSError:
+            pass
+
+    def obtener(self, path, width=70):
+        """
+        Devuelve la etiqueta <img> del logo en `path`, codificándolo solo si no está en caché.
+
+        Args:
+            path (str): Ruta del archivo PNG del logo.
+            width (int, opcional): Ancho deseado para la imagen. Por defecto es 70px.
+
+        Returns:
+            Optional[str]: La etiqueta HTML <img> o None si el logo no existe o no se puede leer.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        marca_key = os.path.splitext(os.path.basename(path))[0]
+        clave = (marca_key, width, mtime)
+
+        with self._lock:
+            tag = self._entradas.get(clave)
+            if tag is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                METRICAS.contar("logos.cache_aciertos")
+                return tag
+            self.fallos += 1
+        METRICAS.contar("logos.cache_fallos")
+
+        b64 = self._leer_disco(clave)
+        if b64 is not None:
+            self.aciertos_disco += 1
+        else:
+            b64 = _codificar_logo(path, width)
+            if b64 is None:
+                return None
+            self._escribir_disco(clave, b64)
+
+        tag = _img_tag(b64, width)
+        with self._lock:
+            self._entradas[clave] = tag
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return tag
+
+    def obtener_por_marca(self, marca, width=70):
+        """
+        Devuelve la etiqueta <img> del logo de una marca.
+
+        Args:
+            marca (str): Nombre de la marca.
+            width (int, opcional): Ancho deseado para la imagen.
+
+        Returns:
+            Optional[str]: La etiqueta HTML <img> o None si la marca no tiene logo.
+        """
+        return self.obtener(os.path.join(self.directorio, f"{marca_a_clave(marca)}.png"), width)
+
+    def precargar(self, width=70):
+        """
+        Codifica todos los logos del directorio para el ancho dado.
+
+        Pensado para ejecutarse una vez al arrancar, de modo que el renderizado
+        de tarjetas solo haga búsquedas en el diccionario.
+
+        Args:
+            width (int, opcional): Ancho de los logos a preparar.
+
+        Returns:
+            int: Número de logos disponibles en caché.
+        """
+        if not os.path.isdir(self.directorio):
+            return 0
+        total = 0
+        for nombre in sorted(os.listdir(self.directorio)):
+            if nombre.lower().endswith(".png"):
+                if self.obtener(os.path.join(self.directorio, nombre), width) is not None:
+                    total += 1
+        return total
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de uso de la caché.
+
+        Returns:
+            dict: Aciertos, fallos, aciertos en disco y número de entradas.
+        """
+        with self._lock:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "aciertos_disco": self.aciertos_disco,
+                "entradas": len(self._entradas),
+            }
+
+
+# Instancia compartida por todas las sesiones del proceso
+LOGOS = LogoCache(directorio_cache=os.environ.get("MOTOFIT_LOGO_CACHE_DIR") or None)
@@ -0,0 +1,259 @@
+# src/metrics.py
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+
+# Límites superiores (ms) de las cubetas de los histogramas de latencia
+LIMITES_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Fichero al que exportar las métricas tras cada rerun (.json o texto Prometheus)
+FICHERO_METRICAS = os.environ.get("MOTOFIT_METRICAS_FICHERO") or None
+
+
+def _activo_por_entorno():
+    return os.environ.get("MOTOFIT_METRICAS", "").strip().lower() in ("1", "true", "si", "sí", "on")
+
+
+class _TramoNulo:
+    # Lo que devuelve `tramo` con las métricas desactivadas: no mide nada
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def contar(self, nombre, valor=1):
+        pass
+
+    def cerrar(self):
+        pass
+
+
+_NULO = _TramoNulo()
+
+
+class Tramo:
+    """
+    Medición en curso de una etapa (se cierra al salir del `with` o con `cerrar`).
+
+    Args:
+        metricas (Metricas): Registro donde se anota la duración.
+        nombre (str): Nombre de la etapa, p. ej. "dashboard.precio_potencia".
+    """
+
+    __slots__ = ("_metricas", "nombre", "_inicio")
+
+    def __init__(self, metricas, nombre):
+        self._metricas = metricas
+        self.nombre = nombre
+        self._inicio = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+    def contar(self, nombre, valor=1):
+        """Suma `valor` al contador `<tramo>.<nombre>` (filas, bytes, aciertos...)."""
+        self._metricas.contar(f"{self.nombre}.{nombre}", valor)
+
+    def cerrar(self):
+        """Termina la medición y anota su duración; las llamadas siguientes no hacen nada."""
+        if self._inicio is None:
+            return
+        ms = (time.perf_counter() - self._inicio) * 1000
+        self._inicio = None
+        self._metricas.observar(self.nombre, ms)
+
+
+class Histograma:
+    """Histograma de latencias con las cubetas fijas de `LIMITES_MS`."""
+
+    __slots__ = ("cubetas", "n", "suma", "maximo")
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_MS) + 1)
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, ms):
+        self.cubetas[bisect.bisect_left(LIMITES_MS, ms)] += 1
+        self.n += 1
+        self.suma += ms
+        self.maximo = max(self.maximo, ms)
+
+    def percentil(self, q):
+        """Cota superior del percentil `q` (0-1): el límite de la cubeta en que cae."""
+        if not self.n:
+            return 0.0
+        objetivo = q * self.n
+        acumulado = 0
+        for limite, cuenta in zip(LIMITES_MS, self.cubetas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(float(limite), self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    """
+    Registro de latencias por etapa y contadores de la app.
+
+    Las etapas se miden con `tramo` (gestor de contexto) o `medir` (decorador)
+    y se agregan en histogramas; los contadores acumulan filas recorridas,
+    aciertos de caché o bytes enviados al navegador. Con el registro
+    desactivado, `tramo` devuelve un objeto vacío compartido y `medir` y
+    `contar` solo comprueban un atributo, así que la instrumentación puede
+    quedarse en el código de producción. Es seguro entre hilos (cada sesión
+    de Streamlit ejecuta sus reruns en un hilo propio).
+
+    Args:
+        activo (bool, opcional): Si se registran mediciones.
+    """
+
+    def __init__(self, activo=False):
+        self.activo = activo
+        self._histogramas = {}
+        self._contadores = {}
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+
+    def tramo(self, nombre):
+        """
+        Empieza a medir una etapa.
+
+        Args:
+            nombre (str): Nombre de la etapa.
+
+        Returns:
+            Tramo: Medición en curso (o un objeto vacío si el registro está desactivado).
+        """
+        return Tramo(self, nombre) if self.activo else _NULO
+
+    def medir(self, nombre=None):
+        """
+        Decorador que mide cada llamada a una función como una etapa.
+
+        Args:
+            nombre (str, opcional): Nombre de la etapa; por defecto, el de la función.
+        """
+        def decorador(funcion):
+            etiqueta = nombre or funcion.__qualname__
+
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.activo:
+                    return funcion(*args, **kwargs)
+                with Tramo(self, etiqueta):
+                    return funcion(*args, **kwargs)
+
+            return envoltura
+
+        return decorador
+
+    def observar(self, nombre, ms):
+        """Anota una duración (ms) en el histograma de la etapa `nombre`."""
+        with self._lock:
+            histograma = self._histogramas.get(nombre)
+            if histograma is None:
+                histograma = self._histogramas[nombre] = Histograma()
+            histograma.observar(ms)
+
+    def contar(self, nombre, valor=1):
+        """Suma `valor` al contador `nombre` (no hace nada si el registro está desactivado)."""
+        if not self.activo:
+            return
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + valor
+
+    def reiniciar(self):
+        """Descarta todas las mediciones."""
+        with self._lock:
+            self._histogramas = {}
+            self._contadores = {}
+            self.inicio = time.time()
+
+    def resumen(self):
+        """
+        Devuelve las mediciones agregadas.
+
+        Returns:
+            dict: Con las claves
+                - "tramos": por etapa, número de llamadas, total, media, p50, p95 y máximo (ms).
+                - "contadores": valor de cada contador.
+                - "desde": instante (epoch) desde el que se acumulan.
+        """
+        with self._lock:
+            tramos = {
+                nombre: {
+                    "n": h.n,
+                    "total_ms": round(h.suma, 3),
+                    "media_ms": round(h.suma / h.n, 3) if h.n else 0.0,
+                    "p50_ms": round(h.percentil(0.50), 3),
+                    "p95_ms": round(h.percentil(0.95), 3),
+                    "max_ms": round(h.maximo, 3),
+                }
+                for nombre, h in sorted(self._histogramas.items())
+            }
+            contadores = dict(sorted(self._contadores.items()))
+        return {"tramos": tramos, "contadores": contadores, "desde": self.inicio}
+
+    def a_prometheus(self):
+        """
+        Devuelve las mediciones en el formato de texto de Prometheus.
+
+        Returns:
+            str: Histogramas `motofit_tramo_ms` (por etapa) y contadores `motofit_total`.
+        """
+        lineas = [
+            "# HELP motofit_tramo_ms Duración de cada etapa de la app en milisegundos.",
+            "# TYPE motofit_tramo_ms histogram",
+        ]
+        with self._lock:
+            for nombre, h in sorted(self._histogramas.items()):
+                acumulado = 0
+                for limite, cuenta in zip(LIMITES_MS + ("+Inf",), h.cubetas):
+                    acumulado += cuenta
+                    lineas.append(f'motofit_tramo_ms_bucket{{tramo="{nombre}",le="{limite}"}} {acumulado}')
+                lineas.append(f'motofit_tramo_ms_sum{{tramo="{nombre}"}} {h.suma:.3f}')
+                lineas.append(f'motofit_tramo_ms_count{{tramo="{nombre}"}} {h.n}')
+            lineas += [
+                "# HELP motofit_total Contadores de la app (filas, aciertos de caché, bytes).",
+                "# TYPE motofit_total counter",
+            ]
+            for nombre, valor in sorted(self._contadores.items()):
+                lineas.append(f'motofit_total{{nombre="{nombre}"}} {valor}')
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, ruta):
+        """
+        Escribe las mediciones en un fichero, de forma atómica.
+
+        Args:
+            ruta (str): Destino; si termina en ".json" se escribe `resumen` en JSON
+                        y en otro caso el texto de Prometheus (p. ej. para el
+                        textfile collector de node_exporter).
+        """
+        if ruta.endswith(".json"):
+            contenido = json.dumps(self.resumen(), ensure_ascii=False, indent=2)
+        else:
+            contenido = self.a_prometheus()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+
+
+# Registro compartido por toda la app; se activa con MOTOFIT_METRICAS=1
+METRICAS = Metricas(activo=_activo_por_entorno())
@@ -0,0 +1,312 @@
+# src/model_search.py
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Columnas del catálogo de las que depende el índice de búsqueda
+COLUMNAS_BUSQUEDA = ['MARCA', 'MODELO']
+
+# Similitud de trigramas (Jaccard) mínima para aceptar un término con erratas
+SIMILITUD_MINIMA = 0.3
+
+# En términos cortos una errata rompe casi todos sus trigramas ("rebl" y "rebel"
+# solo comparten 2 de 7): de 3 letras hasta este largo se aceptan además las
+# palabras a una edición de distancia (con 2 letras, una edición es otra palabra)
+LARGO_MAXIMO_EDICION = 5
+
+# Puntuación de cada tipo de coincidencia de un término con una palabra del nombre
+PUNTOS_EXACTA = 1.0
+PUNTOS_PREFIJO = 0.5   # + 0.4 × fracción de la palabra ya escrita
+PUNTOS_DIFUSA = 0.6    # × similitud de trigramas
+
+# Términos de la consulta que se tienen en cuenta (el resto se ignoran)
+_MAX_TERMINOS = 16
+
+_MARCAS_DIACRITICAS = "[̀-ͯ]"
+_SEPARADORES = "[^a-z0-9]+"
+_RE_MARCAS = re.compile(_MARCAS_DIACRITICAS)
+_RE_SEPARADORES = re.compile(_SEPARADORES)
+_RE_LETRA_CIFRA = re.compile(r"([a-z])([0-9])")
+_RE_CIFRA_LETRA = re.compile(r"([0-9])([a-z])")
+
+
+def normalizar(texto):
+    """
+    Normaliza un texto de búsqueda: minúsculas, sin acentos ni signos, y con
+    letras y cifras separadas ("MT-07" y "mt07" -> "mt 07", "R1250GS" -> "r 1250 gs").
+
+    Args:
+        texto (str): Texto escrito por el usuario.
+
+    Returns:
+        str: Palabras normalizadas separadas por espacios.
+    """
+    texto = _RE_MARCAS.sub("", unicodedata.normalize("NFKD", str(texto))).lower()
+    texto = _RE_SEPARADORES.sub(" ", texto)
+    texto = _RE_CIFRA_LETRA.sub(r"\1 \2", _RE_LETRA_CIFRA.sub(r"\1 \2", texto))
+    return texto.strip()
+
+
+def _normalizar_serie(textos):
+    # Mismo resultado que `normalizar`, con operaciones vectorizadas de pandas
+    textos = pd.Series(textos, dtype="str").fillna("")
+    textos = textos.str.normalize("NFKD").str.replace(_MARCAS_DIACRITICAS, "", regex=True).str.lower()
+    textos = textos.str.replace(_SEPARADORES, " ", regex=True)
+    textos = textos.str.replace(_RE_LETRA_CIFRA.pattern, r"\1 \2", regex=True)
+    textos = textos.str.replace(_RE_CIFRA_LETRA.pattern, r"\1 \2", regex=True)
+    return textos.str.strip()
+
+
+def _trigramas(palabra):
+    relleno = f" {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _variantes(palabra):
+    # La palabra y las que resultan de borrarle una letra: dos palabras a una
+    # edición de distancia comparten alguna de estas variantes
+    return {palabra} | {palabra[:i] + palabra[i + 1:] for i in range(len(palabra))}
+
+
+def _a_una_edicion(a, b):
+    # Si `a` y `b` se diferencian como mucho en una letra cambiada, sobrante,
+    # que falta o en dos letras contiguas intercambiadas
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+
+
+def _csr(claves, valores, n_claves):
+    # Listas invertidas en formato CSR: valores[orden] agrupados por clave
+    orden = np.argsort(claves, kind="stable")
+    punteros = np.zeros(n_claves + 1, dtype=np.int64)
+    np.cumsum(np.bincount(claves, minlength=n_claves), out=punteros[1:])
+    return punteros, np.asarray(valores)[orden]
+
+
+def _posiciones(inicios, largos):
+    # Posiciones de varios tramos [inicio, inicio + largo) de un array CSR, concatenados
+    desplazamiento = np.cumsum(largos) - largos
+    return np.repeat(inicios - desplazamiento, largos) + np.arange(largos.sum())
+
+
+class ModelSearchIndex:
+    """
+    Búsqueda de motos por nombre (MARCA + MODELO) mientras se escribe.
+
+    Se construye una vez por versión del catálogo. Los nombres se normalizan
+    (ver `normalizar`) y se parten en palabras; cada término de la consulta se
+    resuelve contra el vocabulario de tres formas:
+
+    - Prefijo: el vocabulario está ordenado, así que las palabras que empiezan
+      por el término forman un intervalo que se encuentra con dos búsquedas
+      binarias (el equivalente a bajar por un trie), y sus listas de nombres
+      son un tramo contiguo del array de listas invertidas.
+    - Erratas: si ninguna palabra empieza por el término, se buscan las de
+      trigramas parecidos (similitud de Jaccard ≥ `SIMILITUD_MINIMA`) con un
+      índice invertido de trigramas y, en los términos de hasta
+      `LARGO_MAXIMO_EDICION` letras, las que están a una edición de distancia
+      ("rebl" -> rebel), con un índice de variantes con una letra borrada.
+    - Exacta: la palabra completa puntúa más que un prefijo o una errata.
+
+    Un nombre tiene que encajar con todos los términos ("tenere 7" -> Ténéré
+    700); si ninguno encaja con todos (o algún término no encaja con nada), se
+    devuelven los que encajan con más. A igual puntuación van antes los
+    nombres más cortos ("MT-07" antes que "MT-07 Tracer").
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+    """
+
+    def __init__(self, indice):
+        self.version = indice.version
+        df = indice.df
+        marcas = df['MARCA'].astype(str) if 'MARCA' in df.columns else pd.Series([""] * indice.n)
+        modelos = df['MODELO'].astype(str) if 'MODELO' in df.columns else pd.Series([""] * indice.n)
+
+        # Nombres distintos y filas de cada nombre (CSR); las motos repetidas
+        # (p. ej. varios años del mismo modelo) comparten nombre
+        codigos, nombres = pd.factorize(marcas.to_numpy(dtype=object) + " " + modelos.to_numpy(dtype=object))
+        self.n_nombres = len(nombres)
+        self._filas_ptr, self._filas = _csr(codigos, np.arange(indice.n, dtype=np.int64), self.n_nombres)
+        normalizados = _normalizar_serie(nombres)
+        self._longitud = normalizados.str.len().to_numpy(dtype=np.int64)
+
+        # Vocabulario ordenado y listas invertidas palabra -> nombres
+        listas = pc.utf8_split_whitespace(pa.array(normalizados.to_numpy(dtype=object), type=pa.string()))
+        id_palabra, vocabulario = pd.factorize(pc.list_flatten(listas).to_numpy(zero_copy_only=False), sort=True)
+        # Pares (nombre, palabra) sin repetir ("Ninja ZX-10R Ninja")
+        pares = np.sort(pc.list_parent_indices(listas).to_numpy().astype(np.int64) * len(vocabulario) + id_palabra)
+        pares = pares[np.r_[True, pares[1:] != pares[:-1]]] if len(pares) else pares
+        nombre_par, id_palabra = np.divmod(pares, max(len(vocabulario), 1))
+        self.vocabulario = np.asarray(vocabulario, dtype=object)
+        self._nombres_ptr, self._nombres = _csr(id_palabra, nombre_par, len(vocabulario))
+        # Índice directo nombre -> palabras, para puntuar candidatos sin recorrer listas largas
+        self._palabras_ptr, self._palabras_nombre = _csr(nombre_par, id_palabra, self.n_nombres)
+        self._largo_palabra = np.fromiter((len(p) for p in self.vocabulario), dtype=np.int64, count=len(vocabulario))
+
+        # Índice invertido trigrama -> palabras (solo palabras con letras de 3+
+        # caracteres) y variantes con una letra borrada -> palabras cortas
+        trigramas, ids_trigrama, ids_vocab = {}, [], []
+        self._n_trigramas = np.zeros(len(vocabulario), dtype=np.int64)
+        self._variantes = {}
+        for k, palabra in enumerate(self.vocabulario):
+            if palabra.isdigit():
+                continue
+            if len(palabra) <= LARGO_MAXIMO_EDICION + 1:
+                for variante in _variantes(palabra):
+                    self._variantes.setdefault(variante, []).append(k)
+            if len(palabra) < 3:
+                continue
+            propios = _trigramas(palabra)
+            self._n_trigramas[k] = len(propios)
+            for t in propios:
+                ids_trigrama.append(trigramas.setdefault(t, len(trigramas)))
+                ids_vocab.append(k)
+        self._trigramas = trigramas
+        self._trigramas_ptr, self._trigramas_vocab = _csr(
+            np.asarray(ids_trigrama, dtype=np.int64), np.asarray(ids_vocab, dtype=np.int64), len(trigramas)
+        )
+
+    def _palabras(self, termino):
+        # Palabras del vocabulario (ids ordenados) que encajan con un término y su puntuación
+        inicio = int(np.searchsorted(self.vocabulario, termino, side="left"))
+        fin = int(np.searchsorted(self.vocabulario, termino + "\U0010ffff", side="left"))
+        if fin > inicio:
+            puntos = PUNTOS_PREFIJO + 0.4 * len(termino) / self._largo_palabra[inicio:fin]
+            if self.vocabulario[inicio] == termino:
+                puntos[0] = PUNTOS_EXACTA
+            return np.arange(inicio, fin), puntos
+
+        palabras, puntos = np.empty(0, dtype=np.int64), np.empty(0)
+        if termino.isdigit():
+            return palabras, puntos
+        propios = [self._trigramas[t] for t in _trigramas(termino) if t in self._trigramas]
+        if len(termino) >= 3 and propios:
+            ptr = self._trigramas_ptr
+            candidatas = np.concatenate([self._trigramas_vocab[ptr[t]:ptr[t + 1]] for t in propios])
+            palabras, compartidos = np.unique(candidatas, return_counts=True)
+            similitud = compartidos / (len(_trigramas(termino)) + self._n_trigramas[palabras] - compartidos)
+            aceptadas = similitud >= SIMILITUD_MINIMA
+            palabras, puntos = palabras[aceptadas], PUNTOS_DIFUSA * similitud[aceptadas]
+
+        if 3 <= len(termino) <= LARGO_MAXIMO_EDICION:
+            cerca = np.array(sorted({
+                k
+                for variante in _variantes(termino)
+                for k in self._variantes.get(variante, ())
+                if _a_una_edicion(termino, self.vocabulario[k])
+            }), dtype=np.int64)
+            if len(cerca):
+                # Una edición en una palabra de n letras: como una similitud de 1 - 1/n
+                largo = np.maximum(len(termino), self._largo_palabra[cerca])
+                palabras = np.concatenate([palabras, cerca])
+                puntos = np.concatenate([puntos, PUNTOS_DIFUSA * (1 - 1 / largo)])
+                # Ids ordenados y sin repetir, con la mejor puntuación de cada palabra
+                orden = np.lexsort((-puntos, palabras))
+                palabras, puntos = palabras[orden], puntos[orden]
+                primera = np.r_[True, palabras[1:] != palabras[:-1]]
+                palabras, puntos = palabras[primera], puntos[primera]
+        return palabras, puntos
+
+    def _apariciones(self, palabras):
+        # Número de (palabra, nombre) en las listas invertidas de unas palabras
+        return int((self._nombres_ptr[palabras + 1] - self._nombres_ptr[palabras]).sum())
+
+    def _nombres_de(self, palabras, puntos):
+        # Nombres que contienen alguna de las palabras, con la mejor puntuación de cada uno
+        ptr = self._nombres_ptr
+        largos = ptr[palabras + 1] - ptr[palabras]
+        if palabras[-1] - palabras[0] + 1 == len(palabras):
+            # Intervalo de prefijo: sus listas son un tramo contiguo
+            nombres = self._nombres[ptr[palabras[0]]:ptr[palabras[-1] + 1]]
+        else:
+            nombres = self._nombres[_posiciones(ptr[palabras], largos)]
+        puntos = np.repeat(puntos, largos)
+        orden = np.lexsort((-puntos, nombres))
+        nombres, puntos = nombres[orden], puntos[orden]
+        primero = np.ones(len(nombres), dtype=bool)
+        primero[1:] = nombres[1:] != nombres[:-1]
+        return nombres[primero], puntos[primero]
+
+    def _puntos_de(self, nombres, palabras, puntos):
+        # Mejor puntuación de cada nombre con las palabras de un término (0 si no
+        # encaja), comprobando las palabras de cada nombre con el índice directo
+        ptr = self._palabras_ptr
+        largos = ptr[nombres + 1] - ptr[nombres]
+        propias = self._palabras_nombre[_posiciones(ptr[nombres], largos)]
+        if palabras[-1] - palabras[0] + 1 == len(palabras):
+            # Intervalo de prefijo: basta con restar su inicio
+            pos = propias - palabras[0]
+            encaja = pos.view(np.uint64) < len(palabras)
+        else:
+            pos = np.searchsorted(palabras, propias)
+            encaja = palabras.take(pos, mode="clip") == propias
+        valores = np.where(encaja, puntos.take(pos, mode="clip"), 0.0)
+        # Los candidatos salen de las listas invertidas: todos tienen alguna palabra
+        return np.maximum.reduceat(valores, np.cumsum(largos) - largos) if len(nombres) else valores
+
+    def buscar(self, consulta, limite=20):
+        """
+        Busca motos por nombre.
+
+        Args:
+            consulta (str): Texto libre, p. ej. "tenere 7", "mt07" o "ducatti monster".
+            limite (int, opcional): Número máximo de motos a devolver.
+
+        Returns:
+            np.ndarray: Ids de fila de las motos encontradas, de más a menos relevante.
+        """
+        terminos = list(dict.fromkeys(normalizar(consulta).split()))[:_MAX_TERMINOS]
+        coincidencias = [c for c in map(self._palabras, terminos) if len(c[0])]
+        if not coincidencias or limite <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Los candidatos salen del término más selectivo; cada uno de los demás
+        # los puntúa con el índice directo (sin recorrer sus listas invertidas)
+        # y descarta los que no encajan. Si algún término no encaja con ninguna
+        # palabra, ningún nombre los cubre todos.
+        nombres = np.empty(0, dtype=np.int64)
+        if len(coincidencias) == len(terminos):
+            coincidencias.sort(key=lambda c: self._apariciones(c[0]))
+            nombres, puntos = self._nombres_de(*coincidencias[0])
+            for palabras, puntos_termino in coincidencias[1:]:
+                extra = self._puntos_de(nombres, palabras, puntos_termino)
+                encaja = extra > 0
+                nombres, puntos = nombres[encaja], puntos[encaja] + extra[encaja]
+                if not len(nombres):
+                    break
+            cubiertos = np.full(len(nombres), len(coincidencias), dtype=np.int64)
+        if not len(nombres):
+            # Ningún nombre encaja con todos los términos: los que encajan con más
+            # (los términos sin coincidencias no los cubre ninguno)
+            nombres = np.unique(np.concatenate([self._nombres_de(*c)[0] for c in coincidencias]))
+            extra = [self._puntos_de(nombres, *c) for c in coincidencias]
+            puntos = np.sum(extra, axis=0)
+            cubiertos = np.sum([e > 0 for e in extra], axis=0)
+
+        # Orden: términos cubiertos, puntuación, nombre más corto y primera aparición,
+        # empaquetados en una clave entera para elegir los mejores con argpartition
+        clave = (
+            (_MAX_TERMINOS - cubiertos) << 58
+            | (_MAX_TERMINOS * 1000 - np.round(puntos * 1000).astype(np.int64)) << 44
+            | np.minimum(self._longitud[nombres], 4095) << 32
+            | nombres
+        )
+        if len(clave) > limite:
+            clave = clave[np.argpartition(clave, limite - 1)[:limite]]
+        mejores = np.sort(clave) & 0xFFFFFFFF
+
+        ptr = self._filas_ptr
+        filas = self._filas[_posiciones(ptr[mejores], ptr[mejores + 1] - ptr[mejores])]
+        return filas[:limite]
@@ -0,0 +1,142 @@
+# src/pareto.py
+import numpy as np
+
+# Valor de `ordenar_por` del modo "mejor relación" en `recomendar_motos`
+ORDEN_PARETO = 'PARETO'
+
+# Criterios del modo "mejor relación": (columna, si se minimiza)
+CRITERIOS_PARETO = [
+    ('PRECIO', True),
+    ('POTENCIA', False),
+    ('PESO_VACIO', True),
+    ('ALTURA_ASIENTO', True),
+]
+
+# Capas de Pareto que se calculan (la primera es el frente): las siguientes
+# solo hasta juntar `MIN_RESULTADOS` motos, unas cuantas páginas de tarjetas
+MAX_CAPAS = 10
+MIN_RESULTADOS = 90
+
+# Tamaño de los trozos que se resuelven comparando todos con todos
+_HOJA = 256
+_BLOQUE_FRENTE = 4096
+
+
+def _dominados(A, D):
+    # Filas de A dominadas por alguna fila de D (minimizando todos los criterios).
+    # D se recorre en trozos crecientes y solo se siguen comparando las filas
+    # de A que aún no han caído (memoria O(len(A) × trozo)).
+    dominados = np.zeros(len(A), dtype=bool)
+    pendientes = np.arange(len(A))
+    inicio, tam = 0, 64
+    while inicio < len(D) and len(pendientes):
+        trozo = D[inicio:inicio + tam]
+        filas = A[pendientes]
+        # Criterio a criterio sobre matrices (filas × trozo): más rápido que
+        # reducir el eje de criterios de un array 3D
+        menor_igual = filas[:, :1] >= trozo[:, 0]
+        igual = filas[:, :1] == trozo[:, 0]
+        for j in range(1, A.shape[1]):
+            menor_igual &= filas[:, j:j + 1] >= trozo[:, j]
+            igual &= filas[:, j:j + 1] == trozo[:, j]
+        nuevos = (menor_igual & ~igual).any(axis=1)
+        dominados[pendientes[nuevos]] = True
+        pendientes = pendientes[~nuevos]
+        inicio, tam = inicio + tam, min(tam * 2, _BLOQUE_FRENTE)
+    return dominados
+
+
+def _frente(X, inicio, fin):
+    # Posiciones del frente de X[inicio:fin] (divide y vencerás)
+    if fin - inicio <= _HOJA:
+        trozo = X[inicio:fin]
+        return inicio + np.flatnonzero(~_dominados(trozo, trozo))
+    mitad = (inicio + fin) // 2
+    izquierda = _frente(X, inicio, mitad)
+    derecha = _frente(X, mitad, fin)
+    # En orden lexicográfico solo la mitad izquierda puede dominar a la derecha
+    derecha = derecha[~_dominados(X[derecha], X[izquierda])]
+    return np.concatenate([izquierda, derecha])
+
+
+def skyline(X):
+    """
+    Calcula el frente de Pareto (skyline) de un conjunto de puntos, minimizando.
+
+    Divide y vencerás sobre los puntos en orden lexicográfico: un punto solo
+    puede estar dominado por otro anterior, así que el frente de un tramo es
+    el frente de su mitad izquierda más los puntos del frente de la derecha
+    que no domina ninguno del de la izquierda. Las comparaciones son entre
+    frentes parciales (pequeños) y no entre todos los pares de puntos.
+
+    Args:
+        X (np.ndarray): Matriz (puntos × criterios) sin NaN, en orden lexicográfico.
+
+    Returns:
+        np.ndarray: Máscara booleana de los puntos no dominados.
+    """
+    en_frente = np.zeros(len(X), dtype=bool)
+    if len(X):
+        en_frente[_frente(X, 0, len(X))] = True
+    return en_frente
+
+
+def capas_pareto(X, max_capas=MAX_CAPAS, min_resultados=MIN_RESULTADOS):
+    """
+    Reparte los puntos en capas de Pareto sucesivas: la 0 es el frente, la 1
+    el frente de lo que queda al quitarlo, y así sucesivamente.
+
+    Args:
+        X (np.ndarray): Matriz (puntos × criterios) sin NaN, en orden lexicográfico.
+        max_capas (int, opcional): Número máximo de capas.
+        min_resultados (int, opcional): Se dejan de calcular capas en cuanto
+                                        las calculadas suman estos puntos.
+
+    Returns:
+        np.ndarray: Capa de cada punto (-1 si no se ha llegado a calcular la suya).
+    """
+    capas = np.full(len(X), -1, dtype=np.int64)
+    restantes = np.arange(len(X))
+    for capa in range(max_capas):
+        if not len(restantes) or len(X) - len(restantes) >= min_resultados:
+            break
+        en_frente = skyline(X[restantes])
+        capas[restantes[en_frente]] = capa
+        restantes = restantes[~en_frente]
+    return capas
+
+
+def frentes_pareto(indice, ids, max_capas=MAX_CAPAS, min_resultados=MIN_RESULTADOS):
+    """
+    Ordena unas motos por capas de Pareto según `CRITERIOS_PARETO`.
+
+    Una moto está en el frente si ninguna otra es a la vez más barata (o igual),
+    más potente, más ligera y más baja de asiento, y mejor en al menos una de
+    esas cosas. Las motos sin alguno de los cuatro datos no se pueden comparar
+    y se descartan.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+        ids (np.ndarray): Ids de fila ya filtrados.
+        max_capas (int, opcional): Número máximo de capas.
+        min_resultados (int, opcional): Motos a partir de las cuales no se calculan más capas.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Ids de fila por capa (y dentro de cada capa
+        de más barata a más cara) y la capa de cada uno (1 = frente).
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    X = np.column_stack([
+        indice.numericas[col][ids] if minimizar else -indice.numericas[col][ids]
+        for col, minimizar in CRITERIOS_PARETO
+    ]).astype(np.float64)
+    validos = ~np.isnan(X).any(axis=1)
+    ids, X = ids[validos], X[validos]
+    orden = np.lexsort(X.T[::-1])
+    ids, X = ids[orden], X[orden]
+
+    capas = capas_pareto(X, max_capas, min_resultados)
+    incluidas = np.flatnonzero(capas >= 0)
+    # Por capa y, dentro de cada una, en orden lexicográfico (de más barata a más cara)
+    incluidas = incluidas[np.argsort(capas[incluidas], kind="stable")]
+    return ids[incluidas], capas[incluidas] + 1
@@ -0,0 +1,111 @@
+# src/query_cache.py
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Caché LRU de resultados de `recomendar_motos` compartida por todas las sesiones.
+
+    Las entradas son arrays de ids de fila (de solo lectura) indexados por la
+    clave normalizada de la consulta (ver `CatalogIndex.clave_consulta`). Toda la
+    caché se invalida cuando cambia la versión del catálogo.
+
+    Args:
+        max_entradas (int, opcional): Número máximo de consultas guardadas.
+        max_bytes (int, opcional): Tamaño máximo total de los arrays guardados.
+    """
+
+    def __init__(self, max_entradas=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.version = None
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def _comprobar_version(self, version):
+        if version != self.version:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas.clear()
+            self._bytes = 0
+            self.version = version
+
+    def obtener(self, version, clave):
+        """
+        Devuelve los ids guardados para una consulta, o None si no están en caché.
+
+        Args:
+            version (str): Versión del catálogo sobre el que se consulta.
+            clave (tuple): Clave normalizada de la consulta.
+
+        Returns:
+            Optional[np.ndarray]: Ids de fila ordenados (solo lectura).
+        """
+        with self._lock:
+            self._comprobar_version(version)
+            ids = self._entradas.get(clave)
+            if ids is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return ids
+
+    def guardar(self, version, clave, ids):
+        """
+        Guarda el resultado de una consulta, desalojando las entradas menos usadas.
+
+        Args:
+            version (str): Versión del catálogo sobre el que se consultó.
+            clave (tuple): Clave normalizada de la consulta.
+            ids (np.ndarray): Ids de fila del resultado.
+        """
+        ids.setflags(write=False)
+        if ids.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._comprobar_version(version)
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior.nbytes
+            self._entradas[clave] = ids
+            self._bytes += ids.nbytes
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, desalojado = self._entradas.popitem(last=False)
+                self._bytes -= desalojado.nbytes
+                self.desalojos += 1
+
+    def invalidar(self):
+        """Vacía la caché (p. ej. tras recargar el catálogo)."""
+        with self._lock:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de uso de la caché.
+
+        Returns:
+            dict: Aciertos, fallos, desalojos, invalidaciones, entradas y bytes ocupados.
+        """
+        with self._lock:
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+            }
+
+
+# Instancia compartida por todas las sesiones del proceso
+CACHE_CONSULTAS = QueryCache()
@@ -0,0 +1,433 @@
+# src/query_service.py
+"""
+Servicio HTTP de consultas de MotoFit (JSON, sin Streamlit).
+
+    python -m src.query_service --catalogo data/motofit_demo.csv --puerto 8080
+
+Rutas:
+    GET  /salud                           Estado y versión del catálogo.
+    GET  /catalogo                        Versión, número de motos, marcas, tipos y carnets.
+    POST /recomendar                      Un perfil -> top-N de motos.
+    POST /recomendar/lote                 {"perfiles": [...]} -> top-N de cada perfil.
+    GET  /estadisticas?tipo=..&marca=..   Estadísticas del Dashboard para esos filtros.
+    GET  /modelo?marca=..&modelo=..       Ficha de una moto (o coincidencias parciales).
+    GET  /buscar?q=..&limite=..           Búsqueda por nombre (tolera erratas y palabras a medias).
+
+Un perfil tiene las claves de `recomendar_motos_batch` (presupuesto_max, carnet,
+altura y, opcionalmente, precio_min, cilindrada_min, cilindrada_max, marca y
+tipos) y puede incluir top_n, ordenar_por y ascendente. Los campos numéricos
+deben ser números JSON finitos y marca y tipos, listas de textos.
+"""
+import os
+import json
+import math
+import asyncio
+import argparse
+import functools
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from src.catalog_cache import DIRECTORIO_CACHE
+from src.catalog_index import CatalogIndex, CARNET_ORDEN
+from src.dashboard_stats import construir_cubo, estadisticas
+from src.data_preprocessing import cargar_catalogo
+from src.model_search import ModelSearchIndex
+from src.recommender_logic import recomendar_motos_batch, COLUMNAS_A_MOSTRAR
+
+ORDENACIONES = ['PRECIO', 'POTENCIA', 'ALTURA_ASIENTO', 'PESO_VACIO']
+MAX_TOP_N = 100
+MAX_CUERPO = 8 * 1024 * 1024
+
+_ESTADOS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ErrorPeticion(Exception):
+    """Petición inválida: se responde con `estado` y un mensaje de error en JSON."""
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# ── Lado de los procesos del pool ──
+# Cada proceso abre el catálogo compilado mapeado en memoria: las páginas del
+# fichero las comparte el sistema operativo entre todos los procesos.
+_INDICE = None
+_CUBO = None
+_BUSCADOR = None
+
+
+def _iniciar_proceso(path_csv, directorio_cache):
+    global _INDICE
+    _INDICE = CatalogIndex(cargar_catalogo(path_csv, directorio_cache))
+
+
+def _json_seguro(valor):
+    if isinstance(valor, (np.integer,)):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)):
+        return None if np.isnan(valor) else float(valor)
+    return valor
+
+
+def _a_json(valor):
+    # `default` de json.dumps para escalares de NumPy y otros tipos
+    return valor.item() if isinstance(valor, np.generic) else str(valor)
+
+
+def _registros(ids):
+    salida = _INDICE.materializar(ids, COLUMNAS_A_MOSTRAR)
+    return [
+        {"id": int(i), **{col: _json_seguro(v) for col, v in fila.items()}}
+        for i, fila in zip(salida.index, salida.to_dict("records"))
+    ]
+
+
+def _tarea_recomendar(perfiles, top_n, ordenar_por, ascendente):
+    resultados = recomendar_motos_batch(
+        _INDICE, pd.DataFrame(perfiles), top_n=top_n, ordenar_por=ordenar_por, ascendente=ascendente
+    )
+    # Se materializa todo el lote de una vez y se reparte por perfil
+    registros = _registros(np.concatenate(resultados)) if resultados else []
+    cortes = np.cumsum([0] + [len(ids) for ids in resultados])
+    return [registros[a:b] for a, b in zip(cortes[:-1], cortes[1:])]
+
+
+def _tarea_version():
+    return _INDICE.version
+
+
+def _tarea_estadisticas(tipo, marca):
+    global _CUBO
+    if _CUBO is None:
+        _CUBO = construir_cubo(_INDICE.df)
+    stats = estadisticas(_CUBO, tipo, marca)
+    return None if stats is None else {k: _json_seguro(v) for k, v in stats.items()}
+
+
+def _tarea_modelo(marca, modelo, limite=20):
+    df = _INDICE.df
+    seleccion = np.ones(_INDICE.n, dtype=bool)
+    if marca:
+        seleccion &= _INDICE.bitmaps['MARCA'].get(marca, np.zeros(_INDICE.n, dtype=bool))
+    modelos = df['MODELO'].astype(str)
+    exactas = seleccion & (modelos == modelo).to_numpy()
+    if not exactas.any():
+        exactas = seleccion & modelos.str.contains(modelo, case=False, regex=False).to_numpy()
+    return _registros(np.flatnonzero(exactas)[:limite])
+
+
+def _tarea_buscar(texto, limite):
+    global _BUSCADOR
+    if _BUSCADOR is None:
+        _BUSCADOR = ModelSearchIndex(_INDICE)
+    return _registros(_BUSCADOR.buscar(texto, limite))
+
+
+# ── Agrupación de peticiones ──
+
+class AgrupadorLotes:
+    """
+    Junta las peticiones de recomendación que llegan casi a la vez en un solo lote.
+
+    Las peticiones con los mismos parámetros de salida (top_n, ordenación) que
+    llegan en una ventana de `espera` segundos se resuelven con una única
+    llamada a `recomendar_motos_batch` en el pool de procesos.
+
+    Args:
+        ejecutar (Callable): Corrutina `ejecutar(perfiles, top_n, ordenar_por, ascendente)`
+            que devuelve una lista de resultados en el mismo orden.
+        max_lote (int, opcional): Perfiles máximos por lote.
+        espera (float, opcional): Segundos que se espera a que se complete un lote.
+    """
+
+    def __init__(self, ejecutar, max_lote=64, espera=0.002):
+        self.ejecutar = ejecutar
+        self.max_lote = max_lote
+        self.espera = espera
+        self._pendientes = {}
+        self.lotes = 0
+        self.peticiones = 0
+
+    async def enviar(self, clave, perfil):
+        futuro = asyncio.get_running_loop().create_future()
+        pendientes = self._pendientes.setdefault(clave, [])
+        pendientes.append((perfil, futuro))
+        self.peticiones += 1
+        if len(pendientes) >= self.max_lote:
+            self._despachar(clave)
+        elif len(pendientes) == 1:
+            asyncio.get_running_loop().call_later(self.espera, self._despachar, clave)
+        return await futuro
+
+    def _despachar(self, clave):
+        pendientes = self._pendientes.pop(clave, None)
+        if pendientes:
+            self.lotes += 1
+            asyncio.ensure_future(self._resolver(clave, pendientes))
+
+    async def _resolver(self, clave, pendientes):
+        try:
+            resultados = await self.ejecutar([p for p, _ in pendientes], *clave)
+        except Exception as e:
+            for _, futuro in pendientes:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (_, futuro), resultado in zip(pendientes, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+
+# ── Servidor ──
+
+# Campos numéricos de un perfil (los dos primeros, obligatorios)
+_CAMPOS_NUMERICOS = ("presupuesto_max", "altura", "precio_min", "cilindrada_min", "cilindrada_max")
+
+
+def _parametros_salida(datos):
+    try:
+        top_n = int(datos.get("top_n", 9))
+    except (TypeError, ValueError):
+        raise ErrorPeticion("top_n debe ser un entero.")
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise ErrorPeticion(f"top_n debe estar entre 1 y {MAX_TOP_N}.")
+    ordenar_por = datos.get("ordenar_por", "PRECIO")
+    if ordenar_por not in ORDENACIONES:
+        raise ErrorPeticion(f"ordenar_por debe ser uno de {ORDENACIONES}.")
+    return top_n, ordenar_por, bool(datos.get("ascendente", True))
+
+
+def _longitud_cuerpo(cabeceras):
+    valor = cabeceras.get("content-length", "") or "0"
+    if not (valor.isascii() and valor.isdigit()):
+        raise ErrorPeticion("Content-Length inválido.")
+    longitud = int(valor)
+    if longitud > MAX_CUERPO:
+        raise ErrorPeticion("Cuerpo demasiado grande.", 413)
+    return longitud
+
+
+def _validar_perfil(perfil):
+    if not isinstance(perfil, dict):
+        raise ErrorPeticion("Cada perfil debe ser un objeto JSON.")
+    faltan = [c for c in ("presupuesto_max", "carnet", "altura") if c not in perfil]
+    if faltan:
+        raise ErrorPeticion(f"Faltan campos del perfil: {', '.join(faltan)}.")
+    if str(perfil["carnet"]).upper() not in CARNET_ORDEN:
+        raise ErrorPeticion(f"Carnet desconocido: {perfil['carnet']}.")
+    # `recomendar_motos_batch` cambia los valores no numéricos por el valor por
+    # defecto (p. ej. sin límite de presupuesto): aquí se rechazan antes
+    for campo in _CAMPOS_NUMERICOS:
+        valor = perfil.get(campo)
+        if valor is None and campo not in ("presupuesto_max", "altura"):
+            continue
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+            raise ErrorPeticion(f"{campo} debe ser un número finito.")
+    for campo in ("marca", "tipos"):
+        valor = perfil.get(campo)
+        if valor is not None and (not isinstance(valor, list) or not all(isinstance(v, str) for v in valor)):
+            raise ErrorPeticion(f"{campo} debe ser una lista de textos.")
+    return perfil
+
+
+class QueryService:
+    """
+    Servidor HTTP asyncio que reparte las consultas en un pool de procesos.
+
+    Args:
+        path_csv (str): CSV del catálogo (se usa su versión compilada).
+        directorio_cache (str, opcional): Carpeta de los catálogos compilados.
+        procesos (int, opcional): Procesos del pool; por defecto, uno por CPU.
+        max_lote (int, opcional): Perfiles máximos por lote agrupado.
+        espera_lote (float, opcional): Ventana de agrupación en segundos.
+    """
+
+    def __init__(self, path_csv, directorio_cache=DIRECTORIO_CACHE, procesos=None, max_lote=64, espera_lote=0.002):
+        # Se compila el catálogo una vez aquí para que los procesos solo lo mapeen
+        self.indice = CatalogIndex(cargar_catalogo(path_csv, directorio_cache))
+        self.procesos = procesos or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.procesos,
+            initializer=_iniciar_proceso,
+            initargs=(path_csv, directorio_cache),
+        )
+        self.max_lote = max_lote
+        self.agrupador = AgrupadorLotes(self._recomendar_lote, max_lote=max_lote, espera=espera_lote)
+
+    async def _en_pool(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(fn, *args))
+
+    async def _recomendar_lote(self, perfiles, top_n, ordenar_por, ascendente):
+        # Los lotes grandes se reparten entre los procesos del pool
+        trozos = [perfiles[i:i + self.max_lote] for i in range(0, len(perfiles), self.max_lote)]
+        partes = await asyncio.gather(*[
+            self._en_pool(_tarea_recomendar, trozo, top_n, ordenar_por, ascendente) for trozo in trozos
+        ])
+        return [r for parte in partes for r in parte]
+
+    async def atender(self, metodo, ruta, consulta, cuerpo):
+        """
+        Resuelve una petición ya parseada.
+
+        Returns:
+            Tuple[int, dict]: Código de estado y cuerpo JSON de la respuesta.
+        """
+        if ruta == "/salud":
+            return 200, {"estado": "ok", "version": self.indice.version}
+
+        if ruta == "/catalogo":
+            return 200, {
+                "version": self.indice.version,
+                "motos": self.indice.n,
+                "marcas": sorted(map(str, self.indice.categorias["MARCA"])),
+                "tipos": sorted(map(str, self.indice.categorias["TIPO_SIMPLIFICADO"])),
+                "carnets": list(CARNET_ORDEN),
+            }
+
+        if ruta == "/estadisticas":
+            tipo = consulta.get("tipo", [None])[0]
+            marca = consulta.get("marca", [None])[0]
+            stats = await self._en_pool(_tarea_estadisticas, tipo, marca)
+            if stats is None:
+                raise ErrorPeticion("No hay datos para esos filtros.", 404)
+            return 200, {"version": self.indice.version, "estadisticas": stats}
+
+        if ruta == "/modelo":
+            modelo = consulta.get("modelo", [""])[0].strip()
+            if not modelo:
+                raise ErrorPeticion("Falta el parámetro 'modelo'.")
+            motos = await self._en_pool(_tarea_modelo, consulta.get("marca", [None])[0], modelo)
+            if not motos:
+                raise ErrorPeticion("Modelo no encontrado.", 404)
+            return 200, {"version": self.indice.version, "motos": motos}
+
+        if ruta == "/buscar":
+            texto = consulta.get("q", [""])[0].strip()
+            if not texto:
+                raise ErrorPeticion("Falta el parámetro 'q'.")
+            try:
+                limite = min(max(int(consulta.get("limite", ["20"])[0]), 1), MAX_TOP_N)
+            except ValueError:
+                raise ErrorPeticion("'limite' debe ser un entero.")
+            motos = await self._en_pool(_tarea_buscar, texto, limite)
+            return 200, {"version": self.indice.version, "motos": motos}
+
+        if ruta in ("/recomendar", "/recomendar/lote"):
+            if metodo != "POST":
+                raise ErrorPeticion("Usa POST.", 405)
+            try:
+                datos = json.loads(cuerpo or b"{}")
+            except ValueError:
+                raise ErrorPeticion("El cuerpo no es JSON válido.")
+            if not isinstance(datos, dict):
+                raise ErrorPeticion("El cuerpo debe ser un objeto JSON.")
+            salida = _parametros_salida(datos)
+            if ruta == "/recomendar":
+                motos = await self.agrupador.enviar(salida, _validar_perfil(datos))
+                return 200, {"version": self.indice.version, "motos": motos}
+            perfiles = [_validar_perfil(p) for p in datos.get("perfiles", [])]
+            resultados = await self._recomendar_lote(perfiles, *salida) if perfiles else []
+            return 200, {"version": self.indice.version, "resultados": resultados}
+
+        raise ErrorPeticion("Ruta no encontrada.", 404)
+
+    async def _conexion(self, reader, writer):
+        # HTTP/1.1 mínimo con keep-alive: una petición tras otra por conexión
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, destino, version_http = linea.decode("latin-1").split()
+                except ValueError:
+                    break
+                cabeceras = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = h.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+                try:
+                    longitud = _longitud_cuerpo(cabeceras)
+                except ErrorPeticion as e:
+                    # Sin una longitud válida no se sabe dónde acaba el cuerpo: se cierra la conexión
+                    estado, respuesta = e.estado, {"error": str(e)}
+                    cerrar = True
+                else:
+                    cuerpo = await reader.readexactly(longitud) if longitud else b""
+                    url = urlsplit(destino)
+                    try:
+                        estado, respuesta = await self.atender(
+                            metodo.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), cuerpo
+                        )
+                    except ErrorPeticion as e:
+                        estado, respuesta = e.estado, {"error": str(e)}
+                    except Exception as e:
+                        estado, respuesta = 500, {"error": repr(e)}
+                    cerrar = (cabeceras.get("connection", "").lower() == "close"
+                              or version_http == "HTTP/1.0")
+
+                datos = json.dumps(respuesta, ensure_ascii=False, default=_a_json).encode()
+                writer.write(
+                    f"HTTP/1.1 {estado} {_ESTADOS.get(estado, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(datos)}\r\n"
+                    f"Connection: {'close' if cerrar else 'keep-alive'}\r\n\r\n".encode() + datos
+                )
+                await writer.drain()
+                if cerrar:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def servir(self, host="127.0.0.1", puerto=8080):
+        """Arranca el servidor y atiende peticiones hasta que se cancele."""
+        servidor = await asyncio.start_server(self._conexion, host, puerto)
+        # Calentamiento: todos los procesos cargan el catálogo antes de la primera petición
+        versiones = await asyncio.gather(*[self._en_pool(_tarea_version) for _ in range(self.procesos)])
+        if set(versiones) != {self.indice.version}:
+            raise RuntimeError("Los procesos del pool han cargado otra versión del catálogo.")
+        print(f"MotoFit query service en http://{host}:{puerto} "
+              f"({self.indice.n} motos, versión {self.indice.version}, {self.procesos} procesos)", flush=True)
+        async with servidor:
+            await servidor.serve_forever()
+
+    def cerrar(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    """Punto de entrada del servicio de consultas."""
+    parser = argparse.ArgumentParser(description="Servicio HTTP JSON de recomendaciones de MotoFit.")
+    parser.add_argument("--catalogo", default="data/motofit_demo.csv", help="CSV del catálogo")
+    parser.add_argument("--cache-dir", default=DIRECTORIO_CACHE, help="Carpeta de catálogos compilados")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--max-lote", type=int, default=64, help="Perfiles máximos por lote agrupado")
+    parser.add_argument("--espera-lote-ms", type=float, default=2.0, help="Ventana de agrupación de peticiones")
+    args = parser.parse_args(argv)
+
+    servicio = QueryService(
+        args.catalogo, args.cache_dir, args.procesos,
+        max_lote=args.max_lote, espera_lote=args.espera_lote_ms / 1000,
+    )
+    try:
+        asyncio.run(servicio.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.cerrar()
+
+
+if __name__ == "__main__":
+    main()
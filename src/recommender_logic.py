@@ -1,6 +1,41 @@
 # src/recommender_logic.py
+import functools
+import threading
+import numpy as np
 import pandas as pd
 
+from src.catalog_index import CatalogIndex, CARNET_ORDEN, BUFFER_ALTURA_MM, altura_asiento_maxima, version_catalogo
+from src.query_cache import CACHE_CONSULTAS
+from src.metrics import METRICAS
+from src.pareto import frentes_pareto, ORDEN_PARETO
+
+# Columnas a mostrar
+COLUMNAS_A_MOSTRAR = [
+    'MARCA', 'MODELO', 'TIPO_SIMPLIFICADO',
+    'PRECIO', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO'
+]
+
+# Índice del último catálogo recibido sin `indice` precalculado
+_indice_implicito = None
+_lock_indice = threading.Lock()
+
+
+def _indice_de(df):
+    # Reutiliza el índice mientras el contenido de `df` no cambie: comprobarlo es
+    # un hash por columna, mucho menos que ordenar cada columna y crear los bitmaps
+    global _indice_implicito
+    version = version_catalogo(df)
+    with _lock_indice:
+        anterior = _indice_implicito
+    if anterior is not None and anterior.version == version:
+        return anterior
+    indice = CatalogIndex(df, version=version, anterior=anterior)
+    with _lock_indice:
+        _indice_implicito = indice
+    return indice
+
+
+@METRICAS.medir("recomendar_motos")
 def recomendar_motos(
     df,
     presupuesto_max,
@@ -13,12 +48,17 @@ def recomendar_motos(
     ascendente=True,
     cilindrada_min=0,
     cilindrada_max=2000,
+    indice=None,
+    cache=CACHE_CONSULTAS,
+    columnas=COLUMNAS_A_MOSTRAR,
 ):
     """
     Filtra y recomienda motocicletas basadas en una serie de criterios de usuario.
 
-    Esta función aplica una secuencia de filtros para refinar el DataFrame de motos
-    y, finalmente, ordena el resultado según el criterio especificado.
+    Los filtros se resuelven sobre un `CatalogIndex` (búsquedas binarias en las
+    columnas de rango y bitmaps en las categóricas), de forma que no se copia ni
+    se recorre el DataFrame completo en cada consulta. Finalmente se ordena el
+    resultado según el criterio especificado.
 
     Args:
         df (pd.DataFrame): El DataFrame de entrada con la información de las motos.
@@ -29,77 +69,426 @@ def recomendar_motos(
         marca (List[str], opcional): Lista de marcas de motos seleccionadas.
         tipos (List[str], opcional): Lista de tipos de moto seleccionados.
         ordenar_por (str, opcional): Columna por la cual ordenar los resultados.
-                                      Por defecto es 'PRECIO'.
+                                      Por defecto es 'PRECIO'. Con `ORDEN_PARETO`
+                                      se devuelven las motos por capas de Pareto
+                                      (ver `frentes_pareto`), con su capa en la
+                                      columna CAPA_PARETO.
         ascendente (bool, opcional): Si la ordenación es ascendente (True) o descendente (False).
                                       Por defecto es True.
         cilindrada_min (int, opcional): Cilindrada mínima en cc. Por defecto es 0.
         cilindrada_max (int, opcional): Cilindrada máxima en cc. Por defecto es 2000.
+        indice (CatalogIndex, opcional): Índice precalculado sobre `df`. Si no se
+                                      indica, se usa uno construido sobre `df` y
+                                      memorizado mientras su contenido no cambie.
+        cache (QueryCache, opcional): Caché de resultados compartida entre sesiones.
+                                      Solo se usa junto con un `indice` precalculado;
+                                      `None` la desactiva.
+        columnas (List[str], opcional): Columnas del resultado. Con una lista
+                                      vacía solo se devuelven los ids (el índice),
+                                      sin materializar ninguna columna.
 
     Returns:
         pd.DataFrame: Un DataFrame filtrado y ordenado con las motos que cumplen los criterios.
+                      Con `indice`, indexado por el id de fila de cada moto en el
+                      catálogo; sin él, con un índice 0..n-1 nuevo, como siempre.
                       Devuelve un DataFrame vacío si no se encuentra ninguna moto.
     """
-    
-    df_filtrado = df.copy()
-
-    # --- Convertir tipos de datos y manejar N/A una sola vez al inicio ---
-    df_filtrado["CILINDRADA"] = pd.to_numeric(df_filtrado["CILINDRADA"], errors="coerce")
-    df_filtrado["PRECIO"] = pd.to_numeric(df_filtrado["PRECIO"], errors="coerce")
-    df_filtrado["ALTURA_ASIENTO"] = pd.to_numeric(df_filtrado["ALTURA_ASIENTO"], errors="coerce")
-    
-    # --- Aplicar todos los filtros en secuencia sobre el mismo DataFrame ---
-    
-    # 1. Filtro de Precio
-    df_filtrado = df_filtrado[
-        (df_filtrado['PRECIO'] <= presupuesto_max) &
-        (df_filtrado['PRECIO'] >= precio_min)
-    ]
-    
-    # 2. Filtro de Cilindrada
-    df_filtrado = df_filtrado[
-        (df_filtrado["CILINDRADA"] >= cilindrada_min) &
-        (df_filtrado["CILINDRADA"] <= cilindrada_max)
-    ]
-
-    # 3. Filtro de Carnet
-    carnet_orden = {'AM': 0, 'B': 1, 'A1': 1, 'A2': 2, 'A': 3}
-    carnet_usuario = carnet_orden.get(str(carnet).upper())
-    
+
+    carnet_usuario = CARNET_ORDEN.get(str(carnet).upper())
+    if carnet_usuario is None:
+        return pd.DataFrame()
+
+    # Sin índice precalculado se devuelve un índice 0..n-1 nuevo, como siempre
+    ids_en_indice = indice is not None
+    if indice is None:
+        indice, cache = _indice_de(df), None
+    if ordenar_por == ORDEN_PARETO:
+        ascendente = True  # la dirección no aplica a las capas de Pareto
+
+    clave = None
+    if cache is not None:
+        clave = indice.clave_consulta(
+            presupuesto_max,
+            carnet_usuario,
+            altura,
+            precio_min=precio_min,
+            marca=marca,
+            tipos=tipos,
+            cilindrada_min=cilindrada_min,
+            cilindrada_max=cilindrada_max,
+            ordenar_por=ordenar_por,
+            ascendente=ascendente,
+        )
+        ids = cache.obtener(indice.version, clave)
+        if ids is not None:
+            METRICAS.contar("recomendar_motos.cache_aciertos")
+            if ordenar_por == ORDEN_PARETO:
+                return _con_capas(indice, ids[0], ids[1], columnas)
+            return indice.materializar(ids, columnas)
+
+    ids = indice.filtrar(
+        presupuesto_max,
+        carnet_usuario,
+        altura,
+        precio_min=precio_min,
+        marca=marca,
+        tipos=tipos,
+        cilindrada_min=cilindrada_min,
+        cilindrada_max=cilindrada_max,
+    )
+    if ordenar_por == ORDEN_PARETO:
+        with METRICAS.tramo("recomendar_motos.pareto"):
+            ids, capas = frentes_pareto(indice, ids)
+        METRICAS.contar("recomendar_motos.filas", len(ids))
+        if cache is not None:
+            # Los frentes se guardan junto con su capa: una fila de ids y otra de capas
+            cache.guardar(indice.version, clave, np.vstack([ids, capas]))
+        resultado = _con_capas(indice, ids, capas, columnas)
+        return resultado if ids_en_indice else resultado.reset_index(drop=True)
+
+    ids = indice.ordenar(ids, ordenar_por, ascendente)
+    METRICAS.contar("recomendar_motos.filas", len(ids))
+    if cache is not None:
+        cache.guardar(indice.version, clave, ids)
+
+    resultado = indice.materializar(ids, columnas)
+    return resultado if ids_en_indice else resultado.reset_index(drop=True)
+
+
+def _con_capas(indice, ids, capas, columnas):
+    resultado = indice.materializar(ids, columnas)
+    resultado['CAPA_PARETO'] = capas
+    return resultado
+
+
+# Peso de cada criterio en la puntuación de afinidad (suman 1)
+PESOS_AFINIDAD = {
+    'ergonomia': 0.30,
+    'presupuesto': 0.30,
+    'potencia_peso': 0.15,
+    'tipo': 0.15,
+    'cilindrada': 0.05,
+    'marca': 0.05,
+}
+
+
+@functools.lru_cache(maxsize=4)
+def _percentil_potencia_peso(indice):
+    # Percentil (0-1) de la relación potencia/peso de cada moto en el catálogo;
+    # se calcula una vez por índice. Las motos sin dato quedan en la mitad.
+    relacion = pd.Series(indice.numericas['POTENCIA'] / indice.numericas['PESO_VACIO'])
+    percentil = relacion.rank(pct=True).fillna(0.5).to_numpy()
+    percentil.setflags(write=False)
+    return percentil
+
+
+def puntuar_motos(
+    indice,
+    presupuesto_max,
+    carnet_usuario,
+    altura,
+    precio_min=0,
+    marca=None,
+    tipos=None,
+    cilindrada_min=0,
+    cilindrada_max=2000,
+    pesos=PESOS_AFINIDAD,
+):
+    """
+    Calcula la puntuación de afinidad (0-1) de cada moto del catálogo para un usuario.
+
+    Cada criterio aporta un valor entre 0 y 1 y se combina con `pesos`. Salvo el
+    carnet, que sigue siendo un requisito (las motos que no se pueden conducir
+    puntúan -inf), los criterios penalizan en lugar de excluir:
+
+    - ergonomia: 1 si el asiento no supera `(altura * 0.46 - 3) * 10` mm; baja a 0.5
+      en el margen de `BUFFER_ALTURA_MM` que admite el filtro y a 0 un margen después.
+    - presupuesto: entre 0.5 y 1 dentro de [precio_min, presupuesto_max], más cuanto
+      más se acerca al máximo; por encima cae a 0 al superarlo en un 25 %.
+    - potencia_peso: percentil de la relación potencia/peso en el catálogo.
+    - tipo y marca: 1 si está entre los seleccionados (o no hay selección), 0 si no.
+    - cilindrada: 1 dentro del rango; cae a 0 a 250 cc de distancia.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+        presupuesto_max (float): Presupuesto máximo en euros.
+        carnet_usuario (int): Ordinal del carnet del usuario (ver `CARNET_ORDEN`).
+        altura (float): Altura del usuario en cm.
+        precio_min (float, opcional): Presupuesto mínimo en euros.
+        marca (List[str], opcional): Marcas preferidas.
+        tipos (List[str], opcional): Tipos preferidos.
+        cilindrada_min (float, opcional): Cilindrada mínima preferida.
+        cilindrada_max (float, opcional): Cilindrada máxima preferida.
+        pesos (dict, opcional): Peso de cada criterio.
+
+    Returns:
+        np.ndarray: Puntuación por id de fila (-inf para las motos no permitidas).
+    """
+    precio = indice.numericas['PRECIO']
+    asiento = indice.numericas['ALTURA_ASIENTO']
+    cilindrada = indice.numericas['CILINDRADA']
+
+    margen = (altura_asiento_maxima(altura) - BUFFER_ALTURA_MM) - asiento
+    ergonomia = np.nan_to_num(np.clip(1 + margen / (2 * BUFFER_ALTURA_MM), 0, 1), nan=0.5)
+
+    presupuesto_max = max(float(presupuesto_max), 1.0)
+    precio_min = min(float(precio_min), presupuesto_max)
+    dentro = 0.5 + 0.5 * (precio - precio_min) / max(presupuesto_max - precio_min, 1.0)
+    encima = 0.5 * np.clip(1 - (precio - presupuesto_max) / (0.25 * presupuesto_max), 0, 1)
+    presupuesto = np.where(precio > presupuesto_max, encima, np.where(precio < precio_min, 0.25, dentro))
+    presupuesto = np.nan_to_num(presupuesto, nan=0.0)
+
+    distancia_cc = np.maximum(cilindrada_min - cilindrada, cilindrada - cilindrada_max).clip(min=0)
+    cc = np.nan_to_num(np.clip(1 - distancia_cc / 250, 0, 1), nan=0.5)
+
+    def preferencia(col, seleccion):
+        seleccion = _lista(seleccion)
+        if not seleccion or seleccion == ["Todas"]:
+            return 1.0
+        return _permitidos(indice, col, [seleccion])[0][indice.codigos[col]].astype(np.float64)
+
+    puntuacion = (
+        pesos['ergonomia'] * ergonomia
+        + pesos['presupuesto'] * presupuesto
+        + pesos['potencia_peso'] * _percentil_potencia_peso(indice)
+        + pesos['tipo'] * preferencia('TIPO_SIMPLIFICADO', tipos)
+        + pesos['marca'] * preferencia('MARCA', marca)
+        + pesos['cilindrada'] * cc
+    )
+    return np.where(indice.carnet_ordinal <= carnet_usuario, puntuacion, -np.inf)
+
+
+def recomendar_por_afinidad(
+    df,
+    presupuesto_max,
+    carnet,
+    altura,
+    precio_min=0,
+    marca=None,
+    tipos=None,
+    cilindrada_min=0,
+    cilindrada_max=2000,
+    top_k=9,
+    indice=None,
+    pesos=PESOS_AFINIDAD,
+):
+    """
+    Recomienda las `top_k` motos con mayor puntuación de afinidad (ver `puntuar_motos`).
+
+    A diferencia de `recomendar_motos`, no descarta las motos que incumplen
+    ligeramente algún criterio sino que las penaliza, y solo ordena las `top_k`
+    mejores (selección parcial con `np.argpartition`) en lugar de todo el catálogo.
+
+    Args:
+        df (pd.DataFrame): Catálogo de motos.
+        presupuesto_max (int): Presupuesto máximo del usuario en euros.
+        carnet (str): Carnet del usuario ('AM', 'B', 'A1', 'A2' o 'A').
+        altura (int): Altura del usuario en cm.
+        precio_min (int, opcional): Presupuesto mínimo.
+        marca (List[str], opcional): Marcas preferidas.
+        tipos (List[str], opcional): Tipos preferidos.
+        cilindrada_min (int, opcional): Cilindrada mínima preferida.
+        cilindrada_max (int, opcional): Cilindrada máxima preferida.
+        top_k (int, opcional): Número de motos a devolver.
+        indice (CatalogIndex, opcional): Índice precalculado sobre `df`.
+        pesos (dict, opcional): Peso de cada criterio.
+
+    Returns:
+        pd.DataFrame: Las motos de mayor a menor afinidad, con la columna AFINIDAD
+                      (0-100) e indexadas por id de fila. Vacío si el carnet no es válido.
+    """
+    carnet_usuario = CARNET_ORDEN.get(str(carnet).upper())
     if carnet_usuario is None:
         return pd.DataFrame()
+    if indice is None:
+        indice = _indice_de(df)
+
+    puntuacion = puntuar_motos(
+        indice, presupuesto_max, carnet_usuario, altura,
+        precio_min=precio_min, marca=marca, tipos=tipos,
+        cilindrada_min=cilindrada_min, cilindrada_max=cilindrada_max, pesos=pesos,
+    )
+    validas = int(np.isfinite(puntuacion).sum())
+    k = min(top_k, validas)
+    if k <= 0:
+        return pd.DataFrame()
+
+    candidatos = np.argpartition(-puntuacion, k - 1)[:k] if k < indice.n else np.arange(indice.n)
+    # Mayor puntuación primero; a igualdad, el orden del catálogo
+    ids = candidatos[np.lexsort((candidatos, -puntuacion[candidatos]))][:k]
+
+    salida = indice.materializar(ids, COLUMNAS_A_MOSTRAR)
+    salida['AFINIDAD'] = np.round(puntuacion[ids] * 100, 1)
+    return salida
+
+
+def _lista(valor):
+    # Normaliza un filtro de marcas/tipos de un perfil: None, lista o "A|B"
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return None
+    if isinstance(valor, str):
+        valor = [v.strip() for v in valor.split("|") if v.strip()]
+    return list(valor) or None
+
+
+def _permitidos(indice, col, selecciones):
+    # Matriz (perfiles × categorías + 1) con las categorías aceptadas por cada
+    # perfil; la última columna corresponde a las filas sin valor.
+    categorias = indice.categorias[col]
+    posicion = {valor: k for k, valor in enumerate(categorias)}
+    permitidos = np.zeros((len(selecciones), len(categorias) + 1), dtype=bool)
+    for p, seleccion in enumerate(selecciones):
+        if not seleccion or seleccion == ["Todas"]:
+            permitidos[p, :] = True
+            continue
+        for valor in seleccion:
+            k = posicion.get(valor)
+            if k is not None:
+                permitidos[p, k] = True
+    return permitidos
+
+
+def recomendar_motos_batch(
+    indice,
+    perfiles,
+    top_n=9,
+    ordenar_por='PRECIO',
+    ascendente=True,
+    max_celdas=1 << 22,
+    ancho_tramo=8192,
+):
+    """
+    Recomienda motos para muchos perfiles de usuario a la vez.
+
+    Aplica los mismos filtros que `recomendar_motos`, pero evalúa un bloque de
+    perfiles contra todo el catálogo con máscaras matriciales (perfiles × motos)
+    en lugar de un bucle de Python. El catálogo se recorre en el orden de
+    `ordenar_por`, así que las N primeras coincidencias de cada fila de la
+    máscara son directamente su top-N.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+        perfiles (pd.DataFrame | List[dict]): Un perfil por fila con las claves
+            `presupuesto_max`, `carnet` y `altura` y, opcionalmente, `precio_min`,
+            `cilindrada_min`, `cilindrada_max`, `marca` y `tipos` (listas o
+            cadenas separadas por '|').
+        top_n (int, opcional): Número de motos a devolver por perfil. Por defecto es 9.
+        ordenar_por (str, opcional): Columna por la cual ordenar los resultados.
+        ascendente (bool, opcional): Dirección de la ordenación.
+        max_celdas (int, opcional): Tamaño máximo de cada máscara (perfiles × motos);
+            limita la memoria usada por bloque.
+        ancho_tramo (int, opcional): Número de motos evaluadas por tramo de la máscara.
+
+    Returns:
+        List[np.ndarray]: Para cada perfil, los ids de fila de sus `top_n` motos.
+    """
+    perfiles = pd.DataFrame(perfiles).reset_index(drop=True)
+    total = len(perfiles)
+    if total == 0:
+        return []
+
+    def columna(nombre, defecto):
+        if nombre not in perfiles.columns:
+            return np.full(total, defecto, dtype="float64")
+        return pd.to_numeric(perfiles[nombre], errors="coerce").fillna(defecto).to_numpy(dtype="float64")
+
+    presupuesto_max = columna('presupuesto_max', np.inf)
+    precio_min = columna('precio_min', 0)
+    cilindrada_min = columna('cilindrada_min', 0)
+    cilindrada_max = columna('cilindrada_max', 2000)
+    altura_max = altura_asiento_maxima(columna('altura', np.nan))
+    carnets = perfiles['carnet'] if 'carnet' in perfiles.columns else pd.Series([None] * total)
+    carnet_usuario = np.array(
+        [CARNET_ORDEN.get(str(c).upper(), -1) for c in carnets], dtype=np.int16
+    )
+    marcas = [_lista(v) for v in perfiles.get('marca', pd.Series([None] * total))]
+    tipos = [_lista(v) for v in perfiles.get('tipos', pd.Series([None] * total))]
+
+    # Columnas del catálogo permutadas según el orden de salida
+    orden = indice.orden_completo(ordenar_por, ascendente)
+    precio = indice.numericas['PRECIO'][orden]
+    cilindrada = indice.numericas['CILINDRADA'][orden]
+    altura_asiento = indice.numericas['ALTURA_ASIENTO'][orden]
+    carnet_moto = indice.carnet_ordinal[orden]
+    codigo_marca = indice.codigos['MARCA'][orden]
+    codigo_tipo = indice.codigos['TIPO_SIMPLIFICADO'][orden]
+
+    marcas_ok = _permitidos(indice, 'MARCA', marcas)
+    tipos_ok = _permitidos(indice, 'TIPO_SIMPLIFICADO', tipos)
+
+    # Cota superior de coincidencias de cada perfil, a partir del índice: los
+    # perfiles sin ninguna moto posible no llegan a evaluarse y el resto deja de
+    # buscar en cuanto alcanza su cota.
+    limites = {
+        'PRECIO': (precio_min, presupuesto_max),
+        'CILINDRADA': (cilindrada_min, cilindrada_max),
+        'ALTURA_ASIENTO': (np.full(total, -np.inf), altura_max),
+    }
+    cota = np.full(total, top_n, dtype=np.int64)
+    for col, (lo, hi) in limites.items():
+        ordenados = indice.ordenados[col]
+        en_rango = np.searchsorted(ordenados, hi, side="right") - np.searchsorted(ordenados, lo, side="left")
+        cota = np.minimum(cota, en_rango)
+    por_carnet = np.cumsum(np.bincount(np.minimum(indice.carnet_ordinal, 4), minlength=5))
+    cota = np.minimum(cota, np.where(carnet_usuario >= 0, por_carnet[np.clip(carnet_usuario, 0, 4)], 0))
+    for col, permitidos in (('MARCA', marcas_ok), ('TIPO_SIMPLIFICADO', tipos_ok)):
+        codigos = indice.codigos[col]
+        # Las filas sin valor (código -1) se cuentan en la última columna
+        por_valor = np.bincount(np.where(codigos < 0, permitidos.shape[1] - 1, codigos),
+                                minlength=permitidos.shape[1])
+        cota = np.minimum(cota, permitidos.astype(np.int64) @ por_valor)
+    restantes = np.maximum(cota, 0)
+
+    # Si se ordena por una columna de rango, cada perfil solo puede coincidir en
+    # una ventana contigua del catálogo ordenado.
+    ventana_ini = np.zeros(total, dtype=np.int64)
+    ventana_fin = np.full(total, len(orden), dtype=np.int64)
+    if ordenar_por in limites:
+        lo, hi = limites[ordenar_por]
+        valores = indice.numericas[ordenar_por][orden]
+        if ascendente:
+            ventana_ini = np.searchsorted(valores, lo, side="left")
+            ventana_fin = np.searchsorted(valores, hi, side="right")
+        else:
+            ventana_ini = np.searchsorted(-valores, -hi, side="left")
+            ventana_fin = np.searchsorted(-valores, -lo, side="right")
+
+    # El catálogo se recorre por tramos de columnas: un perfil deja de evaluarse
+    # en cuanto completa su top-N, así que los perfiles amplios solo tocan el
+    # principio de su ventana.
+    ancho = max(1, min(len(orden), ancho_tramo))
+    bloque = max(1, max_celdas // ancho)
+    pendientes = np.flatnonzero(restantes > 0)
+    pendientes = pendientes[np.argsort(ventana_ini[pendientes], kind="stable")]
+    perfil_sel, ids_sel = [], []
+
+    for inicio in range(0, len(pendientes), bloque):
+        activos = pendientes[inicio:inicio + bloque]
+        c0 = int(ventana_ini[activos].min())
+        while activos.size and c0 < len(orden):
+            c = slice(c0, c0 + ancho)
+            a = activos[:, None]
+
+            mascara = (precio[c] >= precio_min[a]) & (precio[c] <= presupuesto_max[a])
+            mascara &= (cilindrada[c] >= cilindrada_min[a]) & (cilindrada[c] <= cilindrada_max[a])
+            mascara &= altura_asiento[c] <= altura_max[a]
+            mascara &= carnet_moto[c] <= carnet_usuario[a]
+            mascara &= marcas_ok[a, codigo_marca[c]]
+            mascara &= tipos_ok[a, codigo_tipo[c]]
+
+            # Primeras coincidencias de cada fila hasta completar su top-N
+            seleccion = mascara & (np.cumsum(mascara, axis=1, dtype=np.int32) <= restantes[a])
+            filas, columnas = np.nonzero(seleccion)
+            perfil_sel.append(activos[filas])
+            ids_sel.append(orden[c0 + columnas])
+
+            restantes[activos] -= seleccion.sum(axis=1)
+            c0 += ancho
+            activos = activos[(restantes[activos] > 0) & (ventana_fin[activos] > c0)]
 
-    df_filtrado = df_filtrado[
-        df_filtrado['CARNET_MINIMO'].map(carnet_orden) <= carnet_usuario
-    ]
-    
-    # 4. Filtro de Altura (regla simple + buffer)
-    altura_max_calculada = (altura * 0.46 - 3) * 10  # mm
-    BUFFER_ALTURA_MM = 80
-    df_filtrado = df_filtrado[
-        df_filtrado['ALTURA_ASIENTO'] <= altura_max_calculada + BUFFER_ALTURA_MM
-    ]
-
-    # 5. Filtro de Marca (si se seleccionó)
-    if marca and marca != ["Todas"]:
-        df_filtrado = df_filtrado[df_filtrado['MARCA'].isin(marca)]
-        
-    # 6. Filtro de Tipo (si se seleccionó)
-    if tipos:
-        df_filtrado = df_filtrado[df_filtrado['TIPO_SIMPLIFICADO'].isin(tipos)]
-    
-    # --- Preparar y ordenar el resultado ---
-    
-    # Eliminar filas con N/A de las columnas clave para una ordenación limpia
-    df_filtrado = df_filtrado.dropna(subset=[ordenar_por])
-    
-    # Ordenar
-    df_resultado = df_filtrado.sort_values(by=ordenar_por, ascending=ascendente)
-
-    # Columnas a mostrar
-    columnas_a_mostrar = [
-        'MARCA', 'MODELO', 'TIPO_SIMPLIFICADO',
-        'PRECIO', 'ALTURA_ASIENTO', 'POTENCIA', 'PESO_VACIO'
-    ]
-    columnas_existentes = [c for c in columnas_a_mostrar if c in df_resultado.columns]
-
-    return df_resultado[columnas_existentes].reset_index(drop=True)
\ No newline at end of file
+    # Agrupar por perfil conservando el orden de aparición
+    perfil_sel = np.concatenate(perfil_sel) if perfil_sel else np.empty(0, dtype=np.int64)
+    ids_sel = np.concatenate(ids_sel) if ids_sel else np.empty(0, dtype=np.int64)
+    agrupado = np.argsort(perfil_sel, kind="stable")
+    cortes = np.cumsum(np.bincount(perfil_sel, minlength=total))[:-1]
+    return np.split(ids_sel[agrupado], cortes)
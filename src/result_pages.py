@@ -0,0 +1,82 @@
+# src/result_pages.py
+import math
+import numpy as np
+
+# Tarjetas por página de resultados
+POR_PAGINA = 9
+
+
+class PaginasResultados:
+    """
+    Resultados de una búsqueda listos para paginar.
+
+    Guarda los ids de fila en el orden en que se muestran (un array de solo
+    lectura) y calcula una sola vez dónde empieza cada página y, en el modo
+    Pareto, qué capas hay en cada una. Pasar de página es cortar el array:
+    no se vuelve a filtrar, ordenar ni materializar nada, así que cuesta lo
+    mismo con 20 resultados que con 200.000.
+
+    Args:
+        ids (np.ndarray): Ids de fila en el orden en que se muestran.
+        capas (np.ndarray, opcional): Capa de Pareto de cada resultado (ver `frentes_pareto`).
+        por_pagina (int, opcional): Resultados por página.
+    """
+
+    def __init__(self, ids, capas=None, por_pagina=POR_PAGINA):
+        self.ids = np.array(ids, dtype=np.int64)
+        self.ids.setflags(write=False)
+        self.por_pagina = por_pagina
+        self.total = len(self.ids)
+        self.total_paginas = max(1, math.ceil(self.total / por_pagina))
+        # Inicio de cada página y fin de la última
+        self.limites = np.minimum(np.arange(self.total_paginas + 1) * por_pagina, self.total)
+
+        self.en_frente = 0
+        self.capas_pagina = None
+        if capas is not None and self.total:
+            capas = np.asarray(capas, dtype=np.int64)
+            self.en_frente = int((capas == 1).sum())
+            inicios = self.limites[:-1]
+            # (mínima, máxima) capa de cada página
+            self.capas_pagina = np.column_stack([np.minimum.reduceat(capas, inicios), np.maximum.reduceat(capas, inicios)])
+
+    @classmethod
+    def de_resultados(cls, resultados, por_pagina=POR_PAGINA):
+        """
+        Crea las páginas a partir del DataFrame de `recomendar_motos` o `recomendar_por_afinidad`.
+
+        Args:
+            resultados (pd.DataFrame): Resultados indexados por id de fila (puede no tener columnas).
+            por_pagina (int, opcional): Resultados por página.
+
+        Returns:
+            PaginasResultados: Las páginas de esos resultados.
+        """
+        capas = resultados["CAPA_PARETO"].to_numpy() if "CAPA_PARETO" in resultados.columns else None
+        return cls(resultados.index.to_numpy(), capas, por_pagina)
+
+    def __len__(self):
+        return self.total
+
+    def pagina_valida(self, pagina):
+        """Ajusta un número de página (desde 1) al rango de páginas existentes."""
+        return max(1, min(int(pagina), self.total_paginas))
+
+    def ids_pagina(self, pagina):
+        """
+        Devuelve los ids de fila de una página.
+
+        Args:
+            pagina (int): Número de página (desde 1; se ajusta al rango existente).
+
+        Returns:
+            np.ndarray: Vista de solo lectura de los ids de la página.
+        """
+        pagina = self.pagina_valida(pagina)
+        return self.ids[self.limites[pagina - 1]:self.limites[pagina]]
+
+    def ids_vecinas(self, pagina):
+        """Ids de fila de las páginas anterior y siguiente a `pagina` (las que existan)."""
+        pagina = self.pagina_valida(pagina)
+        vecinas = [self.ids_pagina(p) for p in (pagina - 1, pagina + 1) if 1 <= p <= self.total_paginas]
+        return np.concatenate(vecinas) if vecinas else self.ids[:0]
@@ -0,0 +1,218 @@
+# src/similar_bikes.py
+import heapq
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from src.catalog_index import altura_asiento_maxima
+
+# Especificaciones que definen el "parecido" entre dos motos
+COLUMNAS_SIMILITUD = ['PRECIO', 'POTENCIA', 'CILINDRADA', 'PESO_VACIO', 'ALTURA_ASIENTO']
+
+# Columnas de las que depende el índice (especificaciones y filtro de carnet)
+COLUMNAS_INDICE = COLUMNAS_SIMILITUD + ['CARNET_MINIMO']
+
+# Vecinos guardados por moto (las consultas con filtros los recortan)
+VECINOS_PRECALCULADOS = 32
+
+
+def _vecinos_por_bloques(X, k, tam_bloque=1024):
+    # Top-k vecinos de cada punto por fuerza bruta en bloques: la memoria es
+    # O(tam_bloque × n) y nunca O(n²).
+    n = len(X)
+    k = min(k, n - 1)
+    normas = np.einsum("ij,ij->i", X, X)
+    vecinos = np.empty((n, max(k, 0)), dtype=np.int64)
+    for inicio in range(0, n, tam_bloque):
+        fin = min(n, inicio + tam_bloque)
+        d = normas[inicio:fin, None] + normas[None, :] - 2.0 * (X[inicio:fin] @ X.T)
+        d[np.arange(fin - inicio), np.arange(inicio, fin)] = np.inf
+        top = np.argpartition(d, k - 1, axis=1)[:, :k] if k > 0 else np.empty((fin - inicio, 0), dtype=np.int64)
+        d_top = np.take_along_axis(d, top, axis=1)
+        vecinos[inicio:fin] = np.take_along_axis(top, np.argsort(d_top, axis=1, kind="stable"), axis=1)
+    return vecinos
+
+
+def _normalizar(indice):
+    # Matriz (motos × especificaciones) estandarizada; los N/A toman la mediana
+    # de su columna para no quedar aislados en el espacio.
+    X = np.column_stack([indice.numericas[col] for col in COLUMNAS_SIMILITUD])
+    for j in range(X.shape[1]):
+        columna = X[:, j]
+        validos = ~np.isnan(columna)
+        mediana = np.median(columna[validos]) if validos.any() else 0.0
+        columna[~validos] = mediana
+        escala = columna.std()
+        X[:, j] = (columna - columna.mean()) / (escala if escala > 0 else 1.0)
+    return X
+
+
+class SimilarBikesIndex:
+    """
+    KD-tree sobre las especificaciones normalizadas del catálogo.
+
+    Se construye una vez por versión del catálogo y responde a "motos parecidas
+    a esta" con una búsqueda best-first, sin calcular distancias entre todos los
+    pares. Opcionalmente respeta el carnet y la altura del usuario, con la misma
+    regla que `recomendar_motos`.
+
+    Además guarda las listas de vecinos más cercanos de cada moto: en catálogos
+    de hasta `max_precalculo` motos se calculan todas al construir el índice y en
+    los mayores se memorizan tras la primera consulta. Una consulta que se puede
+    responder con esa lista (la mayoría) es una simple búsqueda en memoria.
+
+    Args:
+        indice (CatalogIndex): Índice del catálogo.
+        tam_hoja (int, opcional): Número máximo de motos por hoja del árbol.
+        max_precalculo (int, opcional): Tamaño máximo de catálogo para precalcular
+            todas las listas de vecinos al construir el índice.
+        max_memorizadas (int, opcional): Listas de vecinos memorizadas en catálogos grandes.
+    """
+
+    def __init__(self, indice, tam_hoja=64, max_precalculo=20000, max_memorizadas=100000):
+        self.indice = indice
+        self.version = indice.version
+        self.X = _normalizar(indice)
+        self.perm = np.arange(indice.n)
+
+        asiento = np.nan_to_num(indice.numericas['ALTURA_ASIENTO'], nan=np.inf)
+        inicio, fin, izquierda, derecha, caja_min, caja_max = [], [], [], [], [], []
+        carnet_min, asiento_min = [], []
+
+        def nuevo_nodo(lo, hi):
+            ids = self.perm[lo:hi]
+            puntos = self.X[ids]
+            # Mínimos de carnet y asiento del subárbol: permiten descartarlo
+            # entero cuando el usuario no puede conducir ninguna de sus motos.
+            carnet_min.append(indice.carnet_ordinal[ids].min() if hi > lo else np.inf)
+            asiento_min.append(asiento[ids].min() if hi > lo else np.inf)
+            inicio.append(lo)
+            fin.append(hi)
+            izquierda.append(-1)
+            derecha.append(-1)
+            caja_min.append(puntos.min(axis=0) if hi > lo else np.zeros(self.X.shape[1]))
+            caja_max.append(puntos.max(axis=0) if hi > lo else np.zeros(self.X.shape[1]))
+            return len(inicio) - 1
+
+        pendientes = [nuevo_nodo(0, indice.n)]
+        while pendientes:
+            nodo = pendientes.pop()
+            lo, hi = inicio[nodo], fin[nodo]
+            if hi - lo <= tam_hoja:
+                continue
+            # División por la mediana de la dimensión más extendida
+            dim = int(np.argmax(caja_max[nodo] - caja_min[nodo]))
+            if caja_max[nodo][dim] == caja_min[nodo][dim]:
+                continue
+            mitad = (hi - lo) // 2
+            tramo = self.perm[lo:hi]
+            self.perm[lo:hi] = tramo[np.argpartition(self.X[tramo, dim], mitad)]
+            izquierda[nodo] = nuevo_nodo(lo, lo + mitad)
+            derecha[nodo] = nuevo_nodo(lo + mitad, hi)
+            pendientes.extend([izquierda[nodo], derecha[nodo]])
+
+        # Los enlaces del árbol se recorren desde Python: listas en lugar de arrays
+        self.inicio = inicio
+        self.fin = fin
+        self.hijos = [(i, d) if i >= 0 else None for i, d in zip(izquierda, derecha)]
+        self.caja_min = np.array(caja_min)
+        self.caja_max = np.array(caja_max)
+        self.carnet_min = [float(c) for c in carnet_min]
+        self.asiento_min = [float(a) for a in asiento_min]
+
+        self.max_memorizadas = max_memorizadas
+        self._memorizadas = OrderedDict()
+        self._lock = threading.Lock()
+        self.vecinos = (
+            _vecinos_por_bloques(self.X, VECINOS_PRECALCULADOS) if indice.n <= max_precalculo else None
+        )
+
+    def _lista_vecinos(self, fila):
+        # Lista precalculada o memorizada de los vecinos más cercanos de `fila`
+        if self.vecinos is not None:
+            return self.vecinos[fila]
+        with self._lock:
+            lista = self._memorizadas.get(fila)
+            if lista is not None:
+                self._memorizadas.move_to_end(fila)
+                return lista
+        lista = self._buscar(fila, VECINOS_PRECALCULADOS)
+        with self._lock:
+            self._memorizadas[fila] = lista
+            while len(self._memorizadas) > self.max_memorizadas:
+                self._memorizadas.popitem(last=False)
+        return lista
+
+    def similares(self, fila, k=6, carnet_usuario=None, altura=None):
+        """
+        Devuelve las `k` motos más parecidas a una dada.
+
+        Args:
+            fila (int): Id de fila de la moto de referencia.
+            k (int, opcional): Número de motos a devolver. Por defecto es 6.
+            carnet_usuario (int, opcional): Ordinal del carnet del usuario
+                (ver `CARNET_ORDEN`); si se indica, se excluyen las motos que no puede conducir.
+            altura (int, opcional): Altura del usuario en cm; si se indica, se
+                excluyen las motos con un asiento demasiado alto.
+
+        Returns:
+            np.ndarray: Ids de fila ordenados de más a menos parecido (sin incluir `fila`).
+        """
+        if k <= VECINOS_PRECALCULADOS:
+            lista = self._lista_vecinos(fila)
+            validos = np.ones(len(lista), dtype=bool)
+            if carnet_usuario is not None:
+                validos &= self.indice.carnet_ordinal[lista] <= carnet_usuario
+            if altura is not None:
+                validos &= self.indice.numericas['ALTURA_ASIENTO'][lista] <= altura_asiento_maxima(altura)
+            # Si la lista completa pasa los filtros o quedan al menos k, es exacta
+            if validos.sum() >= k or len(lista) == self.indice.n - 1:
+                return lista[validos][:k]
+        return self._buscar(fila, k, carnet_usuario, altura)
+
+    def _buscar(self, fila, k, carnet_usuario=None, altura=None):
+        # Búsqueda best-first en el KD-tree
+        q = self.X[fila]
+        altura_max = altura_asiento_maxima(altura) if altura is not None else None
+        asiento = self.indice.numericas['ALTURA_ASIENTO']
+        carnets = self.indice.carnet_ordinal
+
+        mejores_d = np.empty(0)  # las k mejores distancias encontradas hasta ahora
+        mejores_id = np.empty(0, dtype=np.int64)
+        umbral = np.inf
+        frontera = [(0.0, 0)]
+        while frontera:
+            d_caja, nodo = heapq.heappop(frontera)
+            if d_caja >= umbral:
+                break
+            hijos = self.hijos[nodo]
+            if hijos is None:
+                ids = self.perm[self.inicio[nodo]:self.fin[nodo]]
+                validos = ids != fila
+                if carnet_usuario is not None:
+                    validos &= carnets[ids] <= carnet_usuario
+                if altura_max is not None:
+                    validos &= asiento[ids] <= altura_max
+                ids = ids[validos]
+                if not ids.size:
+                    continue
+                diferencia = self.X[ids] - q
+                mejores_d = np.concatenate([mejores_d, np.einsum("ij,ij->i", diferencia, diferencia)])
+                mejores_id = np.concatenate([mejores_id, ids])
+                if mejores_d.size > k:
+                    top = np.argpartition(mejores_d, k - 1)[:k]
+                    mejores_d, mejores_id = mejores_d[top], mejores_id[top]
+                if mejores_d.size == k:
+                    umbral = mejores_d.max()
+                continue
+
+            exceso = np.maximum(0.0, np.maximum(self.caja_min[list(hijos)] - q, q - self.caja_max[list(hijos)]))
+            for hijo, d_hijo in zip(hijos, np.einsum("ij,ij->i", exceso, exceso).tolist()):
+                if carnet_usuario is not None and self.carnet_min[hijo] > carnet_usuario:
+                    continue
+                if altura_max is not None and self.asiento_min[hijo] > altura_max:
+                    continue
+                if d_hijo < umbral:
+                    heapq.heappush(frontera, (d_hijo, hijo))
+
+        return mejores_id[np.lexsort((mejores_id, mejores_d))]
@@ -0,0 +1,100 @@
+# src/synthetic_catalog.py
+import argparse
+import numpy as np
+import pandas as pd
+
+# Estratos del catálogo: las distribuciones se reproducen por tipo y marca
+ESTRATOS = ['TIPO_SIMPLIFICADO', 'MARCA']
+
+# Columnas numéricas que se perturban y su redondeo (múltiplo) en el catálogo sintético
+REDONDEO = {
+    'PRECIO': 50,
+    'CILINDRADA': 1,
+    'POTENCIA': 0.1,
+    'ALTURA_ASIENTO': 5,
+    'PESO_VACIO': 1,
+}
+
+# Límites de la desviación (en escala logarítmica) del ruido de cada estrato
+_SIGMA_MIN = 0.03
+_SIGMA_MAX = 0.35
+
+
+def _sigmas(base):
+    # Desviación típica del logaritmo de cada columna numérica por estrato. Los
+    # estratos con una sola moto usan la de su tipo y, si tampoco hay, la global.
+    sigmas = {}
+    estrato = base[ESTRATOS].astype(str).agg("|".join, axis=1)
+    tipo = base['TIPO_SIMPLIFICADO'].astype(str)
+    for col in REDONDEO:
+        if col not in base.columns:
+            continue
+        logv = np.log(pd.to_numeric(base[col], errors='coerce').where(lambda s: s > 0))
+        global_ = logv.std()
+        por_tipo = logv.groupby(tipo).transform("std").fillna(global_)
+        por_estrato = logv.groupby(estrato).transform("std")
+        sigma = por_estrato.where(logv.groupby(estrato).transform("count") > 1, por_tipo)
+        sigmas[col] = sigma.fillna(_SIGMA_MIN).clip(_SIGMA_MIN, _SIGMA_MAX).to_numpy()
+    return sigmas
+
+
+def generar_catalogo(base, n, semilla=0):
+    """
+    Genera un catálogo sintético de `n` motos con el esquema y las distribuciones de `base`.
+
+    Cada moto sintética parte de una moto real elegida al azar, por lo que la
+    proporción de motos por (TIPO_SIMPLIFICADO, MARCA) se conserva, igual que el
+    muestreo estratificado de `scripts/prepare_public_release.py`. Sus columnas
+    numéricas se perturban con ruido log-normal de la dispersión de su estrato y
+    se redondean como en el catálogo real. Las columnas de texto (carnet,
+    neumáticos, frenos...) se copian de la moto de partida, así que se mantienen
+    coherentes con el tipo y la marca, y los N/A se conservan en la misma proporción.
+    Los modelos llevan un sufijo numérico para que MARCA + MODELO sea único.
+
+    Args:
+        base (pd.DataFrame): Catálogo real (ya preprocesado) del que se aprenden las distribuciones.
+        n (int): Número de motos a generar.
+        semilla (int, opcional): Semilla del generador aleatorio.
+
+    Returns:
+        pd.DataFrame: Catálogo sintético con las mismas columnas que `base`.
+    """
+    if base.empty:
+        raise ValueError("El catálogo base está vacío.")
+    rng = np.random.default_rng(semilla)
+    base = base.reset_index(drop=True)
+    origen = rng.integers(0, len(base), size=n)
+    sintetico = base.iloc[origen].reset_index(drop=True)
+
+    for col, sigma in _sigmas(base).items():
+        valores = pd.to_numeric(sintetico[col], errors='coerce').to_numpy(dtype=np.float64)
+        valores = valores * np.exp(rng.normal(0.0, sigma[origen]))
+        paso = REDONDEO[col]
+        sintetico[col] = np.maximum(np.round(valores / paso) * paso, paso).round(1)
+
+    if 'MODELO' in sintetico.columns:
+        sufijos = pd.Series(np.arange(n)).astype(str).radd(" #")
+        sintetico['MODELO'] = sintetico['MODELO'].astype(str) + sufijos
+    return sintetico
+
+
+def main(argv=None):
+    """Punto de entrada de la CLI del generador de catálogos sintéticos."""
+    parser = argparse.ArgumentParser(
+        description="Genera un catálogo sintético con el esquema y las distribuciones del catálogo real."
+    )
+    parser.add_argument("-n", "--filas", type=int, default=100000, help="Número de motos a generar")
+    parser.add_argument("-o", "--salida", required=True, help="CSV de salida")
+    parser.add_argument("--base", default="data/motofit_demo.csv", help="CSV del catálogo real de partida")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador aleatorio")
+    args = parser.parse_args(argv)
+
+    from src.data_preprocessing import leer_y_preprocesar
+
+    sintetico = generar_catalogo(leer_y_preprocesar(args.base), args.filas, args.semilla)
+    sintetico.to_csv(args.salida, index=False)
+    print(f"Catálogo sintético guardado: {args.salida} ({len(sintetico)} filas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,20 @@
 import streamlit as st
 import os
-import base64
-from io import BytesIO
-from PIL import Image
-import pandas as pd
 
+from src.logo_cache import LOGOS, marca_a_clave
+from src.card_renderer import html_tarjeta
+from src.metrics import METRICAS
+
+@METRICAS.medir("logo_base64")
 def _logo_base64(path, width=70):
 
     """
     Convierte una imagen de logo a formato Base64 para embeberla en HTML.
 
-    Esta función lee un archivo de imagen, lo redimensiona, lo codifica en Base64
-    y lo retorna como una etiqueta HTML img. Esto permite mostrar las imágenes
-    directamente en las tarjetas de la aplicación sin necesidad de rutas de archivo
-    relativas, lo cual es útil en entornos de despliegue.
+    La imagen se lee, redimensiona y codifica una sola vez por (marca, ancho, mtime);
+    las llamadas siguientes se sirven desde la caché compartida `LOGOS`. Esto permite
+    mostrar las imágenes directamente en las tarjetas de la aplicación sin necesidad
+    de rutas de archivo relativas, lo cual es útil en entornos de despliegue.
 
     Args:
         path (str): La ruta del archivo de imagen del logo.
@@ -23,18 +24,7 @@ def _logo_base64(path, width=70):
         Optional[str]: Una cadena HTML con la etiqueta <img> o None si ocurre un error.
     """
 
-
-    if not os.path.exists(path):
-        return None
-    try:
-        img = Image.open(path)
-        img.thumbnail((width, width), Image.LANCZOS)
-        buf = BytesIO()
-        img.save(buf, format="PNG")
-        b64 = base64.b64encode(buf.getvalue()).decode()
-        return f"<img src='data:image/png;base64,{b64}' width='{width}' style='margin-bottom:10px;'/>"
-    except Exception:
-        return None
+    return LOGOS.obtener(path, width)
 
 def _render_single_card_html(row):
 
@@ -43,71 +33,84 @@ def _render_single_card_html(row):
 
     Esta función crea una tarjeta con los detalles de una moto, incluyendo
     la marca, modelo, precio y otras especificaciones. También gestiona
-    la visualización del logo de la marca.
+    la visualización del logo de la marca. Para páginas completas es preferible
+    `CardRenderer`, que genera y memoriza las tarjetas por lotes.
 
     Args:
-        row (pd.Series): Una fila del DataFrame de motos, representando una única moto.
-        favs (Set[str]): El conjunto de modelos de motos que el usuario ha marcado como favoritos.
+        row (pd.Series | namedtuple): Una fila del DataFrame de motos (p. ej. de
+            `itertuples`); se leen sus atributos MARCA, MODELO, PRECIO, POTENCIA,
+            ALTURA_ASIENTO y PESO_VACIO.
 
     Returns:
         str: Una cadena de texto con el código HTML de la tarjeta.
     """
 
-    marca_key = str(row.MARCA).lower().replace(" ", "_")
+    marca_key = marca_a_clave(row.MARCA)
     logo_path = os.path.join("assets", "logos", f"{marca_key}.png")
     logo_tag = _logo_base64(logo_path) or f"<b>{row.MARCA}</b>"
 
-    modelo = row.MODELO
-    precio = f"€{int(row.PRECIO):,}" if not pd.isna(row.PRECIO) else "N/A"
-    potencia = f"{row.POTENCIA} cv" if not pd.isna(row.POTENCIA) else "N/A"
-    altura = f"{row.ALTURA_ASIENTO} mm" if not pd.isna(row.ALTURA_ASIENTO) else "N/A"
-    peso = f"{row.PESO_VACIO} kg" if not pd.isna(row.PESO_VACIO) else "N/A"
-
-    return f"""
-    <div style="
-        background-color: #1e1e1e;
-        border-radius: 12px;
-        padding: 16px;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.4);
-        color: #f0f0f0;
-        text-align: center;
-        min-height: 280px;
-        margin-bottom: 20px;">
-        {logo_tag}
-        <h4 style='color:#00cc99; margin:10px 0;'>{modelo}</h4>
-        <ul style='list-style:none; padding:0; text-align:left; font-size:0.9em;'>
-            <li>💰 <b>Precio:</b> {precio}</li>
-            <li>🏍️ <b>Potencia:</b> {potencia}</li>
-            <li>📏 <b>Altura:</b> {altura}</li>
-            <li>⚖️ <b>Peso:</b> {peso}</li>
-        </ul>
-    </div>
-    """
+    return html_tarjeta(
+        row.MARCA, row.MODELO, row.PRECIO, row.POTENCIA, row.ALTURA_ASIENTO, row.PESO_VACIO, logo_tag
+    )
 
-def _toggle_fav(modelo_key, checkbox_key):
+def _toggle_fav(moto_id, checkbox_key, almacen=None, marca=None, modelo=None):
 
     
     """
     Callback para gestionar el estado de los favoritos en `st.session_state`.
 
     Esta función se ejecuta cada vez que el usuario marca o desmarca una moto
-    como favorita. Actualiza el conjunto de favoritos y provoca un `rerun` de
-    la aplicación para que los cambios se reflejen inmediatamente.
+    como favorita. Actualiza el conjunto de favoritos de la sesión y, si se
+    indica un almacén, encola el cambio para guardarlo. No hace falta forzar un
+    `rerun`: Streamlit ejecuta el callback antes del rerun que provoca el propio
+    widget, así que los cambios se ven en esa misma ejecución.
 
     Args:
-        modelo_key (str): El identificador único de la moto (su modelo).
+        moto_id (str): El id estable de la moto (ver `CatalogIndex.claves_moto`).
         checkbox_key (str): La clave única del widget checkbox en la sesión.
+        almacen (FavoritesStore, opcional): Almacén persistente de favoritas.
+        marca (str, opcional): Marca de la moto (informativo, para el almacén).
+        modelo (str, opcional): Modelo de la moto (informativo, para el almacén).
     """
 
     checked = st.session_state.get(checkbox_key, False)
     if checked:
-        st.session_state.favs.add(modelo_key)
+        st.session_state.favs.add(moto_id)
     else:
-        st.session_state.favs.discard(modelo_key)
+        st.session_state.favs.discard(moto_id)
 
-    # Rerender inmediatamente tras el cambio, se implementaron las dos opciones para evitar la caída de la app por incompatibilidad.
-    if hasattr(st, "rerun"):
-        st.rerun()  # versiones nuevas
-    else:
-        st.experimental_rerun()  # compatibilidad con versiones antiguas
+    # La misma moto puede tener su checkbox en varias secciones (resultados, favoritas...)
+    for clave in list(st.session_state.keys()):
+        if clave != checkbox_key and str(clave).endswith(f"_fav_{moto_id}"):
+            st.session_state[clave] = checked
+
+    if almacen is not None and st.session_state.get("usuario"):
+        if checked:
+            almacen.agregar(st.session_state.usuario, moto_id, marca, modelo)
+        else:
+            almacen.quitar(st.session_state.usuario, moto_id)
+
+def _ver_similares(row_id):
+
+    """
+    Callback del botón "Parecidas": guarda en `st.session_state` la moto de referencia.
+
+    Args:
+        row_id (int): Id de fila de la moto en el catálogo.
+    """
+
+    st.session_state.similar_a = int(row_id)
+
+def _cambiar_pagina(paso):
+
+    """
+    Callback de los botones "Anterior" / "Siguiente" de los resultados.
+
+    Al ser un callback, el cambio de página ya está aplicado cuando se vuelve
+    a ejecutar la sección de resultados, sin necesidad de un `st.rerun` extra.
+
+    Args:
+        paso (int): Páginas a avanzar (negativo para retroceder).
+    """
 
+    st.session_state.pagina = st.session_state.get("pagina", 1) + paso
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# Permite `from src...` al lanzar pytest desde cualquier directorio
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,113 @@
+# tests/test_brute_force.py
+"""Equivalencia de los algoritmos rápidos con su versión por fuerza bruta."""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.catalog_history import CatalogHistory
+from src.catalog_index import CatalogIndex, altura_asiento_maxima
+from src.catalog_ingest import deduplicar
+from src.data_preprocessing import preprocesar_datos
+from src.pareto import capas_pareto, skyline
+from src.similar_bikes import SimilarBikesIndex
+from src.synthetic_catalog import generar_catalogo
+
+CSV_DEMO = Path(__file__).resolve().parents[1] / "data" / "motofit_demo.csv"
+
+
+def _frente_bruto(X):
+    # O(n²): un punto está en el frente si ningún otro es <= en todo y < en algo
+    menor_igual = (X[None, :, :] <= X[:, None, :]).all(axis=2)
+    menor = (X[None, :, :] < X[:, None, :]).any(axis=2)
+    return ~(menor_igual & menor).any(axis=1)
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return preprocesar_datos(generar_catalogo(pd.read_csv(CSV_DEMO), 3000, semilla=1))
+
+
+@pytest.mark.parametrize("n", [1, 50, 700, 2000])
+def test_skyline_igual_que_fuerza_bruta(n):
+    # Valores enteros pequeños: muchos empates y puntos repetidos
+    X = np.random.default_rng(n).integers(0, 20, size=(n, 4)).astype(float)
+    X = X[np.lexsort(X.T[::-1])]
+    np.testing.assert_array_equal(skyline(X), _frente_bruto(X))
+
+
+def test_capas_pareto_igual_que_fuerza_bruta():
+    X = np.random.default_rng(0).integers(0, 30, size=(1500, 4)).astype(float)
+    X = X[np.lexsort(X.T[::-1])]
+    capas = capas_pareto(X, max_capas=5, min_resultados=len(X))
+    restantes = np.arange(len(X))
+    for capa in range(5):
+        en_frente = _frente_bruto(X[restantes])
+        np.testing.assert_array_equal(np.flatnonzero(capas == capa), restantes[en_frente])
+        restantes = restantes[~en_frente]
+    np.testing.assert_array_equal(np.flatnonzero(capas == -1), restantes)
+
+
+@pytest.mark.parametrize("max_precalculo", [20000, 0])
+def test_similares_igual_que_fuerza_bruta(catalogo, max_precalculo):
+    indice = CatalogIndex(catalogo)
+    similares = SimilarBikesIndex(indice, tam_hoja=16, max_precalculo=max_precalculo)
+    rng = np.random.default_rng(0)
+    for carnet, altura in [(None, None), (2, 170), (1, 160)]:
+        for fila in rng.choice(indice.n, 40, replace=False):
+            for k in (6, 40):
+                obtenidas = similares.similares(int(fila), k, carnet, altura)
+                d = ((similares.X - similares.X[fila]) ** 2).sum(axis=1)
+                validas = np.ones(indice.n, dtype=bool)
+                validas[fila] = False
+                if carnet is not None:
+                    validas &= indice.carnet_ordinal <= carnet
+                if altura is not None:
+                    validas &= indice.numericas['ALTURA_ASIENTO'] <= altura_asiento_maxima(altura)
+                candidatas = np.flatnonzero(validas)
+                esperadas = candidatas[np.lexsort((candidatas, d[candidatas]))][:k]
+                # Con distancias empatadas el orden puede variar: se comparan las distancias
+                np.testing.assert_allclose(d[obtenidas], d[esperadas])
+
+
+def _versiones(df, n_versiones, rng):
+    # Cada versión cambia el 1 % de los precios, quita unas motos, añade otras
+    # y, a mitad de la serie, una columna nueva
+    actual = df
+    for i in range(n_versiones):
+        if i:
+            actual = actual.copy()
+            cambian = rng.choice(len(actual), size=len(actual) // 100, replace=False)
+            actual.loc[actual.index[cambian], 'PRECIO'] = (actual['PRECIO'].to_numpy()[cambian] * 1.05).round()
+            quitadas = rng.choice(len(actual), size=len(actual) // 500, replace=False)
+            nuevas = actual.iloc[quitadas].copy()
+            nuevas['MODELO'] = nuevas['MODELO'] + f" v{i}"
+            actual = pd.concat([actual.drop(actual.index[quitadas]), nuevas], ignore_index=True)
+            if i == n_versiones // 2:
+                actual['EXTRA'] = 1.0
+        yield actual
+
+
+def _ordenado(df):
+    return df.sort_values(['MARCA', 'MODELO']).reset_index(drop=True).astype(object).fillna("N/A")
+
+
+def test_historial_recupera_cada_version(catalogo, tmp_path):
+    historial = CatalogHistory(str(tmp_path))
+    fechas = pd.date_range("2025-01-01", periods=12, freq="7D")
+    esperadas = []
+    for df, fecha in zip(_versiones(catalogo, len(fechas), np.random.default_rng(0)), fechas):
+        historial.registrar(df, fecha)
+        esperadas.append(deduplicar(df))
+    # Se reconstruyen versiones desde la inicial y desde el checkpoint de la columna nueva
+    checkpoints = historial.versiones()["checkpoint"].tolist()
+    assert checkpoints[0] and checkpoints[len(fechas) // 2] and checkpoints.count(True) < len(fechas)
+
+    # Se reabre desde disco para no usar nada en memoria
+    historial = CatalogHistory(str(tmp_path))
+    for version, esperada in enumerate(esperadas):
+        obtenida = historial.cargar(version)
+        assert list(obtenida.columns) == list(esperada.columns)
+        pd.testing.assert_frame_equal(_ordenado(obtenida), _ordenado(esperada))
+    pd.testing.assert_frame_equal(_ordenado(historial.cargar_a_fecha("2025-01-10")), _ordenado(esperadas[1]))
@@ -0,0 +1,62 @@
+# tests/test_catalog_index.py
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.catalog_index import CatalogIndex, COLUMNAS_CATEGORICAS, COLUMNAS_NUMERICAS, COLUMNAS_RANGO
+from src.catalog_refresh import alinear_con_anterior
+from src.data_preprocessing import preprocesar_datos
+
+CSV_DEMO = Path(__file__).resolve().parents[1] / "data" / "motofit_demo.csv"
+
+
+@pytest.fixture
+def catalogo():
+    return preprocesar_datos(pd.read_csv(CSV_DEMO))
+
+
+def _con_motos_nuevas(df):
+    nuevas = df.iloc[[0, 3, 5]].copy()
+    nuevas["MODELO"] = nuevas["MODELO"] + " Nueva"
+    nuevas.iloc[0, nuevas.columns.get_loc("MARCA")] = "Marca Nueva"
+    nuevas.iloc[1, nuevas.columns.get_loc("PRECIO")] = np.nan
+    # Las nuevas van al principio del CSV: `alinear_con_anterior` las lleva al final
+    return alinear_con_anterior(df, pd.concat([nuevas, df], ignore_index=True))
+
+
+def _comprobar_iguales(a, b):
+    for col in COLUMNAS_NUMERICAS:
+        np.testing.assert_array_equal(a.numericas[col], b.numericas[col])
+    for col in COLUMNAS_RANGO:
+        np.testing.assert_array_equal(a.orden[col], b.orden[col])
+        np.testing.assert_array_equal(a.ordenados[col], b.ordenados[col])
+    for col in COLUMNAS_CATEGORICAS:
+        np.testing.assert_array_equal(a.codigos[col], b.codigos[col])
+        assert list(a.categorias[col]) == list(b.categorias[col])
+        assert a.bitmaps[col].keys() == b.bitmaps[col].keys()
+        for valor in a.bitmaps[col]:
+            np.testing.assert_array_equal(a.bitmaps[col][valor], b.bitmaps[col][valor])
+    np.testing.assert_array_equal(a.carnet_ordinal, b.carnet_ordinal)
+    np.testing.assert_array_equal(a.id_moto, b.id_moto)
+    np.testing.assert_array_equal(a.id_moto[a._orden_id], b.id_moto[b._orden_id])
+
+
+def test_filas_añadidas_amplian_el_indice(catalogo):
+    anterior = CatalogIndex(catalogo)
+    nuevo = _con_motos_nuevas(catalogo)
+    ampliado = CatalogIndex(nuevo, anterior=anterior)
+    assert {"PRECIO", "MARCA", "MODELO"} <= ampliado.ampliadas
+    assert ampliado.version == CatalogIndex(nuevo).version
+    _comprobar_iguales(ampliado, CatalogIndex(nuevo))
+    claves = ampliado.claves_moto(range(ampliado.n))
+    np.testing.assert_array_equal(ampliado.filas_de(claves), np.arange(ampliado.n))
+
+
+def test_filas_eliminadas_reconstruyen_el_indice(catalogo):
+    anterior = CatalogIndex(catalogo)
+    nuevo = alinear_con_anterior(catalogo, catalogo.drop(index=2))
+    indice = CatalogIndex(nuevo, anterior=anterior)
+    assert not indice.ampliadas and not indice.reutilizadas
+    _comprobar_iguales(indice, CatalogIndex(nuevo))
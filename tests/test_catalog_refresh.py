@@ -0,0 +1,124 @@
+# tests/test_catalog_refresh.py
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import src.catalog_refresh as catalog_refresh
+from src.catalog_refresh import CatalogRefresher
+
+CSV_DEMO = Path(__file__).resolve().parents[1] / "data" / "motofit_demo.csv"
+
+
+class _Catalogo(BaseHTTPRequestHandler):
+    # Sirve `servidor.cuerpo` con su ETag y responde 304 a If-None-Match
+    def do_GET(self):
+        servidor = self.server
+        servidor.peticiones += 1
+        if self.headers.get("If-None-Match") == servidor.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(servidor.cuerpo)))
+        self.send_header("ETag", servidor.etag)
+        self.end_headers()
+        self.wfile.write(servidor.cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Catalogo)
+    httpd.peticiones = 0
+
+    def publicar(cuerpo, etag=None):
+        httpd.cuerpo = cuerpo
+        httpd.etag = etag or '"%s"' % hashlib.sha256(cuerpo).hexdigest()[:16]
+
+    httpd.publicar = publicar
+    httpd.url = "http://127.0.0.1:%d/catalogo.csv" % httpd.server_address[1]
+    publicar(CSV_DEMO.read_bytes())
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _con_precio(delta):
+    df = pd.read_csv(CSV_DEMO)
+    df.loc[0, "PRECIO"] += delta
+    return df.to_csv(index=False).encode()
+
+
+def test_primera_carga(servidor):
+    refresco = CatalogRefresher(servidor.url)
+    cambios = refresco.comprobar()
+    assert cambios["añadidas"] == len(refresco.actual.df) > 0
+    assert refresco.etag == servidor.etag
+    assert refresco.actualizaciones == 1
+
+
+def test_sin_cambios_304(servidor):
+    refresco = CatalogRefresher(servidor.url)
+    refresco.comprobar()
+    version = refresco.actual.version
+    assert refresco.comprobar() is None
+    assert refresco.no_modificados == 1
+    assert refresco.actual.version == version
+
+
+def test_mismo_cuerpo_con_otro_etag(servidor):
+    refresco = CatalogRefresher(servidor.url)
+    refresco.comprobar()
+    actual = refresco.actual
+    servidor.publicar(servidor.cuerpo, etag='"otro"')
+    assert refresco.comprobar() is None
+    assert refresco.actual is actual
+    # El nuevo ETag se guarda para que la siguiente petición reciba un 304
+    assert refresco.etag == '"otro"'
+    assert refresco.comprobar() is None
+    assert refresco.no_modificados == 2
+
+
+def test_cambio_de_precio(servidor):
+    refresco = CatalogRefresher(servidor.url)
+    refresco.comprobar()
+    anterior = refresco.actual
+    servidor.publicar(_con_precio(1000))
+    cambios = refresco.comprobar()
+    assert cambios["modificadas"] == 1
+    assert cambios["añadidas"] == cambios["eliminadas"] == 0
+    assert cambios["columnas_modificadas"] == ["PRECIO"]
+    assert refresco.actual is not anterior
+    assert refresco.actual.df.loc[0, "PRECIO"] == anterior.df.loc[0, "PRECIO"] + 1000
+    assert refresco.etag == servidor.etag
+
+
+def test_fallo_al_procesar_no_guarda_el_etag(servidor, monkeypatch):
+    refresco = CatalogRefresher(servidor.url)
+    refresco.comprobar()
+    etag = refresco.etag
+    servidor.publicar(_con_precio(1000))
+
+    preprocesar = catalog_refresh.preprocesar_datos
+
+    def falla(df):
+        raise ValueError("catálogo corrupto")
+
+    monkeypatch.setattr(catalog_refresh, "preprocesar_datos", falla)
+    with pytest.raises(ValueError):
+        refresco.comprobar()
+    assert refresco.etag == etag
+
+    # La siguiente comprobación vuelve a descargar el cuerpo y lo aplica
+    monkeypatch.setattr(catalog_refresh, "preprocesar_datos", preprocesar)
+    assert refresco.comprobar()["modificadas"] == 1
+    assert refresco.etag == servidor.etag
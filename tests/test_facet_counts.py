@@ -0,0 +1,53 @@
+# tests/test_facet_counts.py
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.catalog_index import CatalogIndex, CARNET_ORDEN
+from src.data_preprocessing import preprocesar_datos
+from src.facet_counts import FacetCounter
+from src.synthetic_catalog import generar_catalogo
+
+CSV_DEMO = Path(__file__).resolve().parents[1] / "data" / "motofit_demo.csv"
+
+# Consultas poco selectivas (máscaras sobre columnas completas) y muy selectivas
+# (candidatos del rango más estrecho)
+CONSULTAS = [
+    dict(presupuesto_max=50000, carnet_usuario=3, altura=190),
+    dict(presupuesto_max=30000, carnet_usuario=2, altura=175, marca=["Honda", "KTM"]),
+    dict(presupuesto_max=12000, carnet_usuario=3, altura=165, tipos=["Naked", "Adventure"], cilindrada_min=300),
+    dict(presupuesto_max=6000, carnet_usuario=1, altura=160, precio_min=3000, cilindrada_max=500),
+    dict(presupuesto_max=20000, carnet_usuario=0, altura=170, marca=["Todas"]),
+    dict(presupuesto_max=40000, carnet_usuario=3, altura=180, marca=["Marca inexistente"]),
+]
+
+
+@pytest.fixture(scope="module", params=["demo", "sintetico"])
+def indice(request):
+    df = pd.read_csv(CSV_DEMO)
+    if request.param == "sintetico":
+        df = generar_catalogo(df, 5000, semilla=3)
+    return CatalogIndex(preprocesar_datos(df))
+
+
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_recuentos_igual_que_filtrar(indice, consulta):
+    recuentos = FacetCounter(indice).contar(**consulta)
+    assert recuentos["total"] == len(indice.filtrar(**consulta))
+
+    # Cada valor de una faceta cuenta con el resto de filtros y ese valor elegido
+    sin_marca = dict(consulta, marca=None)
+    assert recuentos["sin_marca"] == len(indice.filtrar(**sin_marca))
+    for marca, n in recuentos["MARCA"].items():
+        assert n == len(indice.filtrar(**dict(consulta, marca=[marca])))
+    for tipo, n in recuentos["TIPO_SIMPLIFICADO"].items():
+        assert n == len(indice.filtrar(**dict(consulta, tipos=[tipo])))
+    for carnet, ordinal in CARNET_ORDEN.items():
+        assert recuentos["CARNET"][carnet] == len(indice.filtrar(**dict(consulta, carnet_usuario=ordinal)))
+
+
+def test_recuentos_no_vacios(indice):
+    totales = [FacetCounter(indice).contar(**consulta)["total"] for consulta in CONSULTAS]
+    # Las comprobaciones anteriores no son triviales: la mayoría de consultas tienen motos
+    assert sum(t > 0 for t in totales) >= 3
@@ -0,0 +1,86 @@
+# tests/test_favorites_store.py
+import sqlite3
+
+import pytest
+
+from src.favorites_store import FavoritesStore
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "favoritos.sqlite3")
+
+
+def _abrir(ruta, **kwargs):
+    # Sin escrituras periódicas durante la prueba: solo las que fuerza cada caso
+    return FavoritesStore(ruta, intervalo=3600, **kwargs)
+
+
+def _guardadas(ruta, usuario):
+    with sqlite3.connect(ruta) as conexion:
+        filas = conexion.execute("SELECT moto_id FROM favoritos WHERE usuario = ?", (usuario,)).fetchall()
+    return {moto_id for (moto_id,) in filas}
+
+
+def test_alta_y_baja_en_el_mismo_lote(ruta):
+    almacen = _abrir(ruta)
+    almacen.agregar("ana", "a1", "Honda", "Rebel 1100")
+    almacen.quitar("ana", "a1")
+    almacen.quitar("ana", "b2")
+    almacen.agregar("ana", "b2", "KTM", "390 Adventure")
+    assert almacen.favoritos("ana") == ["b2"]
+    almacen.volcar()
+    assert almacen.favoritos("ana") == ["b2"]
+    assert _guardadas(ruta, "ana") == {"b2"}
+    almacen.cerrar()
+
+
+def test_lectura_combina_pendientes_y_guardadas(ruta):
+    almacen = _abrir(ruta)
+    for moto_id in ("a1", "b2", "c3"):
+        almacen.agregar("ana", moto_id)
+    almacen.agregar("luis", "a1")
+    almacen.volcar()
+
+    almacen.quitar("ana", "b2")
+    almacen.agregar("ana", "d4")
+    almacen.agregar("ana", "a1")  # ya guardada: no se duplica
+    assert almacen.escrituras == 1
+    assert _guardadas(ruta, "ana") == {"a1", "b2", "c3"}
+    assert almacen.favoritos("ana") == ["a1", "c3", "d4"]
+    assert almacen.favoritos("luis") == ["a1"]
+    assert almacen.favoritos("nadie") == []
+
+    almacen.volcar()
+    assert almacen.escrituras == 2
+    assert almacen.favoritos("ana") == ["a1", "c3", "d4"]
+    assert _guardadas(ruta, "ana") == {"a1", "c3", "d4"}
+    almacen.cerrar()
+
+
+def test_max_pendientes_fuerza_la_escritura(ruta):
+    almacen = _abrir(ruta, max_pendientes=3)
+    almacen.agregar("ana", "a1")
+    almacen.agregar("ana", "b2")
+    assert almacen.escrituras == 0
+    almacen.agregar("ana", "c3")
+    assert almacen.escrituras == 1
+    assert _guardadas(ruta, "ana") == {"a1", "b2", "c3"}
+    almacen.cerrar()
+
+
+def test_sobrevive_a_cerrar_y_reabrir(ruta):
+    almacen = _abrir(ruta)
+    almacen.agregar("ana", "a1")
+    almacen.volcar()
+    # Cambios aún pendientes al cerrar: `cerrar` los escribe
+    almacen.agregar("ana", "b2")
+    almacen.quitar("ana", "a1")
+    almacen.agregar("luis", "c3")
+    almacen.cerrar()
+    almacen.cerrar()  # una segunda llamada no hace nada
+
+    reabierto = _abrir(ruta)
+    assert reabierto.favoritos("ana") == ["b2"]
+    assert reabierto.favoritos("luis") == ["c3"]
+    reabierto.cerrar()
@@ -0,0 +1,98 @@
+# tests/test_query_service.py
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from src.query_service import MAX_CUERPO, ErrorPeticion, QueryService
+
+CSV_DEMO = Path(__file__).resolve().parents[1] / "data" / "motofit_demo.csv"
+
+PERFIL = {"presupuesto_max": 30000, "carnet": "A", "altura": 175}
+
+
+@pytest.fixture(scope="module")
+def servicio():
+    servicio = QueryService(str(CSV_DEMO), directorio_cache=None, procesos=1)
+    yield servicio
+    servicio.cerrar()
+
+
+def _recomendar(servicio, datos, ruta="/recomendar"):
+    return asyncio.run(servicio.atender("POST", ruta, {}, json.dumps(datos).encode()))
+
+
+@pytest.mark.parametrize("cambios", [
+    {"presupuesto_max": "abc"},
+    {"presupuesto_max": None},
+    {"presupuesto_max": True},
+    {"altura": "175"},
+    {"precio_min": "mucho"},
+    {"cilindrada_max": [600]},
+    {"marca": "Honda"},
+    {"tipos": ["Naked", 3]},
+    {"carnet": "C"},
+])
+def test_perfil_invalido_responde_400(servicio, cambios):
+    with pytest.raises(ErrorPeticion) as error:
+        _recomendar(servicio, {**PERFIL, **cambios})
+    assert error.value.estado == 400
+
+
+def test_perfil_sin_campos_obligatorios(servicio):
+    with pytest.raises(ErrorPeticion, match="altura"):
+        _recomendar(servicio, {"presupuesto_max": 30000, "carnet": "A"})
+
+
+def test_lote_con_un_perfil_invalido(servicio):
+    with pytest.raises(ErrorPeticion):
+        _recomendar(servicio, {"perfiles": [PERFIL, {**PERFIL, "altura": "alta"}]}, "/recomendar/lote")
+
+
+def test_perfil_valido(servicio):
+    estado, respuesta = _recomendar(servicio, {**PERFIL, "precio_min": None, "marca": ["Honda", "BMW"]})
+    assert estado == 200
+    assert respuesta["motos"] and {m["MARCA"] for m in respuesta["motos"]} <= {"Honda", "BMW"}
+
+
+def _http(servicio, crudo):
+    # Envía una petición HTTP en bruto a `_conexion` y devuelve (estado, JSON)
+    async def enviar():
+        servidor = await asyncio.start_server(servicio._conexion, "127.0.0.1", 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+            writer.write(crudo)
+            await writer.drain()
+            respuesta = await asyncio.wait_for(reader.read(), timeout=30)
+            writer.close()
+        return respuesta
+
+    cabecera, _, cuerpo = asyncio.run(enviar()).partition(b"\r\n\r\n")
+    return int(cabecera.split()[1]), json.loads(cuerpo)
+
+
+def _post(cuerpo, longitud=None):
+    longitud = len(cuerpo) if longitud is None else longitud
+    return (f"POST /recomendar HTTP/1.1\r\nHost: localhost\r\nContent-Length: {longitud}\r\n"
+            f"Connection: close\r\n\r\n").encode() + cuerpo
+
+
+@pytest.mark.parametrize("longitud", ["abc", "-5", "1e3", "²"])
+def test_content_length_invalido(servicio, longitud):
+    estado, respuesta = _http(servicio, _post(b"{}", longitud))
+    assert estado == 400
+    assert respuesta["error"] == "Content-Length inválido."
+
+
+def test_cuerpo_demasiado_grande(servicio):
+    estado, _ = _http(servicio, _post(b"", MAX_CUERPO + 1))
+    assert estado == 413
+
+
+def test_peticion_http(servicio):
+    estado, respuesta = _http(servicio, _post(json.dumps(PERFIL).encode()))
+    assert estado == 200 and respuesta["motos"]
+    estado, respuesta = _http(servicio, _post(json.dumps({**PERFIL, "presupuesto_max": "abc"}).encode()))
+    assert estado == 400 and "presupuesto_max" in respuesta["error"]
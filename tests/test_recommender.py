@@ -0,0 +1,167 @@
+# tests/test_recommender.py
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.catalog_index import CatalogIndex, CARNET_ORDEN, altura_asiento_maxima
+from src.data_preprocessing import preprocesar_datos
+from src.pareto import CRITERIOS_PARETO, ORDEN_PARETO
+from src.query_cache import QueryCache
+from src.recommender_logic import COLUMNAS_A_MOSTRAR, recomendar_motos, recomendar_motos_batch
+from src.synthetic_catalog import generar_catalogo
+
+CSV_DEMO = Path(__file__).resolve().parents[1] / "data" / "motofit_demo.csv"
+
+PERFILES = [
+    dict(presupuesto_max=30000, carnet="A", altura=175),
+    dict(presupuesto_max=12000, carnet="A2", altura=165, tipos=["Naked", "Adventure"]),
+    dict(presupuesto_max=50000, carnet="A", altura=185, precio_min=8000, marca=["BMW", "Ducati", "KTM"]),
+    dict(presupuesto_max=9000, carnet="A1", altura=160, cilindrada_max=500),
+    dict(presupuesto_max=40000, carnet="A", altura=190, cilindrada_min=600, cilindrada_max=1300),
+]
+ORDENES = [("PRECIO", True), ("POTENCIA", False), ("ALTURA_ASIENTO", True), ("MODELO", True)]
+
+
+@pytest.fixture(scope="module", params=["demo", "sintetico"])
+def catalogo(request):
+    df = pd.read_csv(CSV_DEMO)
+    if request.param == "sintetico":
+        # Catálogo mayor, con muchos empates en las columnas de orden
+        df = generar_catalogo(df, 3000, semilla=2)
+    return preprocesar_datos(df)
+
+
+def _filtrar_con_mascara(df, presupuesto_max, carnet, altura, precio_min=0, marca=None, tipos=None,
+                         cilindrada_min=0, cilindrada_max=2000):
+    # El filtro original de `recomendar_motos`, fila a fila con máscaras de pandas
+    precio = pd.to_numeric(df["PRECIO"], errors="coerce")
+    cilindrada = pd.to_numeric(df["CILINDRADA"], errors="coerce")
+    asiento = pd.to_numeric(df["ALTURA_ASIENTO"], errors="coerce")
+    mascara = (
+        (precio <= presupuesto_max) & (precio >= precio_min)
+        & (cilindrada >= cilindrada_min) & (cilindrada <= cilindrada_max)
+        & (df["CARNET_MINIMO"].map(CARNET_ORDEN) <= CARNET_ORDEN[carnet])
+        & (asiento <= altura_asiento_maxima(altura))
+    )
+    if marca:
+        mascara &= df["MARCA"].isin(marca)
+    if tipos:
+        mascara &= df["TIPO_SIMPLIFICADO"].isin(tipos)
+    return df[mascara]
+
+
+def _esperado(df, perfil, ordenar_por, ascendente):
+    filtrado = _filtrar_con_mascara(df, **perfil).dropna(subset=[ordenar_por])
+    filtrado = filtrado.assign(_orden=pd.to_numeric(filtrado[ordenar_por], errors="coerce")
+                               if ordenar_por != "MODELO" else filtrado[ordenar_por])
+    return filtrado.sort_values("_orden", ascending=ascendente, kind="stable").index.to_numpy()
+
+
+@pytest.mark.parametrize("ordenar_por,ascendente", ORDENES)
+def test_indice_y_cache_igual_que_mascaras(catalogo, ordenar_por, ascendente):
+    indice = CatalogIndex(catalogo)
+    cache = QueryCache()
+    for perfil in PERFILES:
+        esperado = _esperado(catalogo, perfil, ordenar_por, ascendente)
+        kwargs = dict(perfil, ordenar_por=ordenar_por, ascendente=ascendente)
+        sin_cache = recomendar_motos(catalogo, indice=indice, cache=None, **kwargs)
+        fallo = recomendar_motos(catalogo, indice=indice, cache=cache, **kwargs)
+        acierto = recomendar_motos(catalogo, indice=indice, cache=cache, **kwargs)
+        for resultado in (sin_cache, fallo, acierto):
+            np.testing.assert_array_equal(resultado.index.to_numpy(), esperado)
+        pd.testing.assert_frame_equal(fallo, sin_cache)
+        pd.testing.assert_frame_equal(acierto, sin_cache)
+    assert cache.estadisticas()["aciertos"] == len(PERFILES)
+
+
+def test_sin_indice_devuelve_indice_nuevo(catalogo):
+    indice = CatalogIndex(catalogo)
+    for perfil in PERFILES:
+        resultado = recomendar_motos(catalogo, **perfil)
+        con_indice = recomendar_motos(catalogo, indice=indice, cache=None, **perfil)
+        assert list(resultado.columns) == [col for col in COLUMNAS_A_MOSTRAR if col in catalogo.columns]
+        pd.testing.assert_frame_equal(resultado, con_indice.reset_index(drop=True))
+
+
+def _capas_bruto(X):
+    # Capas de Pareto comparando todos con todos (minimizando cada criterio)
+    capas = np.zeros(len(X), dtype=np.int64)
+    restantes = np.arange(len(X))
+    capa = 1
+    while len(restantes):
+        Y = X[restantes]
+        dominado = ((Y[None, :, :] <= Y[:, None, :]).all(axis=2) & (Y[None, :, :] < Y[:, None, :]).any(axis=2)).any(axis=1)
+        capas[restantes[~dominado]] = capa
+        restantes = restantes[dominado]
+        capa += 1
+    return capas
+
+
+def test_pareto_igual_que_fuerza_bruta(catalogo):
+    indice = CatalogIndex(catalogo)
+    cache = QueryCache()
+    for perfil in PERFILES:
+        resultado = recomendar_motos(catalogo, indice=indice, cache=None, ordenar_por=ORDEN_PARETO, columnas=[], **perfil)
+        for _ in range(2):
+            pd.testing.assert_frame_equal(
+                recomendar_motos(catalogo, indice=indice, cache=cache, ordenar_por=ORDEN_PARETO, columnas=[], **perfil),
+                resultado,
+            )
+
+        filtrado = _filtrar_con_mascara(catalogo, **perfil)
+        X = np.column_stack([
+            pd.to_numeric(filtrado[col], errors="coerce").to_numpy(dtype=float) * (1 if minimizar else -1)
+            for col, minimizar in CRITERIOS_PARETO
+        ])
+        completas = ~np.isnan(X).any(axis=1)
+        ids, capas = filtrado.index.to_numpy()[completas], _capas_bruto(X[completas])
+
+        obtenidas = resultado["CAPA_PARETO"].to_numpy()
+        assert (np.diff(obtenidas) >= 0).all()
+        for capa in range(1, obtenidas.max(initial=0) + 1):
+            assert set(resultado.index[obtenidas == capa]) == set(ids[capas == capa])
+        # Dentro de cada capa, de más barata a más cara
+        precio = indice.numericas["PRECIO"][resultado.index.to_numpy()]
+        for capa in np.unique(obtenidas):
+            assert (np.diff(precio[obtenidas == capa]) >= 0).all()
+
+
+def _perfiles_aleatorios(catalogo, n, rng):
+    marcas = sorted(catalogo["MARCA"].dropna().unique())
+    tipos = sorted(catalogo["TIPO_SIMPLIFICADO"].dropna().unique())
+    perfiles = []
+    for i in range(n):
+        perfil = {
+            "presupuesto_max": float(rng.integers(3000, 40000)),
+            "carnet": str(rng.choice(list(CARNET_ORDEN))),
+            "altura": int(rng.integers(150, 200)),
+            "precio_min": float(rng.choice([0, 2000, 6000])),
+            "cilindrada_min": float(rng.choice([0, 300])),
+            "cilindrada_max": float(rng.choice([500, 1000, 2000])),
+        }
+        if i % 3 == 0:
+            perfil["marca"] = list(rng.choice(marcas, size=2, replace=False))
+        if i % 4 == 0:
+            # También como cadena "A|B", como llegan desde un CSV
+            perfil["tipos"] = "|".join(rng.choice(tipos, size=2, replace=False))
+        perfiles.append(perfil)
+    return perfiles
+
+
+@pytest.mark.parametrize("ordenar_por,ascendente", [("PRECIO", True), ("POTENCIA", False)])
+def test_lote_igual_que_perfil_a_perfil(catalogo, ordenar_por, ascendente):
+    indice = CatalogIndex(catalogo)
+    perfiles = _perfiles_aleatorios(catalogo, 60, np.random.default_rng(3))
+    # Bloques y tramos pequeños para recorrer también el caso de varios bloques
+    lote = recomendar_motos_batch(indice, perfiles, top_n=7, ordenar_por=ordenar_por,
+                                  ascendente=ascendente, max_celdas=20 * 512, ancho_tramo=512)
+    assert len(lote) == len(perfiles)
+    for perfil, ids in zip(perfiles, lote):
+        tipos = perfil.get("tipos")
+        individual = recomendar_motos(
+            catalogo, indice=indice, cache=None, ordenar_por=ordenar_por, ascendente=ascendente,
+            **dict(perfil, tipos=tipos.split("|") if tipos else None),
+        )
+        np.testing.assert_array_equal(ids, individual.index.to_numpy()[:7])